@@ -1,20 +1,352 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Callable
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from loguru import logger
 
-from app.schemas import ArticlesResult, LoginStatus, SearchResult
-from app.services.auth import WechatAuth
-from app.services.clawlers import WechatClient
-from app.services.storage import SessionStorage
-from app.settings import settings
+from app.schemas import (
+    ArticlesResult,
+    BatchFetchRequest,
+    BatchFetchStatus,
+    CrawlResult,
+    IndexedArticles,
+    JobRequest,
+    JobStatus,
+    LoginStatus,
+    LoginTicketStatus,
+    SearchBatchRequest,
+    SearchBatchResult,
+    SearchResult,
+)
+from app.services import metrics
+from app.services.accounts import AccountDirectory, AccountResolver
+from app.services.auth import LoginTicket, WechatAuth
+from app.services.blobstore import ArticleManifest, create_article_manifest
+from app.services.browser import BrowserPool, firefox_factory
+from app.services.cache import ResponseCache
+from app.services.clawlers import ArticleService, AsyncWechatClient
+from app.services.crawler import HistoryCrawler
+from app.services.decoding import extract_articles
+from app.services.export import parse_fields, stream_index, stream_upstream
+from app.services.fetcher import BulkFetcher
+from app.services.freshness import FreshnessTracker
+from app.services.fulltext import FullTextIndex
+from app.services.index import ArticleIndex
+from app.services.jobs import (
+    JOB_KINDS,
+    JOB_STATUSES,
+    JobWorker,
+    crawl_handlers,
+    create_job_queue,
+)
+from app.services.pipeline import ParsePipeline
+from app.services.pool import NoSessionAvailable, PooledSession, SessionPool
+from app.services.ratelimit import create_rate_controller
+from app.services.sessions import SessionRegistry
+from app.services.state import create_state_backend, default_worker_id
+from app.services.storage import CheckpointStore, SessionStorage
+from app.settings import parse_roles, settings
 
-app = FastAPI(title="Wechat Official Crawler")
+metrics.configure(
+    debug_sample_rate=settings.debug_payload_sample_rate,
+    debug_max_chars=settings.debug_payload_max_chars,
+    tracing=settings.tracing_enabled,
+)
+worker_id = settings.worker_id or default_worker_id()
+roles = parse_roles(settings.roles)
+state = create_state_backend(
+    settings.state_backend,
+    path=settings.state_path,
+    redis_url=settings.state_redis_url,
+    prefix=settings.state_prefix,
+)
+storage = SessionStorage(
+    settings.cookies_path,
+    raw_data_file=settings.raw_data_file,
+    search_data_file=settings.search_data_file,
+    result_compression=settings.result_compression,
+    result_segment_bytes=settings.result_segment_bytes,
+    result_fsync_every=settings.result_fsync_every,
+    result_fsync_interval=settings.result_fsync_interval,
+    result_writer=worker_id if state is not None else None,
+    state=state,
+)
+registry = SessionRegistry(
+    timeout=settings.http_timeout,
+    max_connections=settings.http_max_connections,
+    max_keepalive=settings.http_max_keepalive,
+    keepalive_expiry=settings.http_keepalive_expiry,
+)
+collector = metrics.ServiceCollector()
+UNSET = object()
 
-storage = SessionStorage(settings.cookies_path)
-auth = WechatAuth(storage=storage, qr_save_path=settings.qr_save_path)
-client = WechatClient(storage=storage)
+
+class Lazy:
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self.factory = factory
+        self.value: Any = UNSET
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self.value is not UNSET
+
+    def __call__(self) -> Any:
+        if self.value is UNSET:
+            with self._lock:
+                if self.value is UNSET:
+                    self.value = self.factory()
+        return self.value
+
+
+@Lazy
+def pool() -> SessionPool:
+    collector.pool = SessionPool(
+        directory=settings.sessions_dir,
+        storage=storage,
+        registry=registry,
+        strategy=settings.pool_strategy,
+        cooldown=settings.pool_freq_cooldown,
+        error_cooldown=settings.pool_error_cooldown,
+        error_threshold=settings.pool_error_threshold,
+        state=state,
+        limiter=limiter,
+    )
+    return collector.pool
+
+
+@Lazy
+def browsers() -> BrowserPool:
+    return BrowserPool(
+        firefox_factory(headless=settings.browser_headless),
+        size=settings.browser_pool_size,
+    )
+
+
+@Lazy
+def auth() -> WechatAuth:
+    return WechatAuth(
+        storage=storage,
+        qr_save_path=settings.qr_save_path,
+        pool=pool(),
+        browsers=browsers(),
+        base_url=settings.wx_base_url,
+        scan_timeout=settings.login_scan_timeout,
+        state=state,
+    )
+
+
+cache = ResponseCache(
+    ttls={
+        "searchbiz": settings.cache_searchbiz_ttl,
+        "appmsgpublish": settings.cache_appmsgpublish_ttl,
+    },
+    max_entries=settings.cache_max_entries,
+    disk_path=settings.cache_disk_path,
+)
+limiter = create_rate_controller(settings, state)
+collector.cache = cache
+collector.limiter = limiter
+metrics.register(collector)
+aclient = AsyncWechatClient(
+    storage=storage,
+    registry=registry,
+    base_url=settings.wx_base_url,
+    per_host_limit=settings.http_per_host_limit,
+    cache=cache,
+    limiter=limiter,
+)
+
+
+@Lazy
+def index() -> ArticleIndex:
+    return ArticleIndex(
+        settings.index_path,
+        fulltext=(
+            FullTextIndex(settings.fulltext_tokenizer, settings.fulltext_title_weight)
+            if settings.fulltext_enabled
+            else None
+        ),
+    )
+
+
+@Lazy
+def accounts() -> AccountDirectory:
+    return AccountDirectory(
+        settings.accounts_path, negative_ttl=settings.search_negative_ttl
+    )
+
+
+@Lazy
+def resolver() -> AccountResolver:
+    return AccountResolver(
+        aclient,
+        pool(),
+        accounts(),
+        concurrency=settings.search_batch_concurrency,
+        count=settings.search_count,
+    )
+
+
+@Lazy
+def checkpoints() -> CheckpointStore:
+    return CheckpointStore(settings.crawl_checkpoint_path, state=state)
+
+
+@Lazy
+def crawler() -> HistoryCrawler:
+    return HistoryCrawler(
+        client=aclient,
+        checkpoints=checkpoints(),
+        page_size=settings.crawl_page_size,
+        page_delay=settings.crawl_page_delay,
+        index=index(),
+        pool=pool(),
+    )
+
+
+@Lazy
+def manifest() -> ArticleManifest | None:
+    if settings.article_storage != "blobs":
+        return None
+    return create_article_manifest(
+        manifest_path=settings.blob_manifest_path,
+        backend=settings.blob_backend,
+        root=settings.blob_root,
+        compression=settings.blob_compression,
+        level=settings.blob_level,
+        dictionary_path=settings.blob_dictionary_path,
+        s3_bucket=settings.blob_s3_bucket,
+        s3_prefix=settings.blob_s3_prefix,
+        s3_endpoint_url=settings.blob_s3_endpoint_url,
+    )
+
+
+@Lazy
+def tracker() -> FreshnessTracker | None:
+    if not settings.refresh_enabled:
+        return None
+    return FreshnessTracker(
+        settings.refresh_path,
+        min_interval=settings.refresh_min_interval,
+        max_interval=settings.refresh_max_interval,
+        age_factor=settings.refresh_age_factor,
+        keep_versions=settings.refresh_keep_versions,
+    )
+
+
+@Lazy
+def fetcher() -> BulkFetcher:
+    articles = ArticleService(
+        storage=storage,
+        registry=registry,
+        index=index(),
+        manifest=manifest(),
+        tracker=tracker(),
+    )
+    pipeline = ParsePipeline(
+        articles,
+        workers=settings.parse_workers or None,
+        queue_size=settings.parse_queue_size,
+    )
+    collector.fetcher = BulkFetcher(
+        service=articles,
+        concurrency=settings.fetch_concurrency,
+        rate_per_host=settings.fetch_rate_per_host,
+        burst=settings.fetch_burst,
+        max_retries=settings.fetch_max_retries,
+        backoff_base=settings.fetch_backoff_base,
+        backoff_cap=settings.fetch_backoff_cap,
+        block_pause=settings.fetch_block_pause,
+        timeout=settings.fetch_timeout,
+        pipeline=pipeline,
+        skip_stored=settings.fetch_skip_stored,
+        limiter=limiter,
+    )
+    return collector.fetcher
+
+
+fetch_task: asyncio.Task | None = None
+
+
+@Lazy
+def jobs() -> Any:
+    collector.jobs = create_job_queue(settings.jobs_path, state=state)
+    return collector.jobs
+
+
+@Lazy
+def job_worker() -> JobWorker:
+    return JobWorker(
+        jobs(),
+        crawl_handlers(aclient, pool(), crawler(), fetcher(), index(), jobs()),
+        concurrency=settings.job_concurrency,
+        poll_interval=settings.job_poll_interval,
+        lease=settings.job_lease,
+        backoff_base=settings.job_backoff_base,
+        backoff_cap=settings.job_backoff_cap,
+        name=worker_id,
+    )
+
+
+async def shutdown() -> None:
+    if job_worker.built:
+        await job_worker().stop()
+    if fetch_task is not None:
+        fetch_task.cancel()
+    if fetcher.built:
+        await fetcher().close()
+    await aclient.aclose()
+    if browsers.built:
+        await asyncio.to_thread(browsers().close)
+    storage.close()
+
+
+async def refresh_tokens() -> None:
+    while True:
+        await asyncio.sleep(settings.token_refresh_interval)
+        if state is not None and not state.set(
+            "locks:token_refresh",
+            worker_id,
+            ttl=settings.token_refresh_interval,
+            nx=True,
+        ):
+            continue
+        try:
+            await asyncio.to_thread(
+                auth().refresh_expiring, settings.token_refresh_margin
+            )
+        except Exception as e:
+            logger.error(f"会话续期任务异常: {type(e).__name__}: {e}")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    logger.info(f"进程角色: {','.join(sorted(roles))}")
+    refresher = None
+    if "login" in roles:
+        if settings.browser_warm_on_start:
+            await asyncio.to_thread(browsers().warm)
+        refresher = asyncio.create_task(refresh_tokens())
+    if settings.jobs_in_api and "fetch" in roles:
+        job_worker().start()
+    yield
+    if refresher is not None:
+        refresher.cancel()
+    await shutdown()
+
+
+app = FastAPI(title="Wechat Official Crawler", lifespan=lifespan)
+
+
+def require_role(role: str) -> None:
+    if role not in roles:
+        raise HTTPException(status_code=503, detail=f"{role} role disabled")
 
 
 @app.get("/health")
@@ -22,66 +354,415 @@ def health() -> dict:
     return {"status": "ok"}
 
 
-@app.post("/login", response_model=LoginStatus)
-def login() -> LoginStatus:
-    result = auth.login_with_qr()
-    if not result.get("token"):
-        return LoginStatus(ok=False, token=None, message="login failed")
-    return LoginStatus(ok=True, token=result.get("token"), message="ok")
+@app.get("/metrics")
+def prometheus_metrics() -> Response:
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
+@app.get("/cache/stats")
+def cache_stats() -> dict:
+    return cache.stats()
+
+
+@app.delete("/cache")
+def clear_cache(endpoint: str | None = Query(None)) -> dict:
+    cache.clear(endpoint)
+    return {"ok": True}
+
+
+@app.get("/state")
+def shared_state() -> dict:
+    info = {"worker": worker_id, "roles": sorted(roles)}
+    if state is None:
+        return {"backend": "local", **info}
+    return {**state.describe(), **info}
+
+
+@app.get("/ratelimit")
+def rate_limits() -> dict:
+    if limiter is None:
+        return {"adaptive": False, "limits": []}
+    return {"adaptive": True, "limits": limiter.snapshot()}
+
+
+def _ticket_status(ticket: LoginTicket) -> LoginTicketStatus:
+    return LoginTicketStatus(
+        ok=ticket.status != "failed",
+        login_id=ticket.id,
+        status=ticket.status,
+        token=ticket.token,
+        message=ticket.message,
+        qrcode_ready=ticket.qr_png is not None,
+    )
+
+
+@app.post("/login/start", response_model=LoginTicketStatus)
+def start_login() -> LoginTicketStatus:
+    require_role("login")
+    return _ticket_status(auth().start_login())
+
+
+@app.post("/login", response_model=LoginTicketStatus, deprecated=True)
+def login() -> LoginTicketStatus:
+    return start_login()
+
+
+@app.get("/login/{login_id}", response_model=LoginTicketStatus)
+def login_status(login_id: str) -> LoginTicketStatus:
+    ticket = auth().get_ticket(login_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="login not found")
+    return _ticket_status(ticket)
+
+
+@app.get("/login/{login_id}/qrcode")
+def login_qrcode(login_id: str) -> Response:
+    ticket = auth().get_ticket(login_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="login not found")
+    if ticket.qr_png is None:
+        raise HTTPException(status_code=404, detail="qrcode not ready")
+    return Response(content=ticket.qr_png, media_type="image/png")
 
 
 @app.get("/session", response_model=LoginStatus)
 def session_status() -> LoginStatus:
-    data = storage.load_session()
-    if not data:
+    healthy = [s for s in pool().snapshot() if s["healthy"]]
+    if not healthy:
         return LoginStatus(ok=False, token=None, message="no valid session")
-    return LoginStatus(ok=True, token=data.get("token"), message="ok")
+    return LoginStatus(
+        ok=True, token=healthy[0]["token"], message=f"{len(healthy)} session(s)"
+    )
 
 
-@app.get("/search", response_model=SearchResult)
-def search_account(keyword: str = Query(..., min_length=1)) -> SearchResult:
-    wx_cfg = storage.load_session()
-    if not wx_cfg or not wx_cfg.get("token"):
+@app.get("/sessions")
+def list_sessions() -> list[dict]:
+    return pool().snapshot()
+
+
+@app.delete("/sessions/{token}")
+def evict_session(token: str) -> dict:
+    if not pool().evict(token):
+        raise HTTPException(status_code=404, detail="session not found")
+    return {"ok": True}
+
+
+def acquire_session() -> PooledSession:
+    session = pool().acquire()
+    if session is None:
         raise HTTPException(status_code=401, detail="not logged in")
-    fakeid, raw = client.get_fakeid_by_name(wx_cfg, keyword)
+    return session
+
+
+@app.get("/search", response_model=SearchResult)
+async def search_account(keyword: str = Query(..., min_length=1)) -> SearchResult:
+    session = acquire_session()
+    raw = None
+    try:
+        fakeid, raw = await aclient.get_fakeid_by_name(
+            session.wx_cfg, keyword, settings.search_count
+        )
+    finally:
+        pool().release(session, raw, failed=raw is None)
     if not fakeid:
         return SearchResult(ok=False, fakeid=None, raw=raw)
     return SearchResult(ok=True, fakeid=fakeid, raw=raw)
 
 
+@app.post("/search/batch", response_model=SearchBatchResult)
+async def search_accounts(req: SearchBatchRequest) -> SearchBatchResult:
+    if len(req.names) > settings.search_batch_max_names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"at most {settings.search_batch_max_names} names per request",
+        )
+    try:
+        items = await resolver().resolve_many(req.names, refresh=req.refresh)
+    except NoSessionAvailable:
+        raise HTTPException(status_code=401, detail="not logged in")
+    return SearchBatchResult(
+        ok=True,
+        total=len(items),
+        resolved=sum(1 for i in items if i["fakeid"]),
+        upstream=sum(1 for i in items if i["source"] == "upstream"),
+        items=items,
+    )
+
+
+@app.get("/search/lookup")
+def search_lookup(name: str = Query(..., min_length=1)) -> dict:
+    entry = accounts().get(name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="name not resolved")
+    return entry
+
+
+@app.get("/search/stats")
+def search_stats() -> dict:
+    return accounts().stats()
+
+
+@app.get("/articles/search", response_model=IndexedArticles)
+def search_indexed_articles(
+    q: str | None = Query(None, min_length=1),
+    fakeid: str | None = Query(None, min_length=1),
+    since: int | None = Query(None, ge=0),
+    until: int | None = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+) -> IndexedArticles:
+    items = index().search(
+        q=q, fakeid=fakeid, since=since, until=until, limit=limit, offset=offset
+    )
+    return IndexedArticles(ok=True, count=len(items), items=items)
+
+
+@app.get("/articles/fulltext", response_model=IndexedArticles)
+def fulltext_articles(
+    q: str = Query(..., min_length=1),
+    fakeid: str | None = Query(None, min_length=1),
+    since: int | None = Query(None, ge=0),
+    until: int | None = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+) -> IndexedArticles:
+    if index().fulltext is None:
+        raise HTTPException(status_code=404, detail="fulltext index disabled")
+    items = index().fulltext_search(
+        q,
+        fakeid=fakeid,
+        since=since,
+        until=until,
+        limit=limit,
+        offset=offset,
+        snippet_chars=settings.fulltext_snippet_chars,
+    )
+    return IndexedArticles(ok=True, count=len(items), items=items)
+
+
+@app.get("/articles/fulltext/stats")
+def fulltext_stats() -> dict:
+    return index().fulltext_stats()
+
+
+@app.get("/accounts/{fakeid}/articles", response_model=IndexedArticles)
+def account_articles(
+    fakeid: str,
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+) -> IndexedArticles:
+    items = index().account_articles(fakeid, limit=limit, offset=offset)
+    return IndexedArticles(ok=True, count=len(items), items=items)
+
+
 @app.get("/articles", response_model=ArticlesResult)
-def list_articles(
+async def list_articles(
     fakeid: str = Query(..., min_length=1),
     begin: int = Query(0, ge=0),
     count: int = Query(5, ge=1, le=20),
+    include_raw: bool = Query(True),
 ) -> ArticlesResult:
-    wx_cfg = storage.load_session()
-    if not wx_cfg or not wx_cfg.get("token"):
+    session = acquire_session()
+    data = None
+    try:
+        data = await aclient.get_article_list(
+            session.wx_cfg, fakeid, begin=begin, count=count
+        )
+    finally:
+        pool().release(session, data, failed=data is None)
+    items = extract_articles(data)
+    await asyncio.to_thread(index().upsert_appmsgs, fakeid, items)
+    return ArticlesResult(ok=True, items=items, raw=data if include_raw else None)
+
+
+@app.get("/articles/stream")
+async def stream_articles(
+    fakeid: str | None = Query(None, min_length=1),
+    source: str = Query("upstream", pattern="^(upstream|index)$"),
+    fields: str | None = Query(None),
+    include_raw: bool = Query(False),
+    since: int | None = Query(None, ge=0),
+    until: int | None = Query(None, ge=0),
+    begin: int = Query(0, ge=0),
+    max_pages: int | None = Query(None, ge=1),
+) -> StreamingResponse:
+    projection = parse_fields(fields)
+    if source == "index":
+        body = stream_index(index(), fakeid, since, until, projection)
+    else:
+        if not fakeid:
+            raise HTTPException(status_code=400, detail="fakeid is required")
+        if not pool().sessions():
+            raise HTTPException(status_code=401, detail="not logged in")
+        body = stream_upstream(
+            crawler(), fakeid, projection, include_raw, begin=begin, max_pages=max_pages
+        )
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+@app.post("/crawl/{fakeid}", response_model=CrawlResult)
+async def crawl_account(
+    fakeid: str, max_pages: int | None = Query(None, ge=1)
+) -> CrawlResult:
+    try:
+        result = await crawler().crawl(None, fakeid, max_pages=max_pages)
+    except NoSessionAvailable:
         raise HTTPException(status_code=401, detail="not logged in")
-    data = client.get_article_list(wx_cfg, fakeid, begin=begin, count=count)
-    items = _extract_articles(data)
-    return ArticlesResult(ok=True, items=items, raw=data)
+    return CrawlResult(ok=True, new_count=len(result["items"]), **result)
+
+
+@app.get("/crawl/{fakeid}", response_model=CrawlResult)
+def crawl_checkpoint(fakeid: str) -> CrawlResult:
+    checkpoint = checkpoints().load(fakeid)
+    return CrawlResult(
+        ok=bool(checkpoint),
+        fakeid=fakeid,
+        complete=bool(checkpoint) and not checkpoint.get("cursor"),
+        checkpoint=checkpoint or None,
+    )
+
+
+@app.post("/articles/details/batch", response_model=BatchFetchStatus)
+async def start_batch_fetch(req: BatchFetchRequest) -> BatchFetchStatus:
+    global fetch_task
+    require_role("fetch")
+    running = fetch_task is not None and not fetch_task.done()
+    if running or fetcher().lock.locked():
+        raise HTTPException(status_code=409, detail="batch fetch already running")
+    collect = asyncio.create_task(_collect_batch_urls(req))
+    fetch_task = asyncio.create_task(_run_batch_fetch(collect))
+    urls = await collect
+    if not urls:
+        raise HTTPException(status_code=400, detail="no urls to fetch")
+    return BatchFetchStatus(ok=True, running=True, message=f"queued {len(urls)} urls")
+
+
+async def _collect_batch_urls(req: BatchFetchRequest) -> list[str]:
+    urls = list(req.urls or [])
+    if req.from_index or req.fakeid:
+        urls.extend(await asyncio.to_thread(index().links, req.fakeid))
+    due = tracker()
+    if req.due and due is not None:
+        urls.extend(await asyncio.to_thread(due.due_urls, req.limit))
+    return urls
 
 
-def _extract_articles(raw: dict | None) -> list[dict]:
-    if not isinstance(raw, dict):
-        return []
-    publish_page_str = raw.get("publish_page")
-    if not publish_page_str:
-        return []
+async def _run_batch_fetch(collect: asyncio.Task) -> None:
     try:
-        publish_page = json.loads(publish_page_str)
+        urls = await collect
     except Exception:
-        return []
-    items: list[dict] = []
-    for publish in publish_page.get("publish_list", []):
-        publish_info_str = publish.get("publish_info")
-        if not publish_info_str:
-            continue
-        try:
-            publish_info = json.loads(publish_info_str)
-        except Exception:
-            continue
-        for appmsg in publish_info.get("appmsgex", []):
-            items.append(appmsg)
-    return items
+        return
+    if not urls:
+        return
+    async with fetcher().lock:
+        await fetcher().run(urls)
+
+
+@app.get("/articles/details/batch", response_model=BatchFetchStatus)
+def batch_fetch_status() -> BatchFetchStatus:
+    if not fetcher.built:
+        return BatchFetchStatus(ok=True, running=False)
+    running = fetch_task is not None and not fetch_task.done()
+    return BatchFetchStatus(
+        ok=True,
+        running=running or fetcher().lock.locked(),
+        stats=fetcher().snapshot(),
+    )
+
+
+@app.get("/articles/stored")
+async def stored_article(
+    url: str = Query(..., min_length=1),
+    part: str = Query("json", pattern="^(json|text|html)$"),
+):
+    store = manifest()
+    if store is None:
+        raise HTTPException(status_code=404, detail="blob storage disabled")
+    data = await asyncio.to_thread(store.load, url, part)
+    if data is None:
+        raise HTTPException(status_code=404, detail="article not stored")
+    if part == "json":
+        return data
+    media_type = "text/html" if part == "html" else "text/plain"
+    return Response(content=data, media_type=f"{media_type}; charset=utf-8")
+
+
+@app.get("/storage/stats")
+def storage_stats() -> dict:
+    store = manifest()
+    if store is None:
+        return {"backend": "files"}
+    return {"backend": settings.blob_backend, **store.stats()}
+
+
+@app.get("/articles/versions")
+async def article_versions(
+    url: str = Query(..., min_length=1), include_data: bool = Query(False)
+) -> dict:
+    versions_tracker = tracker()
+    if versions_tracker is None:
+        raise HTTPException(status_code=404, detail="change tracking disabled")
+    entry = await asyncio.to_thread(versions_tracker.get, url)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="article not tracked")
+    versions = await asyncio.to_thread(
+        versions_tracker.versions, url, include_data
+    )
+    return {**entry, "versions": versions}
+
+
+@app.get("/freshness/stats")
+def freshness_stats() -> dict:
+    freshness = tracker()
+    if freshness is None:
+        return {"enabled": False}
+    return {"enabled": True, **freshness.stats()}
+
+
+@app.post("/jobs", response_model=JobStatus)
+def submit_job(req: JobRequest) -> JobStatus:
+    if req.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"unknown job kind: {req.kind}")
+    job, created = jobs().submit(
+        req.kind,
+        req.payload,
+        priority=req.priority,
+        dedup_key=req.dedup_key,
+        max_attempts=req.max_attempts or settings.job_max_attempts,
+        delay=req.delay,
+        repeat_every=req.repeat_every,
+    )
+    return JobStatus(ok=True, created=created, job=job)
+
+
+@app.get("/jobs/stats")
+def job_stats() -> dict:
+    worker = job_worker().stats() if job_worker.built else None
+    return {"counts": jobs().counts(), "worker": worker}
+
+
+@app.get("/jobs")
+def list_jobs(
+    status: str | None = Query(None),
+    kind: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+) -> list[dict]:
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"unknown status: {status}")
+    return jobs().list(status=status, kind=kind, limit=limit, offset=offset)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: int) -> JobStatus:
+    job = jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return JobStatus(ok=True, job=job)
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: int) -> dict:
+    if not jobs().cancel(job_id):
+        raise HTTPException(status_code=404, detail="job not found or finished")
+    return {"ok": True}
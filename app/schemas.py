@@ -11,13 +11,82 @@ class LoginStatus(BaseModel):
     message: str | None = None
 
 
+class LoginTicketStatus(BaseModel):
+    ok: bool
+    login_id: str
+    status: str
+    token: str | None = None
+    message: str | None = None
+    qrcode_ready: bool = False
+
+
 class SearchResult(BaseModel):
     ok: bool
     fakeid: str | None = None
     raw: dict[str, Any] | None = None
 
 
+class SearchBatchRequest(BaseModel):
+    names: list[str]
+    refresh: bool = False
+
+
+class SearchBatchResult(BaseModel):
+    ok: bool
+    total: int = 0
+    resolved: int = 0
+    upstream: int = 0
+    items: list[dict[str, Any]] | None = None
+
+
 class ArticlesResult(BaseModel):
     ok: bool
     items: list[dict[str, Any]] | None = None
     raw: dict[str, Any] | None = None
+
+
+class CrawlResult(BaseModel):
+    ok: bool
+    fakeid: str
+    pages: int = 0
+    complete: bool = False
+    new_count: int = 0
+    items: list[dict[str, Any]] | None = None
+    checkpoint: dict[str, Any] | None = None
+
+
+class IndexedArticles(BaseModel):
+    ok: bool
+    count: int = 0
+    items: list[dict[str, Any]] | None = None
+
+
+class BatchFetchRequest(BaseModel):
+    urls: list[str] | None = None
+    fakeid: str | None = None
+    from_index: bool = False
+    due: bool = False
+    limit: int | None = None
+
+
+class BatchFetchStatus(BaseModel):
+    ok: bool
+    running: bool = False
+    message: str | None = None
+    stats: dict[str, Any] | None = None
+
+
+class JobRequest(BaseModel):
+    kind: str
+    payload: dict[str, Any]
+    priority: int = 0
+    dedup_key: str | None = None
+    max_attempts: int | None = None
+    delay: float = 0.0
+    repeat_every: float | None = None
+
+
+class JobStatus(BaseModel):
+    ok: bool
+    created: bool = False
+    job: dict[str, Any] | None = None
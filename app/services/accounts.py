@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from app.services.clawlers import (
+    AsyncWechatClient,
+    is_ok_response,
+    normalize_name,
+    rank_candidates,
+)
+from app.services.pool import NoSessionAvailable, SessionPool
+
+ACCOUNTS_DB = os.path.join("cfg", "accounts.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS account_lookup (
+    name_key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    fakeid TEXT,
+    nickname TEXT,
+    exact INTEGER NOT NULL DEFAULT 0,
+    candidates TEXT NOT NULL,
+    resolved_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_account_lookup_fakeid ON account_lookup (fakeid);
+"""
+
+
+class AccountDirectory:
+    def __init__(self, path: str = ACCOUNTS_DB, negative_ttl: float = 86400.0) -> None:
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _entry(self, row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["exact"] = bool(entry["exact"])
+        entry["candidates"] = json.loads(entry["candidates"])
+        return entry
+
+    def get_many(
+        self, names: Iterable[str], now: float | None = None
+    ) -> Dict[str, Dict[str, Any]]:
+        now = time.time() if now is None else now
+        keys = list({normalize_name(n) for n in names if n})
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = conn.execute(
+                "SELECT * FROM account_lookup WHERE name_key IN "
+                f"({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for row in rows:
+                expired = now - row["resolved_at"] > self.negative_ttl
+                if row["fakeid"] is None and expired:
+                    continue
+                found[row["name_key"]] = self._entry(row)
+        return found
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([name]).get(normalize_name(name))
+
+    def save(self, name: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        best = candidates[0] if candidates else {}
+        row = {
+            "name_key": normalize_name(name),
+            "name": name,
+            "fakeid": best.get("fakeid"),
+            "nickname": best.get("nickname"),
+            "exact": int(bool(best.get("exact"))),
+            "candidates": json.dumps(candidates, ensure_ascii=False),
+            "resolved_at": time.time(),
+        }
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO account_lookup (name_key, name, fakeid, "
+                "nickname, exact, candidates, resolved_at) VALUES (:name_key, :name, "
+                ":fakeid, :nickname, :exact, :candidates, :resolved_at)",
+                row,
+            )
+        return {**row, "exact": bool(row["exact"]), "candidates": candidates}
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._conn().execute(
+            "SELECT COUNT(*) AS names, COUNT(fakeid) AS resolved, "
+            "SUM(exact) AS exact FROM account_lookup"
+        ).fetchone()
+        return {
+            "names": row["names"],
+            "resolved": row["resolved"],
+            "exact": row["exact"] or 0,
+        }
+
+
+class AccountResolver:
+    def __init__(
+        self,
+        client: AsyncWechatClient,
+        pool: SessionPool,
+        directory: AccountDirectory,
+        concurrency: int = 4,
+        count: int = 5,
+    ) -> None:
+        self.client = client
+        self.pool = pool
+        self.directory = directory
+        self.concurrency = concurrency
+        self.count = count
+
+    def _result(self, name: str, source: str, entry: Dict[str, Any]) -> Dict:
+        return {
+            "name": name,
+            "fakeid": entry.get("fakeid"),
+            "exact": entry.get("exact", False),
+            "source": source,
+            "candidates": entry.get("candidates", []),
+        }
+
+    async def _search(self, name: str) -> Dict[str, Any]:
+        session = self.pool.acquire()
+        if session is None:
+            raise NoSessionAvailable("账号池中没有可用会话")
+        raw = None
+        try:
+            _, raw = await self.client.get_fakeid_by_name(
+                session.wx_cfg, name, self.count
+            )
+        finally:
+            self.pool.release(session, raw, failed=raw is None)
+        if not is_ok_response(raw):
+            ret = (raw.get("base_resp") or {}).get("ret") if raw else None
+            return {**self._result(name, "error", {}), "error": f"ret={ret}"}
+        entry = await asyncio.to_thread(
+            self.directory.save, name, rank_candidates(name, raw)
+        )
+        return self._result(name, "upstream", entry)
+
+    async def resolve_many(
+        self, names: Iterable[str], refresh: bool = False
+    ) -> List[Dict[str, Any]]:
+        names = [n.strip() for n in names if n and n.strip()]
+        known = {}
+        if not refresh:
+            known = await asyncio.to_thread(self.directory.get_many, names)
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[str, str] = {}
+        for name in names:
+            key = normalize_name(name)
+            if key in known:
+                results[key] = self._result(name, "table", known[key])
+            else:
+                pending.setdefault(key, name)
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def resolve(key: str, name: str) -> None:
+            async with slots:
+                try:
+                    results[key] = await self._search(name)
+                except Exception as e:
+                    logger.warning(f"解析公众号失败 {name}: {type(e).__name__}: {e}")
+                    results[key] = {
+                        **self._result(name, "error", {}),
+                        "error": type(e).__name__,
+                    }
+
+        if pending and not self.pool.sessions():
+            raise NoSessionAvailable("账号池中没有可用会话")
+        if pending:
+            logger.info(f"批量搜索公众号: 本地命中 {len(known)}，需请求 {len(pending)}")
+            await asyncio.gather(*(resolve(k, n) for k, n in pending.items()))
+        return [{**results[normalize_name(name)], "name": name} for name in names]
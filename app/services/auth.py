@@ -1,23 +1,28 @@
+import base64
 import datetime
+import json
 import os
+import threading
+import time
+import uuid
 from typing import Any, Dict, List, Optional, Tuple
 
 from loguru import logger
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
+from app.services.browser import BrowserPool, firefox_factory
+from app.services.pool import SessionPool
 from app.services.storage import SessionStorage
 
 WX_LOGIN = "https://mp.weixin.qq.com/"
 WX_HOME = "https://mp.weixin.qq.com/cgi-bin/home"
 QR_SAVE_PATH = "wx_login_qrcode.png"
 OUTPUT_JSON = os.path.join("cfg", "cookies.json")
+TICKET_TTL = 900
 
 
 def wait_first_image_loaded(driver, timeout=20):
+    from selenium.webdriver.support.ui import WebDriverWait
+
     WebDriverWait(driver, timeout).until(
         lambda d: d.execute_script(
             "const img=document.querySelector('img');return img && img.complete;"
@@ -26,6 +31,10 @@ def wait_first_image_loaded(driver, timeout=20):
 
 
 def find_qr_element(driver, timeout=20):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     selectors = [
         ".login__type__container__scan__qrcode",
     ]
@@ -95,9 +104,9 @@ def extract_token_from_html(html: str) -> Optional[str]:
     return None
 
 
-def fetch_token_from_home(driver) -> Optional[str]:
+def fetch_token_from_home(driver, home_url: str = WX_HOME) -> Optional[str]:
     try:
-        driver.get(WX_HOME)
+        driver.get(home_url)
     except Exception:
         return None
     return extract_token_from_html(driver.page_source or "")
@@ -123,6 +132,9 @@ def format_cookies_str(cookies: List[Dict[str, Any]]) -> str:
 
 
 def verify_logged_in(driver, timeout=20) -> bool:
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     try:
         WebDriverWait(driver, timeout).until(EC.url_contains("/cgi-bin/home"))
         return True
@@ -130,76 +142,245 @@ def verify_logged_in(driver, timeout=20) -> bool:
         return False
 
 
+def qr_png_bytes(driver, el) -> bytes:
+    try:
+        png = el.screenshot_as_png
+        if len(png) > 512:
+            return png
+    except Exception:
+        pass
+    from io import BytesIO
+
+    from PIL import Image
+
+    loc = el.location
+    size = el.size
+    with Image.open(BytesIO(driver.get_screenshot_as_png())) as img:
+        left, top = int(loc["x"]), int(loc["y"])
+        right, bottom = int(loc["x"] + size["width"]), int(loc["y"] + size["height"])
+        out = BytesIO()
+        img.crop((left, top, right, bottom)).save(out, format="PNG")
+        return out.getvalue()
+
+
+def session_data(driver, token: str) -> Dict[str, Any]:
+    cookies, expiry_ts = cookies_and_expiry(driver)
+    return {
+        "token": token,
+        "cookies": cookies,
+        "cookies_str": format_cookies_str(cookies),
+        "user_agent": driver.execute_script("return navigator.userAgent;"),
+        "expiry": expiry_ts,
+        "expiry_human": (
+            datetime.datetime.utcfromtimestamp(expiry_ts).strftime(
+                "%Y-%m-%d %H:%M:%S UTC"
+            )
+            if expiry_ts
+            else None
+        ),
+        "saved_at": datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
+    }
+
+
+class LoginTicket:
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        self.status = "starting"
+        self.message: Optional[str] = None
+        self.qr_png: Optional[bytes] = None
+        self.token: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def update(self, status: str, message: Optional[str] = None) -> None:
+        self.status = status
+        self.message = message
+        self.updated_at = time.time()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("success", "failed")
+
+    def to_json(self) -> str:
+        data = {k: v for k, v in vars(self).items() if k != "qr_png"}
+        if self.qr_png is not None:
+            data["qr_png"] = base64.b64encode(self.qr_png).decode("ascii")
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, value: str) -> "LoginTicket":
+        data = json.loads(value)
+        ticket = cls()
+        qr_png = data.pop("qr_png", None)
+        vars(ticket).update(data)
+        ticket.qr_png = base64.b64decode(qr_png) if qr_png else None
+        return ticket
+
+
 class WechatAuth:
     def __init__(
-        self, storage: SessionStorage, qr_save_path: str = QR_SAVE_PATH
+        self,
+        storage: SessionStorage,
+        qr_save_path: str = QR_SAVE_PATH,
+        pool: SessionPool | None = None,
+        browsers: BrowserPool | None = None,
+        base_url: str = WX_LOGIN,
+        scan_timeout: float = 180,
+        state: Any = None,
     ) -> None:
         self.storage = storage
+        self.state = state
         self.qr_save_path = qr_save_path
+        self.pool = pool
+        self.browsers = browsers or BrowserPool(firefox_factory(headless=False))
+        self.login_url = base_url.rstrip("/") + "/"
+        self.home_url = self.login_url + "cgi-bin/home"
+        self.scan_timeout = scan_timeout
+        self._tickets: Dict[str, LoginTicket] = {}
+        self._tickets_lock = threading.Lock()
+
+    def _capture_qr(self, driver) -> bytes:
+        logger.info("开始获取二维码...")
+        driver.get(self.login_url)
+        wait_first_image_loaded(driver, timeout=20)
+        qr = find_qr_element(driver, timeout=20)
+        png = qr_png_bytes(driver, qr)
+        if len(png) < 400:
+            raise RuntimeError(
+                "二维码图片异常（过小），请重新运行或手动刷新页面后再试"
+            )
+        return png
 
-    def login_with_qr(self) -> Dict[str, Any]:
-        options = webdriver.FirefoxOptions()
-        service = Service()
-        driver = webdriver.Firefox(service=service, options=options)
-        driver.set_window_size(1280, 900)
-        try:
-            logger.info("开始获取二维码...")
-            driver.get(WX_LOGIN)
-            wait_first_image_loaded(driver, timeout=20)
-            qr = find_qr_element(driver, timeout=20)
-            save_qr_image(driver, qr, self.qr_save_path)
-            if os.path.getsize(self.qr_save_path) < 400:
-                raise RuntimeError(
-                    "二维码图片异常（过小），请重新运行或手动刷新页面后再试"
-                )
+    def _complete_login(self, driver) -> Dict[str, Any]:
+        from selenium.webdriver.support.ui import WebDriverWait
 
-            logger.info(
-                f"已保存二维码: {os.path.abspath(self.qr_save_path)}，请扫描登录..."
-            )
+        WebDriverWait(driver, self.scan_timeout).until(
+            lambda d: ("token=" in d.current_url)
+            or ("/cgi-bin/home" in d.current_url)
+        )
+
+        token = extract_token(driver)
+        home_token = fetch_token_from_home(driver, self.home_url)
+        token = home_token or token
 
-            WebDriverWait(driver, 180).until(
-                lambda d: ("token=" in d.current_url)
-                or ("/cgi-bin/home" in d.current_url)
+        ok = verify_logged_in(driver, timeout=10) or bool(token)
+        logger.info(f"登录成功: {ok}, token: {token}")
+        if not ok or not token:
+            logger.error(
+                "登录未完成或未获取到 token，请确认扫码已完成并具有管理员权限"
             )
+            return {}
 
-            token = extract_token(driver)
-            home_token = fetch_token_from_home(driver)
-            token = home_token or token
-            cookies, expiry_ts = cookies_and_expiry(driver)
-            cookies_str = format_cookies_str(cookies)
+        data = session_data(driver, token)
+        self._save(data)
+        return data
 
-            user_agent = driver.execute_script("return navigator.userAgent;")
+    def _save(self, data: Dict[str, Any]) -> None:
+        self.storage.persist_session(data)
+        logger.info(f"已保存会话到: {os.path.abspath(self.storage.path)}")
+        if self.pool is not None:
+            self.pool.add(data)
 
-            ok = verify_logged_in(driver, timeout=10) or bool(token)
-            logger.info(f"登录成功: {ok}, token: {token}")
-            if not ok or not token:
-                logger.error(
-                    "登录未完成或未获取到 token，请确认扫码已完成并具有管理员权限"
-                )
+    def login_with_qr(self) -> Dict[str, Any]:
+        with self.browsers.browser() as driver:
+            png = self._capture_qr(driver)
+            with open(self.qr_save_path, "wb") as f:
+                f.write(png)
+            logger.info(
+                f"已保存二维码: {os.path.abspath(self.qr_save_path)}，请扫描登录..."
+            )
+            return self._complete_login(driver)
+
+    def _publish(self, ticket: LoginTicket) -> None:
+        if self.state is not None:
+            self.state.set(f"login:{ticket.id}", ticket.to_json(), ttl=TICKET_TTL)
+
+    def start_login(self) -> LoginTicket:
+        ticket = LoginTicket()
+        with self._tickets_lock:
+            self._prune_tickets()
+            self._tickets[ticket.id] = ticket
+        self._publish(ticket)
+        threading.Thread(
+            target=self._run_login,
+            args=(ticket,),
+            name=f"login-{ticket.id}",
+            daemon=True,
+        ).start()
+        return ticket
+
+    def _run_login(self, ticket: LoginTicket) -> None:
+        try:
+            with self.browsers.browser(timeout=self.scan_timeout) as driver:
+                ticket.qr_png = self._capture_qr(driver)
+                ticket.update("waiting_scan", "请扫描二维码登录")
+                self._publish(ticket)
+                data = self._complete_login(driver)
+            if data.get("token"):
+                ticket.token = data["token"]
+                ticket.update("success", "ok")
+            else:
+                ticket.update("failed", "login failed")
+        except Exception as e:
+            logger.error(f"扫码登录失败: {type(e).__name__}: {e}")
+            ticket.update("failed", f"{type(e).__name__}: {e}")
+        self._publish(ticket)
+
+    def get_ticket(self, login_id: str) -> Optional[LoginTicket]:
+        with self._tickets_lock:
+            ticket = self._tickets.get(login_id)
+        if ticket is None and self.state is not None:
+            value = self.state.get(f"login:{login_id}")
+            if value is not None:
+                ticket = LoginTicket.from_json(value)
+        return ticket
+
+    def _prune_tickets(self, max_age: float = 900) -> None:
+        now = time.time()
+        expired = [
+            k
+            for k, t in self._tickets.items()
+            if t.done and now - t.updated_at > max_age
+        ]
+        for login_id in expired:
+            del self._tickets[login_id]
+
+    def refresh_session(self, wx_cfg: Dict[str, Any]) -> Dict[str, Any]:
+        with self.browsers.browser(timeout=60) as driver:
+            driver.get(self.login_url)
+            for cookie in wx_cfg.get("cookies") or []:
+                cookie = {k: v for k, v in cookie.items() if k != "sameSite"}
+                try:
+                    driver.add_cookie(cookie)
+                except Exception:
+                    continue
+            token = fetch_token_from_home(driver, self.home_url)
+            if not token or not verify_logged_in(driver, timeout=10):
+                logger.warning(f"会话 {wx_cfg.get('token')} 续期失败，需要重新扫码")
                 return {}
-
-            data = {
-                "token": token,
-                "cookies": cookies,
-                "cookies_str": cookies_str,
-                "user_agent": user_agent,
-                "expiry": expiry_ts,
-                "expiry_human": (
-                    datetime.datetime.utcfromtimestamp(expiry_ts).strftime(
-                        "%Y-%m-%d %H:%M:%S UTC"
-                    )
-                    if expiry_ts
-                    else None
-                ),
-                "saved_at": datetime.datetime.utcnow().strftime(
-                    "%Y-%m-%d %H:%M:%S UTC"
-                ),
-            }
-            self.storage.persist_session(data)
-            logger.info(f"已保存会话到: {os.path.abspath(self.storage.path)}")
+            data = session_data(driver, token)
+            self._save(data)
+            logger.info(f"会话已续期: token={token}, expiry={data['expiry_human']}")
             return data
-        finally:
-            driver.quit()
+
+    def refresh_expiring(self, margin: float) -> int:
+        if self.pool is None:
+            return 0
+        refreshed = 0
+        deadline = time.time() + margin
+        for session in self.pool.sessions():
+            if not session.expiry or session.expiry > deadline:
+                continue
+            try:
+                data = self.refresh_session(session.wx_cfg)
+            except Exception as e:
+                logger.error(f"会话 {session.key} 续期异常: {type(e).__name__}: {e}")
+                continue
+            if data.get("token"):
+                refreshed += 1
+                if data["token"] != session.key:
+                    self.pool.evict(session.key, "replaced by refreshed token")
+        return refreshed
 
 
 def get_cookies():
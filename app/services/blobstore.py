@@ -0,0 +1,330 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from loguru import logger
+
+from app.services.index import article_key, normalize_link
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOB_ROOT = os.path.join("cfg", "blobs")
+MANIFEST_DB = os.path.join("cfg", "manifest.db")
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+DICT_SIZE = 112640
+PARTS = ("html", "text", "json")
+
+
+def blob_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def object_key(digest: str) -> str:
+    return f"objects/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+class LocalBlobBackend:
+    def __init__(self, root: str = BLOB_ROOT) -> None:
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobBackend:
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+        client: Any = None,
+    ) -> None:
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("使用 S3 存储需要安装 boto3") from None
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+            if code in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get(self, key: str) -> bytes:
+        resp = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        return resp["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = DICT_SIZE) -> bytes:
+    if zstandard is None:
+        raise RuntimeError("训练 zstd 字典需要安装 zstandard")
+    return zstandard.train_dictionary(size, list(samples)).as_bytes()
+
+
+class BlobStore:
+    def __init__(
+        self,
+        backend: Any,
+        compression: str | None = "zstd",
+        level: int = 3,
+        dictionary: bytes | None = None,
+    ) -> None:
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("使用 zstd 压缩需要安装 zstandard")
+        self.backend = backend
+        self.compression = compression
+        self.level = level
+        self._dicts: Dict[int, Any] = {}
+        self._local = threading.local()
+        self._dict = None
+        if dictionary is not None and compression == "zstd":
+            self._dict = zstandard.ZstdCompressionDict(dictionary)
+            dict_id = self._dict.dict_id()
+            self._dicts[dict_id] = self._dict
+            if not backend.exists(f"dicts/{dict_id}"):
+                backend.put(f"dicts/{dict_id}", dictionary)
+
+    def _compressor(self) -> Any:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self._dict
+            )
+            self._local.compressor = compressor
+        return compressor
+
+    def _dictionary(self, dict_id: int) -> Any:
+        found = self._dicts.get(dict_id)
+        if found is None:
+            found = zstandard.ZstdCompressionDict(self.backend.get(f"dicts/{dict_id}"))
+            self._dicts[dict_id] = found
+        return found
+
+    def compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._compressor().compress(data)
+        if self.compression == "gzip":
+            return gzip.compress(data, compresslevel=self.level)
+        return data
+
+    def decompress(self, blob: bytes) -> bytes:
+        if blob.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise RuntimeError("读取 zstd 数据需要安装 zstandard")
+            dict_id = zstandard.get_frame_parameters(blob).dict_id
+            dict_data = self._dictionary(dict_id) if dict_id else None
+            return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(blob)
+        if blob.startswith(GZIP_MAGIC):
+            return gzip.decompress(blob)
+        return blob
+
+    def exists(self, digest: str) -> bool:
+        return self.backend.exists(object_key(digest))
+
+    def put(self, data: bytes) -> str:
+        digest = blob_digest(data)
+        key = object_key(digest)
+        if not self.backend.exists(key):
+            self.backend.put(key, self.compress(data))
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return self.decompress(self.backend.get(object_key(digest)))
+
+
+def article_id(url: str) -> str:
+    key = article_key(url)
+    if key is None:
+        return normalize_link(url) or url
+    return f"{key[0]}:{key[1]}:{key[2]}"
+
+
+class ArticleManifest:
+    def __init__(self, path: str = MANIFEST_DB, store: BlobStore | None = None) -> None:
+        self.path = path
+        self.store = store or BlobStore(LocalBlobBackend())
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                "article_id TEXT PRIMARY KEY, url TEXT NOT NULL, "
+                "html_sha TEXT, text_sha TEXT, json_sha TEXT, "
+                "html_size INTEGER, fetched_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM manifest WHERE article_id = ?", (article_id(url),)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def contains(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def save_article(
+        self, url: str, html: str, data: Dict, write_html: bool = True
+    ) -> bool:
+        aid = article_id(url)
+        current = self.get(url)
+        text_bytes = data["content"].encode("utf-8")
+        json_bytes = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        text_sha = blob_digest(text_bytes)
+        json_sha = blob_digest(json_bytes)
+        if (
+            current is not None
+            and current["text_sha"] == text_sha
+            and current["json_sha"] == json_sha
+            and (current["html_sha"] or not write_html)
+        ):
+            with self._conn() as conn:
+                conn.execute(
+                    "UPDATE manifest SET fetched_at = ? WHERE article_id = ?",
+                    (time.time(), aid),
+                )
+            logger.debug(f"文章内容未变化，跳过写入 {aid}")
+            return False
+        if write_html:
+            html_bytes = html.encode("utf-8")
+            html_sha = self.store.put(html_bytes)
+            html_size = len(html_bytes)
+        else:
+            html_sha = current["html_sha"] if current else None
+            html_size = current["html_size"] if current else None
+        self.store.put(text_bytes)
+        self.store.put(json_bytes)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO manifest (article_id, url, html_sha, "
+                "text_sha, json_sha, html_size, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    aid,
+                    url,
+                    html_sha,
+                    text_sha,
+                    json_sha,
+                    html_size,
+                    time.time(),
+                ),
+            )
+        logger.info(f"文章已写入内容寻址存储 {aid} html={html_sha}")
+        return True
+
+    def load(self, url: str, part: str = "json") -> Any:
+        if part not in PARTS:
+            raise ValueError(f"未知的文章内容类型: {part}")
+        entry = self.get(url)
+        if entry is None or not entry[f"{part}_sha"]:
+            return None
+        data = self.store.get(entry[f"{part}_sha"])
+        return json.loads(data) if part == "json" else data.decode("utf-8")
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        for row in self._conn().execute("SELECT * FROM manifest ORDER BY rowid"):
+            yield dict(row)
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._conn().execute(
+            "SELECT COUNT(*) AS articles, SUM(html_size) AS html_bytes FROM manifest"
+        ).fetchone()
+        return {"articles": row["articles"], "html_bytes": row["html_bytes"] or 0}
+
+
+def create_article_manifest(
+    manifest_path: str = MANIFEST_DB,
+    backend: str = "local",
+    root: str = BLOB_ROOT,
+    compression: str | None = "zstd",
+    level: int = 3,
+    dictionary_path: str | None = None,
+    s3_bucket: str | None = None,
+    s3_prefix: str = "",
+    s3_endpoint_url: str | None = None,
+) -> ArticleManifest:
+    if backend == "s3":
+        if not s3_bucket:
+            raise ValueError("S3 存储需要配置 bucket")
+        blob_backend: Any = S3BlobBackend(s3_bucket, s3_prefix, s3_endpoint_url)
+    elif backend == "local":
+        blob_backend = LocalBlobBackend(root)
+    else:
+        raise ValueError(f"不支持的存储后端: {backend}")
+    dictionary = None
+    if dictionary_path:
+        with open(dictionary_path, "rb") as f:
+            dictionary = f.read()
+    store = BlobStore(blob_backend, compression, level, dictionary)
+    return ArticleManifest(manifest_path, store)
+
+
+def dictionary_samples(directory: str, limit: int = 2000) -> List[bytes]:
+    samples = []
+    for name in sorted(os.listdir(directory))[:limit]:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                samples.append(f.read())
+    return samples
@@ -0,0 +1,115 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List
+
+from loguru import logger
+
+
+def firefox_factory(headless: bool = True) -> Callable[[], Any]:
+    def create() -> Any:
+        from selenium import webdriver
+        from selenium.webdriver.firefox.service import Service
+
+        options = webdriver.FirefoxOptions()
+        if headless:
+            options.add_argument("-headless")
+        driver = webdriver.Firefox(service=Service(), options=options)
+        driver.set_window_size(1280, 900)
+        return driver
+
+    return create
+
+
+class BrowserPool:
+    def __init__(self, factory: Callable[[], Any], size: int = 1) -> None:
+        self.factory = factory
+        self.size = max(size, 1)
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._created = 0
+        self._all: List[Any] = []
+        self._lock = threading.Lock()
+
+    def _create(self) -> Any:
+        logger.info("启动浏览器实例...")
+        driver = self.factory()
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def warm(self, count: int | None = None) -> None:
+        for _ in range(min(count or self.size, self.size)):
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                self._idle.put(self._create())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+    def acquire(self, timeout: float | None = None) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, driver: Any, broken: bool = False) -> None:
+        if not broken:
+            try:
+                driver.delete_all_cookies()
+                driver.get("about:blank")
+            except Exception:
+                broken = True
+        if broken:
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    def _discard(self, driver: Any) -> None:
+        with self._lock:
+            self._created -= 1
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def browser(self, timeout: float | None = None) -> Iterator[Any]:
+        driver = self.acquire(timeout=timeout)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close(self) -> None:
+        with self._lock:
+            drivers, self._all = self._all, []
+            self._created = 0
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+Entry = Tuple[float, Any]
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    fields = {k: v for k, v in params.items() if k != "token"}
+    return f"{endpoint}:{json.dumps(fields, sort_keys=True, ensure_ascii=False)}"
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 2048) -> None:
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, prefix: str = "") -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteCacheTier:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Entry]:
+        row = self._conn().execute(
+            "SELECT expires_at, value FROM response_cache "
+            "WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, expires_at, value) "
+                "VALUES (?, ?, ?)",
+                (key, expires_at, json.dumps(value, ensure_ascii=False)),
+            )
+
+    def clear(self, prefix: str = "") -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM response_cache WHERE key LIKE ? OR expires_at <= ?",
+                (f"{prefix}%", time.time()),
+            )
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        max_entries: int = 2048,
+        disk_path: str | None = None,
+    ) -> None:
+        self.ttls = ttls
+        self.memory = LRUCache(max_entries)
+        self.disk = SqliteCacheTier(disk_path) if disk_path else None
+        self.metrics: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get_or_fetch(
+        self,
+        endpoint: str,
+        params: Dict[str, Any],
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0:
+            return await fetch()
+        key = cache_key(endpoint, params)
+        metrics = self.metrics[endpoint]
+
+        entry = self.memory.get(key)
+        if entry is not None and cacheable(entry[1]):
+            metrics["hits"] += 1
+            return entry[1]
+        if self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None and cacheable(entry[1]):
+                metrics["disk_hits"] += 1
+                self.memory.set(key, entry[1], entry[0])
+                return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                value = await asyncio.shield(inflight)
+            except Exception:
+                value = None
+            if value is not None and cacheable(value):
+                metrics["coalesced"] += 1
+                return value
+            metrics["misses"] += 1
+            value = await fetch()
+            if cacheable(value):
+                await self._store(key, value, ttl)
+            return value
+
+        metrics["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if cacheable(value):
+                await self._store(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _store(self, key: str, value: Any, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at)
+
+    def clear(self, endpoint: str | None = None) -> None:
+        prefix = f"{endpoint}:" if endpoint else ""
+        self.memory.clear(prefix)
+        if self.disk is not None:
+            self.disk.clear(prefix)
+        logger.info(f"已清空响应缓存 {endpoint or '全部'}")
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, metrics in self.metrics.items():
+            lookups = sum(metrics.values())
+            hits = metrics["hits"] + metrics["disk_hits"] + metrics["coalesced"]
+            endpoints[endpoint] = dict(
+                metrics, hit_rate=round(hits / lookups, 4) if lookups else 0.0
+            )
+        return {
+            "entries": len(self.memory),
+            "evictions": self.memory.evictions,
+            "inflight": len(self._inflight),
+            "disk": self.disk is not None,
+            "endpoints": endpoints,
+        }
@@ -1,204 +1,393 @@
+import asyncio
 import json
 import os
 import re
-from typing import Dict, Tuple
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
 from loguru import logger
 
+from app.services.blobstore import ArticleManifest
+from app.services.cache import ResponseCache
+from app.services.decoding import extract_articles
+from app.services.freshness import FreshnessTracker
+from app.services.index import ArticleIndex
+from app.services.metrics import (
+    PARSE_SECONDS,
+    STORAGE_WRITE_SECONDS,
+    debug_payload,
+    observe_upstream,
+    span,
+    timed,
+    token_label,
+)
+from app.services.parsing import decode_html, extract_article
+from app.services.pool import RET_FREQ_CONTROL, response_ret
+from app.services.ratelimit import AdaptiveRateController
+from app.services.sessions import SessionRegistry, default_registry
 from app.services.storage import SessionStorage
 
-Session = requests.Session()
-Session.trust_env = False
-HOME_REFERER = (
-    "https://mp.weixin.qq.com/cgi-bin/home?t=home/index&lang=zh_CN&token={token}"
+WX_BASE = "https://mp.weixin.qq.com"
+ANTI_BOT_MARKER = "当前环境异常，完成验证后即可继续访问"
+DELETED_MARKERS = (
+    "该内容已被发布者删除",
+    "此内容因违规无法查看",
+    "此内容被多人投诉，相关的内容无法进行查看",
+    "该公众号已迁移",
 )
 
 
+def search_params(wx_cfg: dict, kw: str, count: int = 5) -> Dict:
+    return {
+        "action": "search_biz",
+        "begin": 0,
+        "count": count,
+        "query": kw,
+        "token": wx_cfg.get("token"),
+        "lang": "zh_CN",
+        "f": "json",
+        "ajax": "1",
+    }
+
+
+def article_list_params(wx_cfg: dict, fakeid: str, begin: int, count: int) -> Dict:
+    return {
+        "sub": "list",
+        "sub_action": "list_ex",
+        "begin": begin,
+        "count": count,
+        "fakeid": fakeid,
+        "token": wx_cfg.get("token"),
+        "lang": "zh_CN",
+        "f": "json",
+        "ajax": 1,
+    }
+
+
+def parse_json_response(resp) -> dict:
+    try:
+        return resp.json()
+    except Exception:
+        return {"raw": resp.text}
+
+
+def is_ok_response(data: dict) -> bool:
+    return isinstance(data, dict) and (data.get("base_resp") or {}).get("ret") == 0
+
+
+def response_outcome(status_code: int, data: dict) -> str:
+    if status_code == 429 or response_ret(data) == RET_FREQ_CONTROL:
+        return "throttled"
+    if isinstance(data, dict) and is_blocked_page(str(data.get("raw") or "")):
+        return "blocked"
+    if status_code == 200 and is_ok_response(data):
+        return "ok"
+    return "error"
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"\s+", "", name or "").casefold()
+
+
+def rank_candidates(name: str | None, data: dict) -> List[Dict[str, Any]]:
+    items = data.get("list") if isinstance(data, dict) else None
+    target = normalize_name(name or "")
+    ranked = []
+    for position, item in enumerate(items or []):
+        if not isinstance(item, dict) or not item.get("fakeid"):
+            continue
+        nickname = item.get("nickname") or ""
+        alias = item.get("alias") or ""
+        if target and target in (normalize_name(nickname), normalize_name(alias)):
+            score = 2
+        elif target and target in normalize_name(nickname):
+            score = 1
+        else:
+            score = 0
+        ranked.append(
+            {
+                "fakeid": item["fakeid"],
+                "nickname": nickname,
+                "alias": alias,
+                "signature": item.get("signature"),
+                "service_type": item.get("service_type"),
+                "exact": score == 2,
+                "score": score,
+                "position": position,
+            }
+        )
+    ranked.sort(key=lambda c: (-c["score"], c["position"]))
+    return ranked
+
+
+def pick_fakeid(data: dict, name: str | None = None) -> Optional[str]:
+    candidates = rank_candidates(name, data)
+    if not candidates:
+        logger.error("未获取到 fakeid")
+        return None
+    fakeid = candidates[0]["fakeid"]
+    logger.info(f"获取到 fakeid: {fakeid}")
+    return fakeid
+
+
+def search_record(kw: str, data: dict) -> Dict[str, Any]:
+    return {"query": kw, "fetched_at": int(time.time()), "response": data}
+
+
+def is_blocked_page(html: str) -> bool:
+    return ANTI_BOT_MARKER in html
+
+
+def is_deleted_page(html: str) -> bool:
+    return 'id="js_content"' not in html and any(m in html for m in DELETED_MARKERS)
+
+
+def parse_article_html(html: str) -> Dict:
+    logger.info("开始解析文章内容")
+    data = extract_article(html)
+    if data["biz"]:
+        logger.info(f"找到公众号{data['author']} fakeid: {data['biz']}")
+    else:
+        logger.warning("查找公众号失败")
+    return data
+
+
 class WechatClient:
-    def __init__(self, storage: SessionStorage) -> None:
+    def __init__(
+        self,
+        storage: SessionStorage,
+        registry: SessionRegistry | None = None,
+        base_url: str = WX_BASE,
+    ) -> None:
         self.storage = storage
+        self.registry = registry or default_registry()
+        self.base_url = base_url.rstrip("/")
+
+    def _get(self, wx_cfg: dict, endpoint: str, params: Dict):
+        session = self.registry.get(wx_cfg).session
+        started = time.perf_counter()
+        with span(f"wechat.{endpoint}"):
+            resp = session.get(f"{self.base_url}/cgi-bin/{endpoint}", params=params)
+        elapsed = time.perf_counter() - started
+        observe_upstream(endpoint, resp.status_code, elapsed, len(resp.content))
+        logger.info(f"{endpoint} status={resp.status_code}")
+        debug_payload(endpoint, resp.text)
+        return resp
 
     def get_fakeid_by_name(
-        self, wx_cfg: dict, kw: str
+        self, wx_cfg: dict, kw: str, count: int = 5
     ) -> Tuple[str | None, dict | None]:
-        url = "https://mp.weixin.qq.com/cgi-bin/searchbiz"
-        params = {
-            "action": "search_biz",
-            "begin": 0,
-            "count": 5,
-            "query": kw,
-            "token": wx_cfg.get("token"),
-            "lang": "zh_CN",
-            "f": "json",
-            "ajax": "1",
-        }
-        token = wx_cfg.get("token")
-        if not token:
-            logger.warning("token 为空，可能导致 invalid args")
-        headers = {
-            "Cookie": wx_cfg.get("cookies_str"),
-            "User-Agent": wx_cfg.get("user_agent"),
-            "Referer": HOME_REFERER.format(token=token or ""),
-            "Accept": "application/json, text/plain, */*",
-        }
-        Session.headers.update(headers)
-        resp = Session.get(url, params=params)
-        logger.info(f"searchbiz status={resp.status_code}")
-        logger.debug(f"searchbiz response={resp.text}")
-        try:
-            data = resp.json()
-        except Exception:
-            data = {"raw": resp.text}
-        with open("searchbiz_result.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        try:
-            fakeid = data.get("list", [{}])[0].get("fakeid")
-            logger.info(f"获取到 fakeid: {fakeid}")
-            return fakeid, data
-        except Exception:
-            logger.error("未获取到 fakeid")
-            return None, data
+        resp = self._get(wx_cfg, "searchbiz", search_params(wx_cfg, kw, count))
+        data = parse_json_response(resp)
+        self.storage.append_search_result(search_record(kw, data))
+        return pick_fakeid(data, kw), data
 
     def get_article_list(
         self, wx_cfg: dict, fakeid: str, begin: int = 0, count: int = 5
     ) -> dict:
-        url = "https://mp.weixin.qq.com/cgi-bin/appmsgpublish"
-        params = {
-            "sub": "list",
-            "sub_action": "list_ex",
-            "begin": begin,
-            "count": count,
-            "fakeid": fakeid,
-            "token": wx_cfg.get("token"),
-            "lang": "zh_CN",
-            "f": "json",
-            "ajax": 1,
-        }
-        token = wx_cfg.get("token")
-        if not token:
-            logger.warning("token 为空，可能导致 invalid args")
-        headers = {
-            "Cookie": wx_cfg.get("cookies_str"),
-            "User-Agent": wx_cfg.get("user_agent"),
-            "Referer": HOME_REFERER.format(token=token or ""),
-            "Accept": "application/json, text/plain, */*",
-        }
-        Session.headers.update(headers)
-        resp = Session.get(url, params=params, headers=headers)
-        logger.info(f"appmsgpublish status={resp.status_code}")
-        logger.debug(f"appmsgpublish response={resp.text}")
+        params = article_list_params(wx_cfg, fakeid, begin, count)
+        resp = self._get(wx_cfg, "appmsgpublish", params)
+        data = parse_json_response(resp)
+        self.storage.append_result(data)
+        return data
+
+
+class AsyncWechatClient:
+    def __init__(
+        self,
+        storage: SessionStorage,
+        registry: SessionRegistry | None = None,
+        base_url: str = WX_BASE,
+        per_host_limit: int = 100,
+        cache: ResponseCache | None = None,
+        limiter: AdaptiveRateController | None = None,
+    ) -> None:
+        self.storage = storage
+        self.registry = registry or default_registry()
+        self.base_url = base_url.rstrip("/")
+        self.per_host_limit = per_host_limit
+        self.limiter = limiter
+        self.cache = cache
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def aclose(self) -> None:
+        await self.registry.aclose()
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return slot
+
+    async def _get(self, wx_cfg: dict, url: str, **kwargs) -> httpx.Response:
+        identity = self.registry.get(wx_cfg)
+        identity.inflight += 1
         try:
-            data = resp.json()
-        except Exception:
-            data = {"raw": resp.text}
-        self.storage.append_json_result("appmsgpublish_result.json", data)
+            async with self._host_slot(url):
+                return await identity.client.get(url, **kwargs)
+        finally:
+            identity.inflight -= 1
+            await self.registry.reap()
+
+    async def _request(self, wx_cfg: dict, endpoint: str, params: Dict) -> dict:
+        session = str(wx_cfg.get("token"))
+        if self.limiter is not None:
+            await self.limiter.acquire(session, endpoint)
+        url = f"{self.base_url}/cgi-bin/{endpoint}"
+        started = time.perf_counter()
+        with span(f"wechat.{endpoint}", session=token_label(session)):
+            resp = await self._get(wx_cfg, url, params=params)
+        elapsed = time.perf_counter() - started
+        observe_upstream(endpoint, resp.status_code, elapsed, len(resp.content))
+        logger.info(f"{endpoint} status={resp.status_code}")
+        debug_payload(endpoint, resp.text)
+        data = parse_json_response(resp)
+        if self.limiter is not None:
+            outcome = response_outcome(resp.status_code, data)
+            self.limiter.record(session, endpoint, outcome)
         return data
 
+    async def get_fakeid_by_name(
+        self, wx_cfg: dict, kw: str, count: int = 5
+    ) -> Tuple[str | None, dict | None]:
+        params = search_params(wx_cfg, kw, count)
+
+        async def fetch() -> dict:
+            data = await self._request(wx_cfg, "searchbiz", params)
+            record = search_record(kw, data)
+            await asyncio.to_thread(self.storage.append_search_result, record)
+            return data
+
+        data = await self._cached("searchbiz", params, fetch)
+        return pick_fakeid(data, kw), data
+
+    async def get_article_list(
+        self, wx_cfg: dict, fakeid: str, begin: int = 0, count: int = 5
+    ) -> dict:
+        params = article_list_params(wx_cfg, fakeid, begin, count)
+
+        async def fetch() -> dict:
+            data = await self._request(wx_cfg, "appmsgpublish", params)
+            await asyncio.to_thread(self.storage.append_result, data)
+            return data
+
+        return await self._cached("appmsgpublish", params, fetch)
+
+    async def _cached(self, endpoint: str, params: Dict, fetch) -> dict:
+        if self.cache is None:
+            return await fetch()
+        return await self.cache.get_or_fetch(
+            endpoint, params, fetch, cacheable=is_ok_response
+        )
+
 
 class ArticleService:
-    def __init__(self, storage: SessionStorage | None = None) -> None:
+    def __init__(
+        self,
+        storage: SessionStorage | None = None,
+        registry: SessionRegistry | None = None,
+        index: ArticleIndex | None = None,
+        manifest: ArticleManifest | None = None,
+        tracker: FreshnessTracker | None = None,
+    ) -> None:
         self.storage = storage or SessionStorage()
+        self.registry = registry or default_registry()
+        self.index = index
+        self.manifest = manifest
+        self.tracker = tracker
+
+    def is_stored(self, url: str) -> bool:
+        return self.manifest is not None and self.manifest.contains(url)
+
+    def needs_fetch(self, url: str) -> bool:
+        if self.tracker is not None:
+            return self.tracker.is_due(url)
+        return not self.is_stored(url)
 
     def extract_title_url(
         self,
-        input_file: str = "appmsgpublish_result.json",
+        input_file: str | None = None,
         output_file: str = "title_url_map.json",
     ) -> None:
         result = {}
-        with open(input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        data_list = [data] if isinstance(data, dict) else data
-
-        for entry in data_list:
-            publish_page = entry.get("publish_page")
-            if not publish_page:
-                continue
-            try:
-                page_obj = json.loads(publish_page)
-            except Exception:
-                continue
-            for pub in page_obj.get("publish_list", []):
-                try:
-                    info_obj = json.loads(pub.get("publish_info", "{}"))
-                except Exception:
-                    continue
-                for appmsg in info_obj.get("appmsgex", []):
-                    title = appmsg.get("title")
-                    link = appmsg.get("link")
-                    if title and link:
-                        link = link.replace("\\/", "/").replace("\\\\/", "/")
-                        result[title] = link
+        for entry in self.storage.iter_results(input_file):
+            for appmsg in extract_articles(entry):
+                title = appmsg.get("title")
+                link = appmsg.get("link")
+                if title and link:
+                    link = link.replace("\\/", "/").replace("\\\\/", "/")
+                    result[title] = link
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(result, f, ensure_ascii=False, indent=2)
         logger.info(f"已保存 title->URL 到 {output_file}")
 
     def fetch_article_details(self, url: str, timeout: int) -> Dict:
-        headers = {
-            "Referer": "https://mp.weixin.qq.com/",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-        }
         url = url.strip()
-        Session.headers.update(headers)
         logger.info("开始请求公众号文章详情")
-        resp = Session.get(url, timeout=timeout)
+        started = time.perf_counter()
+        resp = self.registry.anonymous().session.get(url, timeout=timeout)
+        elapsed = time.perf_counter() - started
+        observe_upstream("article", resp.status_code, elapsed, len(resp.content))
         if resp.status_code == 200:
             logger.info("请求成功")
         else:
             logger.error("请求失败")
             return {"status": 0}
-        resp.encoding = resp.apparent_encoding
-        status = re.search("当前环境异常，完成验证后即可继续访问", resp.text)
-        if status:
+        html = decode_html(resp.content, resp.headers.get("Content-Type"))
+        if is_blocked_page(html):
             logger.error("环境异常,程序执行失败")
             return {}
-        html = resp.text
-        soup = BeautifulSoup(html, "lxml")
-        logger.info("开始解析文章内容")
-        content = soup.find("div", class_="rich_media_content").get_text(
-            "\n", strip=True
-        )
-        title = soup.find(
-            "h1", {"class": "rich_media_title", "id": "activity-name"}
-        ).get_text(strip=True)
-        author = soup.find("a", {"id": "js_name"}).get_text(strip=True)
-        biz = (
-            re.search(r'var biz\s*=\s*"(.*?)";', html)
-            .group(1)
-            .replace('" || "', "")
-            .replace('"', "")
-        )
-        if biz:
-            logger.info(f"找到公众号{author} fakeid: {biz}")
+        if is_deleted_page(html):
+            logger.warning("文章已被删除或无法查看")
+            if self.tracker is not None:
+                self.tracker.record_deleted(url)
+            return {"status": 0}
+        if self.tracker is not None:
+            self.tracker.record_validators(
+                url, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            )
+        with timed(PARSE_SECONDS, "inline"), span("article.parse"):
+            data = parse_article_html(html)
+        self.save_article(url, html, data)
+        return data
+
+    def save_article(
+        self, url: str, html: str, data: Dict, write_html: bool = True
+    ) -> None:
+        if self.tracker is not None and url and write_html:
+            if self.tracker.record_content(url, data) == "unchanged":
+                return
+        if self.manifest is not None:
+            with timed(STORAGE_WRITE_SECONDS, "blobs"):
+                self.manifest.save_article(url, html, data, write_html)
         else:
-            biz = ""
-            logger.warning("查找公众号失败")
-        create_time = re.search(r"var createTime = '(.*?)';", html).group(1)
+            with timed(STORAGE_WRITE_SECONDS, "files"):
+                self._write_files(html, data, write_html)
+        if self.index is not None and url:
+            with timed(STORAGE_WRITE_SECONDS, "index"):
+                self.index.upsert_details(url, data)
+
+    def _write_files(self, html: str, data: Dict, write_html: bool) -> None:
+        author, title = data["author"], data["title"]
+        create_time = data["create_time"]
         os.makedirs("HTML", exist_ok=True)
         os.makedirs("TEXT", exist_ok=True)
         os.makedirs("DocJson", exist_ok=True)
         file_name = re.sub(r'[\\/:*?"<>|]', "_", f"{author}-{title}-{create_time}.html")
         html_path = os.path.join("HTML", file_name)
-        logger.info(f"保存HTML源码到 {os.path.abspath(html_path)}")
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html)
+        if write_html:
+            logger.info(f"保存HTML源码到 {os.path.abspath(html_path)}")
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(html)
         file_name = re.sub(r'[\\/:*?"<>|]', "_", f"{author}-{title}-{create_time}.txt")
         text_path = os.path.join("TEXT", file_name)
         logger.info(f"保存文章文本到 {os.path.abspath(text_path)}")
         with open(text_path, "w", encoding="utf-8") as f:
-            f.write(content)
+            f.write(data["content"])
         file_name = f"{author} {title}"
         json_path = os.path.join("DocJson", file_name)
-        data = {
-            "status": 1,
-            "content": content,
-            "title": title,
-            "author": author,
-            "create_time": create_time,
-            "biz": biz,
-        }
         with open(json_path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
-        return data
@@ -0,0 +1,155 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.services.clawlers import AsyncWechatClient
+from app.services.decoding import decode_page
+from app.services.index import ArticleIndex
+from app.services.pool import NoSessionAvailable, SessionPool, response_ret
+from app.services.storage import CheckpointStore
+
+Mark = Tuple[int, int]
+
+
+def article_mark(appmsg: dict) -> Mark:
+    try:
+        create_time = int(appmsg.get("create_time") or 0)
+    except (TypeError, ValueError):
+        create_time = 0
+    try:
+        msgid = int(appmsg.get("appmsgid") or 0)
+    except (TypeError, ValueError):
+        msgid = 0
+    return create_time, msgid
+
+
+def page_groups(raw: Any) -> Tuple[Optional[List[List[dict]]], Optional[int]]:
+    ret = response_ret(raw)
+    if ret != 0:
+        return None, ret
+    return decode_page(raw), ret
+
+
+def _mark_from(checkpoint: dict, prefix: str) -> Optional[Mark]:
+    if checkpoint.get(f"{prefix}_time") is None:
+        return None
+    return (
+        int(checkpoint[f"{prefix}_time"]),
+        int(checkpoint.get(f"{prefix}_msgid") or 0),
+    )
+
+
+class HistoryCrawler:
+    def __init__(
+        self,
+        client: AsyncWechatClient,
+        checkpoints: CheckpointStore,
+        page_size: int = 20,
+        page_delay: float = 1.0,
+        index: ArticleIndex | None = None,
+        pool: SessionPool | None = None,
+    ) -> None:
+        self.client = client
+        self.checkpoints = checkpoints
+        self.page_size = page_size
+        self.page_delay = page_delay
+        self.index = index
+        self.pool = pool
+
+    async def fetch_page(self, wx_cfg: dict | None, fakeid: str, begin: int) -> dict:
+        if wx_cfg is not None or self.pool is None:
+            return await self.client.get_article_list(
+                wx_cfg or {}, fakeid, begin=begin, count=self.page_size
+            )
+        session = self.pool.acquire()
+        if session is None:
+            raise NoSessionAvailable("没有可用的登录会话")
+        raw = None
+        try:
+            raw = await self.client.get_article_list(
+                session.wx_cfg, fakeid, begin=begin, count=self.page_size
+            )
+            return raw
+        finally:
+            self.pool.release(session, raw, failed=raw is None)
+
+    async def crawl(
+        self, wx_cfg: dict | None, fakeid: str, max_pages: int | None = None
+    ) -> Dict[str, Any]:
+        checkpoint = self.checkpoints.load(fakeid)
+        seen = _mark_from(checkpoint, "newest")
+        pending = _mark_from(checkpoint, "pending")
+        begin = int(checkpoint.get("cursor") or 0)
+        if begin:
+            logger.info(f"{fakeid} 从断点 begin={begin} 继续抓取")
+
+        new_items: List[dict] = []
+        pages = 0
+        complete = False
+        while max_pages is None or pages < max_pages:
+            if pages and self.page_delay:
+                await asyncio.sleep(self.page_delay)
+            raw = await self.fetch_page(wx_cfg, fakeid, begin)
+            pages += 1
+            groups, ret = page_groups(raw)
+            if groups is None:
+                logger.error(f"{fakeid} 翻页失败 begin={begin} ret={ret}")
+                break
+            if not groups:
+                complete = True
+                break
+
+            reached = False
+            page_items: List[dict] = []
+            for group in groups:
+                for appmsg in group:
+                    mark = article_mark(appmsg)
+                    if seen is not None and mark <= seen:
+                        reached = True
+                        break
+                    page_items.append(appmsg)
+                    if pending is None or mark > pending:
+                        pending = mark
+                if reached:
+                    break
+            new_items.extend(page_items)
+            if self.index is not None and page_items:
+                await asyncio.to_thread(self.index.upsert_appmsgs, fakeid, page_items)
+            begin += len(groups)
+            if reached or len(groups) < self.page_size:
+                complete = True
+                break
+            self.checkpoints.save(
+                fakeid, self._checkpoint(seen, pending, cursor=begin)
+            )
+
+        if complete:
+            marks = [m for m in (seen, pending) if m is not None]
+            newest = max(marks) if marks else None
+            checkpoint = self._checkpoint(newest, None, cursor=None)
+        else:
+            checkpoint = self._checkpoint(seen, pending, cursor=begin)
+        self.checkpoints.save(fakeid, checkpoint)
+        logger.info(
+            f"{fakeid} 抓取结束: pages={pages} new={len(new_items)} complete={complete}"
+        )
+        return {
+            "fakeid": fakeid,
+            "pages": pages,
+            "complete": complete,
+            "items": new_items,
+            "checkpoint": checkpoint,
+        }
+
+    @staticmethod
+    def _checkpoint(
+        newest: Optional[Mark], pending: Optional[Mark], cursor: Optional[int]
+    ) -> Dict[str, Any]:
+        return {
+            "newest_time": newest[0] if newest else None,
+            "newest_msgid": newest[1] if newest else None,
+            "pending_time": pending[0] if pending else None,
+            "pending_msgid": pending[1] if pending else None,
+            "cursor": cursor,
+        }
@@ -0,0 +1,127 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if msgspec is not None:
+
+    class PublishEntry(msgspec.Struct):
+        publish_info: Optional[str] = None
+
+    class PublishPage(msgspec.Struct):
+        publish_list: List[PublishEntry] = []
+
+    class PublishInfo(msgspec.Struct):
+        appmsgex: List[Dict[str, Any]] = []
+
+
+def available_backends() -> List[str]:
+    found = []
+    if orjson is not None:
+        found.append("orjson")
+    if msgspec is not None:
+        found.append("msgspec")
+    found.append("json")
+    return found
+
+
+def _loader(backend: str) -> Callable[[Any], Any]:
+    if backend == "msgspec":
+        return msgspec.json.decode
+    if backend == "orjson":
+        return orjson.loads
+    return json.loads
+
+
+class PublishDecoder:
+    def __init__(self, backend: str | None = None) -> None:
+        backend = backend or available_backends()[0]
+        if backend not in available_backends():
+            raise ValueError(f"JSON 解码后端不可用: {backend}")
+        self.backend = backend
+        self.loads = _loader(backend)
+        self._typed = backend == "msgspec"
+        if self._typed:
+            self._page = msgspec.json.Decoder(PublishPage)
+            self._info = msgspec.json.Decoder(PublishInfo)
+
+    def _publish_infos(self, publish_page: Any) -> Optional[List[Optional[str]]]:
+        if self._typed:
+            try:
+                page = self._page.decode(publish_page)
+                return [entry.publish_info for entry in page.publish_list]
+            except msgspec.ValidationError:
+                pass
+        page = self.loads(publish_page)
+        if not isinstance(page, dict):
+            return None
+        entries = page.get("publish_list") or []
+        return [e.get("publish_info") if isinstance(e, dict) else None for e in entries]
+
+    def _appmsgs(self, publish_info: Any) -> List[Dict[str, Any]]:
+        if self._typed:
+            try:
+                return self._info.decode(publish_info).appmsgex
+            except msgspec.ValidationError:
+                pass
+        info = self.loads(publish_info)
+        if not isinstance(info, dict):
+            return []
+        return info.get("appmsgex") or []
+
+    def decode_page(self, raw: Any) -> Optional[List[List[Dict[str, Any]]]]:
+        if not isinstance(raw, dict):
+            return None
+        publish_page = raw.get("publish_page")
+        if not publish_page or not isinstance(publish_page, (str, bytes)):
+            return None
+        try:
+            infos = self._publish_infos(publish_page)
+        except ValueError:
+            return None
+        if infos is None:
+            return None
+        groups = []
+        for publish_info in infos:
+            appmsgs: List[Dict[str, Any]] = []
+            if publish_info:
+                try:
+                    appmsgs = self._appmsgs(publish_info)
+                except ValueError:
+                    pass
+            groups.append(appmsgs)
+        return groups
+
+    def publish_groups(self, raw: Any) -> List[List[Dict[str, Any]]]:
+        return self.decode_page(raw) or []
+
+    def extract_articles(self, raw: Any) -> List[Dict[str, Any]]:
+        return [a for group in self.publish_groups(raw) for a in group]
+
+
+default_decoder = PublishDecoder()
+
+
+def loads(data: str | bytes) -> Any:
+    return default_decoder.loads(data)
+
+
+def decode_page(raw: Any) -> Optional[List[List[Dict[str, Any]]]]:
+    return default_decoder.decode_page(raw)
+
+
+def publish_groups(raw: Any) -> List[List[Dict[str, Any]]]:
+    return default_decoder.publish_groups(raw)
+
+
+def extract_articles(raw: Any) -> List[Dict[str, Any]]:
+    return default_decoder.extract_articles(raw)
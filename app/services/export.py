@@ -0,0 +1,72 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from loguru import logger
+
+from app.services.crawler import HistoryCrawler, page_groups
+from app.services.index import ArticleIndex
+
+
+def parse_fields(fields: str | None) -> Optional[list[str]]:
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()] or None
+
+
+def project(item: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return item
+    return {f: item.get(f) for f in fields}
+
+
+def ndjson(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def stream_upstream(
+    crawler: HistoryCrawler,
+    fakeid: str,
+    fields: Optional[list[str]] = None,
+    include_raw: bool = False,
+    begin: int = 0,
+    max_pages: int | None = None,
+) -> AsyncIterator[bytes]:
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        if pages and crawler.page_delay:
+            await asyncio.sleep(crawler.page_delay)
+        raw = await crawler.fetch_page(None, fakeid, begin)
+        pages += 1
+        groups, ret = page_groups(raw)
+        if groups is None:
+            logger.error(f"{fakeid} 导出翻页失败 begin={begin} ret={ret}")
+            yield ndjson({"_error": {"begin": begin, "ret": ret}})
+            return
+        if include_raw:
+            yield ndjson({"_page": {"begin": begin, "raw": raw}})
+        for group in groups:
+            for appmsg in group:
+                yield ndjson(project(appmsg, fields))
+        if len(groups) < crawler.page_size:
+            return
+        begin += len(groups)
+
+
+async def stream_index(
+    index: ArticleIndex,
+    fakeid: str | None = None,
+    since: int | None = None,
+    until: int | None = None,
+    fields: Optional[list[str]] = None,
+    batch_size: int = 500,
+) -> AsyncIterator[bytes]:
+    after = None
+    while True:
+        rows, after = await asyncio.to_thread(
+            index.scan, fakeid, since, until, after, batch_size
+        )
+        for row in rows:
+            yield ndjson(project(row, fields))
+        if after is None:
+            return
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+
+from app.services.clawlers import ArticleService, is_blocked_page, is_deleted_page
+from app.services.parsing import decode_html
+from app.services.pipeline import ParsePipeline
+from app.services.metrics import observe_upstream
+from app.services.ratelimit import AdaptiveRateController, TokenBucket, backoff_delay
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def load_urls(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [line.strip() for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        return [str(v).strip() for v in data.values() if v]
+    return [str(v).strip() for v in data if v]
+
+
+class FetchStats:
+    def __init__(self, total: int = 0) -> None:
+        self.total = total
+        self.ok = 0
+        self.failed = 0
+        self.skipped = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.retries = 0
+        self.blocked = 0
+        self.bytes = 0
+        self.in_flight = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.paused_until = 0.0
+        self.parse: Dict[str, Any] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = max(end - self.started_at, 1e-6)
+        done = self.ok + self.failed + self.skipped + self.unchanged + self.removed
+        return {
+            "total": self.total,
+            "done": done,
+            "ok": self.ok,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+            "retries": self.retries,
+            "blocked": self.blocked,
+            "bytes": self.bytes,
+            "in_flight": self.in_flight,
+            "elapsed": round(elapsed, 3),
+            "articles_per_sec": round(done / elapsed, 3),
+            "bytes_per_sec": round(self.bytes / elapsed, 1),
+            "paused": time.time() < self.paused_until,
+            "finished": self.finished_at is not None,
+            "parse": self.parse,
+        }
+
+
+class BulkFetcher:
+    def __init__(
+        self,
+        service: ArticleService,
+        concurrency: int = 8,
+        rate_per_host: float = 2.0,
+        burst: float = 4.0,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+        block_pause: float = 300.0,
+        timeout: float = 15.0,
+        progress_interval: float = 10.0,
+        pipeline: ParsePipeline | None = None,
+        skip_stored: bool = True,
+        limiter: AdaptiveRateController | None = None,
+    ) -> None:
+        self.service = service
+        self.pipeline = pipeline or ParsePipeline(service)
+        self.skip_stored = skip_stored
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.block_pause = block_pause
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self.stats = FetchStats()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self.lock = asyncio.Lock()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        return bucket
+
+    async def _acquire(self, url: str) -> None:
+        if self.limiter is None:
+            await self._bucket(url).acquire()
+            return
+        await self.limiter.acquire(urlsplit(url).netloc, "article")
+
+    def _record(self, url: str, outcome: str) -> None:
+        if self.limiter is not None:
+            self.limiter.record(urlsplit(url).netloc, "article", outcome)
+
+    async def _pause(self) -> None:
+        if not self._resume.is_set():
+            return
+        self._resume.clear()
+        for bucket in self._buckets.values():
+            bucket.hold(self.block_pause)
+        self.stats.blocked += 1
+        self.stats.paused_until = time.time() + self.block_pause
+        logger.error(f"触发环境异常验证，全局暂停 {self.block_pause:.0f}s")
+        await asyncio.sleep(self.block_pause)
+        self._resume.set()
+
+    async def _download(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Dict[str, str] | None = None,
+    ) -> Optional[Tuple[httpx.Response, Optional[str]]]:
+        attempt = 0
+        while True:
+            await self._resume.wait()
+            await self._acquire(url)
+            retry = False
+            try:
+                started = time.perf_counter()
+                resp = await client.get(url, timeout=self.timeout, headers=headers)
+                size = len(resp.content)
+                elapsed = time.perf_counter() - started
+                observe_upstream("article", resp.status_code, elapsed, size)
+                self.stats.bytes += size
+                if resp.status_code == 304:
+                    self._record(url, "ok")
+                    return resp, None
+                if resp.status_code == 200:
+                    html = decode_html(
+                        resp.content, resp.headers.get("Content-Type")
+                    )
+                    if not is_blocked_page(html):
+                        self._record(url, "ok")
+                        return resp, html
+                    self._record(url, "blocked")
+                    await self._pause()
+                    if attempt >= self.max_retries:
+                        logger.error(f"多次遇到环境异常验证页，放弃 url={url}")
+                        return None
+                    attempt += 1
+                    self.stats.retries += 1
+                    continue
+                retry = resp.status_code in RETRY_STATUS
+                self._record(url, "throttled" if resp.status_code == 429 else "error")
+                logger.warning(f"请求失败 status={resp.status_code} url={url}")
+            except httpx.HTTPError as e:
+                retry = True
+                logger.warning(f"请求异常 {type(e).__name__} url={url}")
+            if not retry or attempt >= self.max_retries:
+                return None
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+            attempt += 1
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+
+    def _parsed(self, future: asyncio.Future) -> None:
+        if future.result() is None:
+            self.stats.failed += 1
+        else:
+            self.stats.ok += 1
+
+    async def fetch_one(
+        self, client: httpx.AsyncClient, url: str
+    ) -> Optional[asyncio.Future]:
+        tracker = self.service.tracker
+        if self.skip_stored and not await asyncio.to_thread(
+            self.service.needs_fetch, url
+        ):
+            self.stats.skipped += 1
+            return None
+        headers = None
+        if tracker is not None and self.skip_stored:
+            headers = await asyncio.to_thread(tracker.conditional_headers, url)
+        self.stats.in_flight += 1
+        try:
+            result = await self._download(client, url, headers)
+        finally:
+            self.stats.in_flight -= 1
+        if result is None:
+            self.stats.failed += 1
+            return None
+        resp, html = result
+        if html is None:
+            self.stats.unchanged += 1
+            if tracker is not None:
+                await asyncio.to_thread(tracker.record_not_modified, url)
+            return None
+        if is_deleted_page(html):
+            self.stats.removed += 1
+            if tracker is not None:
+                await asyncio.to_thread(tracker.record_deleted, url)
+            return None
+        if tracker is not None:
+            await asyncio.to_thread(
+                tracker.record_validators,
+                url,
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+            )
+        future = await self.pipeline.submit(url, html)
+        future.add_done_callback(self._parsed)
+        return future
+
+    def snapshot(self) -> Dict[str, Any]:
+        self.stats.parse = self.pipeline.stats()
+        return self.stats.snapshot()
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            logger.info(f"批量抓取进度: {self.snapshot()}")
+
+    async def run(self, urls: Iterable[str]) -> List[Optional[Dict]]:
+        urls = [u.strip() for u in urls if u and u.strip()]
+        self.stats = FetchStats(total=len(urls))
+        pending: List[Optional[asyncio.Future]] = [None] * len(urls)
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(urls):
+            queue.put_nowait(item)
+        client = self.service.registry.anonymous().client
+
+        async def worker() -> None:
+            while True:
+                try:
+                    i, url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                pending[i] = await self.fetch_one(client, url)
+
+        reporter = asyncio.create_task(self._report())
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            await self.pipeline.join()
+        finally:
+            reporter.cancel()
+            self.stats.finished_at = time.time()
+        logger.info(f"批量抓取完成: {self.snapshot()}")
+        return [f.result() if f is not None else None for f in pending]
+
+    async def close(self) -> None:
+        await self.pipeline.close()
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.services.blobstore import article_id
+
+FRESHNESS_DB = os.path.join("cfg", "freshness.db")
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+HASH_FIELDS = ("title", "author", "content")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS freshness (
+    article_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    published_at REAL,
+    first_seen REAL NOT NULL,
+    fetched_at REAL,
+    checked_at REAL,
+    next_check REAL NOT NULL,
+    unchanged INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'live'
+);
+CREATE INDEX IF NOT EXISTS idx_freshness_next_check ON freshness (next_check);
+CREATE TABLE IF NOT EXISTS article_versions (
+    article_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    content_hash TEXT,
+    title TEXT,
+    fetched_at REAL NOT NULL,
+    data BLOB,
+    PRIMARY KEY (article_id, version)
+);
+"""
+
+
+def content_hash(data: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        [data.get(k) for k in HASH_FIELDS], ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_publish_time(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+class FreshnessTracker:
+    def __init__(
+        self,
+        path: str = FRESHNESS_DB,
+        min_interval: float = 3600.0,
+        max_interval: float = 30 * 86400.0,
+        age_factor: float = 0.25,
+        keep_versions: bool = True,
+    ) -> None:
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.age_factor = age_factor
+        self.keep_versions = keep_versions
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def interval(
+        self, published_at: float | None, unchanged: int = 0, now: float | None = None
+    ) -> float:
+        now = time.time() if now is None else now
+        age = max(now - published_at, 0.0) if published_at else 0.0
+        base = max(age * self.age_factor, self.min_interval)
+        return min(base * 2 ** min(unchanged, 6), self.max_interval)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM freshness WHERE article_id = ?", (article_id(url),)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def is_due(self, url: str, now: float | None = None) -> bool:
+        entry = self.get(url)
+        if entry is None:
+            return True
+        return entry["next_check"] <= (time.time() if now is None else now)
+
+    def due_urls(
+        self, limit: int | None = None, now: float | None = None
+    ) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT url FROM freshness WHERE next_check <= ? AND status = 'live' "
+            "ORDER BY next_check LIMIT ?",
+            (time.time() if now is None else now, -1 if limit is None else limit),
+        )
+        return [row["url"] for row in rows]
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        entry = self.get(url)
+        headers = {}
+        if entry is not None and entry["status"] == "live":
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_validators(
+        self, url: str, etag: str | None, last_modified: str | None
+    ) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO freshness (article_id, url, etag, last_modified, "
+                "first_seen, next_check) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (article_id) DO UPDATE SET "
+                "etag = excluded.etag, last_modified = excluded.last_modified",
+                (article_id(url), url, etag, last_modified, now, now),
+            )
+
+    def record_not_modified(self, url: str) -> None:
+        self._touch(url, unchanged=True)
+        logger.debug(f"文章未修改(304) {url}")
+
+    def _touch(self, url: str, unchanged: bool) -> None:
+        entry = self.get(url)
+        if entry is None:
+            return
+        now = time.time()
+        streak = entry["unchanged"] + 1 if unchanged else 0
+        published = entry["published_at"] or entry["first_seen"]
+        next_check = now + self.interval(published, streak, now)
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE freshness SET checked_at = ?, unchanged = ?, next_check = ? "
+                "WHERE article_id = ?",
+                (now, streak, next_check, entry["article_id"]),
+            )
+
+    def _add_version(
+        self,
+        conn: sqlite3.Connection,
+        aid: str,
+        version: int,
+        status: str,
+        digest: str | None,
+        data: Dict[str, Any] | None,
+        now: float,
+    ) -> None:
+        blob = None
+        if data is not None and self.keep_versions:
+            blob = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        conn.execute(
+            "INSERT OR REPLACE INTO article_versions (article_id, version, status, "
+            "content_hash, title, fetched_at, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (aid, version, status, digest, (data or {}).get("title"), now, blob),
+        )
+
+    def record_content(self, url: str, data: Dict[str, Any]) -> str:
+        aid = article_id(url)
+        digest = content_hash(data)
+        entry = self.get(url)
+        if (
+            entry is not None
+            and entry["status"] == "live"
+            and entry["content_hash"] == digest
+        ):
+            self._touch(url, unchanged=True)
+            logger.debug(f"文章内容未变化 {aid}")
+            return "unchanged"
+        now = time.time()
+        published = parse_publish_time(data.get("create_time"))
+        if entry is not None:
+            published = published or entry["published_at"]
+        first_seen = entry["first_seen"] if entry is not None else now
+        version = (entry["version"] if entry is not None else 0) + 1
+        next_check = now + self.interval(published or first_seen, 0, now)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO freshness (article_id, url, content_hash, published_at, "
+                "first_seen, fetched_at, checked_at, next_check, version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (article_id) DO UPDATE SET url = excluded.url, "
+                "content_hash = excluded.content_hash, "
+                "published_at = excluded.published_at, "
+                "fetched_at = excluded.fetched_at, checked_at = excluded.checked_at, "
+                "next_check = excluded.next_check, version = excluded.version, "
+                "unchanged = 0, status = 'live'",
+                (
+                    aid,
+                    url,
+                    digest,
+                    published,
+                    first_seen,
+                    now,
+                    now,
+                    next_check,
+                    version,
+                ),
+            )
+            self._add_version(conn, aid, version, "live", digest, data, now)
+        change = "new" if entry is None or not entry["content_hash"] else "changed"
+        if change == "changed":
+            logger.info(f"文章内容已更新，记录为第 {version} 版 {aid}")
+        return change
+
+    def record_deleted(self, url: str) -> bool:
+        aid = article_id(url)
+        entry = self.get(url)
+        now = time.time()
+        if entry is not None and entry["status"] == "deleted":
+            self._touch(url, unchanged=True)
+            return False
+        version = (entry["version"] if entry is not None else 0) + 1
+        first_seen = entry["first_seen"] if entry is not None else now
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO freshness (article_id, url, first_seen, checked_at, "
+                "next_check, version, status) VALUES (?, ?, ?, ?, ?, ?, 'deleted') "
+                "ON CONFLICT (article_id) DO UPDATE SET "
+                "checked_at = excluded.checked_at, next_check = excluded.next_check, "
+                "version = excluded.version, unchanged = 0, status = 'deleted'",
+                (aid, url, first_seen, now, now + self.max_interval, version),
+            )
+            self._add_version(conn, aid, version, "deleted", None, None, now)
+        logger.warning(f"文章已被删除或无法查看 {aid}")
+        return True
+
+    def versions(self, url: str, include_data: bool = False) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT * FROM article_versions WHERE article_id = ? ORDER BY version",
+            (article_id(url),),
+        )
+        result = []
+        for row in rows:
+            item = dict(row)
+            blob = item.pop("data")
+            if include_data:
+                item["data"] = json.loads(zlib.decompress(blob)) if blob else None
+            result.append(item)
+        return result
+
+    def stats(self, now: float | None = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        conn = self._conn()
+        counts = {
+            row["status"]: row["n"]
+            for row in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM freshness GROUP BY status"
+            )
+        }
+        due = conn.execute(
+            "SELECT COUNT(*) FROM freshness WHERE next_check <= ? AND status = 'live'",
+            (now,),
+        ).fetchone()[0]
+        edited = conn.execute(
+            "SELECT COUNT(*) FROM freshness WHERE version > 1 AND status = 'live'"
+        ).fetchone()[0]
+        return {
+            "tracked": sum(counts.values()),
+            "live": counts.get("live", 0),
+            "deleted": counts.get("deleted", 0),
+            "edited": edited,
+            "due": due,
+        }
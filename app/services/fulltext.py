@@ -0,0 +1,250 @@
+import importlib.util
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+CJK = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+CJK_RE = re.compile(f"[{CJK}]+")
+TOKEN_RE = re.compile(f"[{CJK}]+|[^\\W_{CJK}]+")
+TOKENIZERS = ("bigram", "jieba")
+INDEX_FORMATS = {"bigram": "bigram-v2", "jieba": "jieba"}
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, content, content='', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS articles_fts_docs (
+    rowid INTEGER PRIMARY KEY,
+    title TEXT
+);
+CREATE TABLE IF NOT EXISTS articles_fts_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i : i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize_bigram(text: str | None) -> str:
+    tokens = []
+    for match in TOKEN_RE.finditer(text or ""):
+        run = match.group(0)
+        if not CJK_RE.fullmatch(run):
+            tokens.append(run.lower())
+            continue
+        tokens.extend(bigrams(run))
+        if len(run) > 1:
+            tokens.append(run[-1])
+    return " ".join(tokens)
+
+
+def tokenize_jieba(text: str | None) -> str:
+    import jieba
+
+    return " ".join(w for w in jieba.cut_for_search(text or "") if w.strip())
+
+
+def _phrase(tokens: Sequence[str]) -> str:
+    return '"' + " ".join(t.replace('"', '""') for t in tokens) + '"'
+
+
+def query_terms(q: str, tokenizer: str = "bigram") -> List[str]:
+    if tokenizer == "jieba":
+        import jieba
+
+        return [w for w in jieba.cut_for_search(q) if TOKEN_RE.search(w)]
+    return [m.group(0) for m in TOKEN_RE.finditer(q)]
+
+
+def build_query(q: str, tokenizer: str = "bigram") -> Optional[str]:
+    clauses = []
+    for term in query_terms(q, tokenizer):
+        if tokenizer == "jieba" or not CJK_RE.fullmatch(term):
+            clauses.append(_phrase([term.lower()]))
+        elif len(term) == 1:
+            clauses.append(_phrase([term]) + "*")
+        else:
+            clauses.append(_phrase(bigrams(term)))
+    return " AND ".join(clauses) or None
+
+
+def make_snippet(text: str | None, terms: Iterable[str], width: int = 120) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    terms = sorted({t for t in terms if t}, key=len, reverse=True)
+    if not text or not terms:
+        return text[:width]
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.I)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    end = min(len(text), start + width)
+    window = pattern.sub(lambda m: f"<em>{m.group(0)}</em>", text[start:end])
+    return f"{'...' if start else ''}{window}{'...' if end < len(text) else ''}"
+
+
+class FullTextIndex:
+    def __init__(self, tokenizer: str = "bigram", title_weight: float = 5.0) -> None:
+        if tokenizer not in TOKENIZERS:
+            raise ValueError(f"不支持的分词方式: {tokenizer}")
+        if tokenizer == "jieba" and importlib.util.find_spec("jieba") is None:
+            raise RuntimeError("使用 jieba 分词需要安装 jieba")
+        self.tokenizer = tokenizer
+        self.title_weight = title_weight
+        self._tokenize = tokenize_jieba if tokenizer == "jieba" else tokenize_bigram
+
+    def install(self, conn: sqlite3.Connection) -> None:
+        conn.executescript(SCHEMA)
+        index_format = INDEX_FORMATS[self.tokenizer]
+        row = conn.execute(
+            "SELECT value FROM articles_fts_meta WHERE key = 'tokenizer'"
+        ).fetchone()
+        if row is not None and row[0] != index_format:
+            logger.warning(
+                f"全文索引分词方式由 {row[0]} 改为 {index_format}，已清空索引，需重新建立"
+            )
+            self.clear(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO articles_fts_meta (key, value) "
+            "VALUES ('tokenizer', ?)",
+            (index_format,),
+        )
+        conn.execute(
+            "INSERT INTO articles_fts (articles_fts, rank) VALUES ('rank', ?)",
+            (f"bm25({float(self.title_weight)}, 1.0)",),
+        )
+
+    def clear(self, conn: sqlite3.Connection) -> None:
+        conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('delete-all')")
+        conn.execute("DELETE FROM articles_fts_docs")
+
+    def remove(self, conn: sqlite3.Connection, rowid: int, content: str | None) -> None:
+        row = conn.execute(
+            "SELECT title FROM articles_fts_docs WHERE rowid = ?", (rowid,)
+        ).fetchone()
+        if row is None:
+            return
+        conn.execute(
+            "INSERT INTO articles_fts (articles_fts, rowid, title, content) "
+            "VALUES ('delete', ?, ?, ?)",
+            (rowid, self._tokenize(row[0]), self._tokenize(content)),
+        )
+        conn.execute("DELETE FROM articles_fts_docs WHERE rowid = ?", (rowid,))
+
+    def add(
+        self, conn: sqlite3.Connection, rows: Iterable[Tuple[int, str | None, str]]
+    ) -> int:
+        docs, entries = [], []
+        for rowid, title, content in rows:
+            docs.append((rowid, title))
+            entries.append((rowid, self._tokenize(title), self._tokenize(content)))
+        conn.executemany(
+            "INSERT INTO articles_fts (rowid, title, content) VALUES (?, ?, ?)",
+            entries,
+        )
+        conn.executemany(
+            "INSERT INTO articles_fts_docs (rowid, title) VALUES (?, ?)", docs
+        )
+        return len(docs)
+
+    def backfill(self, conn: sqlite3.Connection, batch_size: int = 2000) -> int:
+        total, after = 0, 0
+        conn.execute(
+            "INSERT INTO articles_fts (articles_fts, rank) VALUES ('automerge', 0)"
+        )
+        try:
+            while True:
+                rows = conn.execute(
+                    "SELECT a.rowid, a.title, a.content FROM articles a "
+                    "LEFT JOIN articles_fts_docs d ON d.rowid = a.rowid "
+                    "WHERE a.rowid > ? AND a.content IS NOT NULL AND d.rowid IS NULL "
+                    "ORDER BY a.rowid LIMIT ?",
+                    (after, batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                with conn:
+                    total += self.add(conn, rows)
+                after = rows[-1][0]
+                logger.info(f"全文索引已写入 {total} 篇")
+        finally:
+            conn.execute(
+                "INSERT INTO articles_fts (articles_fts, rank) VALUES ('automerge', 4)"
+            )
+            conn.commit()
+        return total
+
+    def optimize(self, conn: sqlite3.Connection) -> None:
+        with conn:
+            conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+
+    def merge(self, conn: sqlite3.Connection, pages: int = 500) -> None:
+        with conn:
+            conn.execute(
+                "INSERT INTO articles_fts (articles_fts, rank) VALUES ('merge', ?)",
+                (pages,),
+            )
+
+    def search(
+        self,
+        conn: sqlite3.Connection,
+        q: str,
+        fakeid: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        limit: int = 20,
+        offset: int = 0,
+        snippet_chars: int = 120,
+    ) -> List[Dict[str, Any]]:
+        match = build_query(q, self.tokenizer)
+        if match is None:
+            return []
+        columns = (
+            "a.biz, a.appmsgid, a.itemidx, a.fakeid, a.title, a.link, a.author, "
+            "a.create_time, a.content"
+        )
+        clauses, params = ["articles_fts MATCH ?"], [match]
+        if fakeid:
+            clauses.append("a.fakeid = ?")
+            params.append(fakeid)
+        if since is not None:
+            clauses.append("a.create_time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("a.create_time < ?")
+            params.append(until)
+        if len(clauses) == 1:
+            sql = (
+                f"SELECT {columns}, f.score FROM (SELECT rowid, rank AS score "
+                "FROM articles_fts WHERE articles_fts MATCH ? ORDER BY rank "
+                "LIMIT ? OFFSET ?) f JOIN articles a ON a.rowid = f.rowid "
+                "ORDER BY f.score"
+            )
+        else:
+            sql = (
+                f"SELECT {columns}, articles_fts.rank AS score FROM articles_fts "
+                "JOIN articles a ON a.rowid = articles_fts.rowid "
+                f"WHERE {' AND '.join(clauses)} ORDER BY articles_fts.rank "
+                "LIMIT ? OFFSET ?"
+            )
+        terms = query_terms(q, self.tokenizer)
+        items = []
+        for row in conn.execute(sql, (*params, limit, offset)):
+            item = dict(row)
+            item["snippet"] = make_snippet(item.pop("content"), terms, snippet_chars)
+            item["score"] = round(-item["score"], 4)
+            items.append(item)
+        return items
+
+    def stats(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        docs = conn.execute("SELECT COUNT(*) FROM articles_fts_docs").fetchone()[0]
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM articles a LEFT JOIN articles_fts_docs d "
+            "ON d.rowid = a.rowid WHERE a.content IS NOT NULL AND d.rowid IS NULL"
+        ).fetchone()[0]
+        return {"tokenizer": self.tokenizer, "documents": docs, "pending": pending}
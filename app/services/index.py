@@ -0,0 +1,343 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+
+from app.services.fulltext import FullTextIndex
+
+INDEX_DB = os.path.join("cfg", "articles.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    biz TEXT NOT NULL,
+    appmsgid TEXT NOT NULL,
+    itemidx INTEGER NOT NULL,
+    fakeid TEXT,
+    title TEXT,
+    digest TEXT,
+    link TEXT,
+    cover TEXT,
+    author TEXT,
+    create_time INTEGER,
+    update_time INTEGER,
+    content TEXT,
+    fetched_at INTEGER,
+    meta TEXT,
+    UNIQUE (biz, appmsgid, itemidx)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_fakeid ON articles (fakeid, create_time DESC);
+CREATE INDEX IF NOT EXISTS idx_articles_create_time ON articles (create_time);
+CREATE INDEX IF NOT EXISTS idx_articles_title ON articles (title);
+CREATE INDEX IF NOT EXISTS idx_articles_link ON articles (link);
+"""
+
+COLUMNS = (
+    "biz",
+    "appmsgid",
+    "itemidx",
+    "fakeid",
+    "title",
+    "digest",
+    "link",
+    "cover",
+    "author",
+    "create_time",
+    "update_time",
+    "content",
+    "fetched_at",
+    "meta",
+)
+
+ArticleKey = Tuple[str, str, int]
+
+
+def normalize_link(link: str | None) -> str | None:
+    if not link:
+        return link
+    return link.replace("\\/", "/").replace("\\\\/", "/").strip()
+
+
+def article_key(
+    link: str | None, biz: str | None = None, appmsg: dict | None = None
+) -> Optional[ArticleKey]:
+    appmsg = appmsg or {}
+    query = parse_qs(urlsplit(normalize_link(link) or "").query)
+    biz = (query.get("__biz") or [biz])[0]
+    biz = biz.replace(" ", "+") if biz else biz
+    appmsgid = (query.get("mid") or query.get("appmsgid") or [None])[0]
+    itemidx = (query.get("idx") or query.get("itemidx") or [None])[0]
+    appmsgid = appmsgid or appmsg.get("appmsgid")
+    itemidx = itemidx if itemidx is not None else appmsg.get("itemidx")
+    if not biz or not appmsgid:
+        return None
+    try:
+        return biz, str(appmsgid), int(itemidx or 1)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ArticleIndex:
+    def __init__(
+        self, path: str = INDEX_DB, fulltext: FullTextIndex | None = None
+    ) -> None:
+        self.path = path
+        self.fulltext = fulltext
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            if fulltext is not None:
+                fulltext.install(conn)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _upsert_sql(self, update: Iterable[str]) -> str:
+        placeholders = ", ".join(f":{c}" for c in COLUMNS)
+        assignments = ", ".join(
+            f"{c} = COALESCE(excluded.{c}, {c})" for c in update
+        )
+        return (
+            f"INSERT INTO articles ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+            f"ON CONFLICT (biz, appmsgid, itemidx) DO UPDATE SET {assignments}"
+        )
+
+    def _upsert(self, rows: List[Dict[str, Any]], update: Iterable[str]) -> int:
+        if not rows:
+            return 0
+        full_rows = [{c: row.get(c) for c in COLUMNS} for row in rows]
+        with self._conn() as conn:
+            conn.executemany(self._upsert_sql(update), full_rows)
+        return len(full_rows)
+
+    def upsert_appmsgs(self, fakeid: str, appmsgs: Iterable[dict]) -> int:
+        rows = []
+        for appmsg in appmsgs:
+            link = normalize_link(appmsg.get("link"))
+            key = article_key(link, fakeid, appmsg)
+            if key is None:
+                continue
+            rows.append(
+                {
+                    "biz": key[0],
+                    "appmsgid": key[1],
+                    "itemidx": key[2],
+                    "fakeid": fakeid,
+                    "title": appmsg.get("title"),
+                    "digest": appmsg.get("digest"),
+                    "link": link,
+                    "cover": appmsg.get("cover"),
+                    "author": appmsg.get("author_name") or None,
+                    "create_time": _int(appmsg.get("create_time")),
+                    "update_time": _int(appmsg.get("update_time")),
+                    "meta": json.dumps(appmsg, ensure_ascii=False),
+                }
+            )
+        count = self._upsert(
+            rows,
+            (
+                "fakeid",
+                "title",
+                "digest",
+                "link",
+                "cover",
+                "author",
+                "create_time",
+                "update_time",
+                "meta",
+            ),
+        )
+        logger.debug(f"索引写入 {count} 篇文章 fakeid={fakeid}")
+        return count
+
+    def upsert_details(self, url: str, data: Dict[str, Any]) -> bool:
+        link = normalize_link(url)
+        key = article_key(link, data.get("biz"))
+        if key is None:
+            row = self._conn().execute(
+                "SELECT biz, appmsgid, itemidx FROM articles WHERE link = ?", (link,)
+            ).fetchone()
+            if row is None:
+                logger.warning(f"无法从链接确定文章主键，跳过索引: {link}")
+                return False
+            key = (row["biz"], row["appmsgid"], row["itemidx"])
+        row = {
+            "biz": key[0],
+            "appmsgid": key[1],
+            "itemidx": key[2],
+            "fakeid": data.get("biz") or None,
+            "title": data.get("title"),
+            "link": link,
+            "author": data.get("author"),
+            "create_time": _int(data.get("create_time")),
+            "content": data.get("content"),
+            "fetched_at": int(time.time()),
+        }
+        update = ("title", "author", "create_time", "content", "fetched_at", "fakeid")
+        if self.fulltext is None:
+            self._upsert([row], update)
+            return True
+        where = "WHERE biz = ? AND appmsgid = ? AND itemidx = ?"
+        with self._conn() as conn:
+            old = conn.execute(
+                f"SELECT rowid, content FROM articles {where}", key
+            ).fetchone()
+            if old is not None:
+                self.fulltext.remove(conn, old["rowid"], old["content"])
+            conn.execute(self._upsert_sql(update), {c: row.get(c) for c in COLUMNS})
+            new = conn.execute(
+                f"SELECT rowid, title, content FROM articles {where}", key
+            ).fetchone()
+            if new["content"] is not None:
+                self.fulltext.add(conn, [(new["rowid"], new["title"], new["content"])])
+        return True
+
+    def bulk_upsert_details(self, pairs: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        return sum(1 for url, data in pairs if self.upsert_details(url, data))
+
+    def search(
+        self,
+        q: str | None = None,
+        fakeid: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if q:
+            clauses.append("title LIKE ?")
+            params.append(f"%{q}%")
+        if fakeid:
+            clauses.append("fakeid = ?")
+            params.append(fakeid)
+        if since is not None:
+            clauses.append("create_time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("create_time < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            "SELECT biz, appmsgid, itemidx, fakeid, title, digest, link, cover, "
+            "author, create_time, update_time, fetched_at FROM articles "
+            f"{where} ORDER BY create_time DESC LIMIT ? OFFSET ?"
+        )
+        rows = self._conn().execute(sql, (*params, limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+    def scan(
+        self,
+        fakeid: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        after: Tuple[int, int] | None = None,
+        limit: int = 500,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        clauses, params = [], []
+        if fakeid:
+            clauses.append("fakeid = ?")
+            params.append(fakeid)
+        if since is not None:
+            clauses.append("create_time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("create_time < ?")
+            params.append(until)
+        if after is not None:
+            clauses.append("(IFNULL(create_time, 0), rowid) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            "SELECT rowid, biz, appmsgid, itemidx, fakeid, title, digest, link, "
+            "cover, author, create_time, update_time, fetched_at FROM articles "
+            f"{where} ORDER BY IFNULL(create_time, 0) DESC, rowid DESC LIMIT ?"
+        )
+        rows = [dict(r) for r in self._conn().execute(sql, (*params, limit))]
+        cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            cursor = (last["create_time"] or 0, last["rowid"])
+        for row in rows:
+            del row["rowid"]
+        return rows, cursor
+
+    def fulltext_search(
+        self,
+        q: str,
+        fakeid: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        limit: int = 20,
+        offset: int = 0,
+        snippet_chars: int = 120,
+    ) -> List[Dict[str, Any]]:
+        if self.fulltext is None:
+            raise RuntimeError("全文索引未启用")
+        return self.fulltext.search(
+            self._conn(), q, fakeid, since, until, limit, offset, snippet_chars
+        )
+
+    def build_fulltext(self, rebuild: bool = False, optimize: bool = True) -> int:
+        if self.fulltext is None:
+            raise RuntimeError("全文索引未启用")
+        conn = self._conn()
+        if rebuild:
+            with conn:
+                self.fulltext.clear(conn)
+        count = self.fulltext.backfill(conn)
+        if optimize:
+            logger.info("合并全文索引段")
+            self.fulltext.optimize(conn)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return count
+
+    def merge_fulltext(self, pages: int = 500) -> None:
+        if self.fulltext is not None:
+            self.fulltext.merge(self._conn(), pages)
+
+    def fulltext_stats(self) -> Dict[str, Any]:
+        if self.fulltext is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.fulltext.stats(self._conn())}
+
+    def account_articles(
+        self, fakeid: str, limit: int = 20, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        return self.search(fakeid=fakeid, limit=limit, offset=offset)
+
+    def get(self, key: ArticleKey) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM articles WHERE biz = ? AND appmsgid = ? AND itemidx = ?",
+            key,
+        ).fetchone()
+        return dict(row) if row else None
+
+    def links(self, fakeid: str | None = None) -> List[str]:
+        sql = "SELECT link FROM articles WHERE link IS NOT NULL"
+        params: tuple = ()
+        if fakeid:
+            sql += " AND fakeid = ?"
+            params = (fakeid,)
+        return [row["link"] for row in self._conn().execute(sql, params)]
@@ -0,0 +1,765 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from app.services.crawler import HistoryCrawler
+from app.services.fetcher import BulkFetcher
+from app.services.index import ArticleIndex, normalize_link
+from app.services.pool import NoSessionAvailable, SessionPool
+from app.services.ratelimit import backoff_delay
+from app.services.state import RedisState, to_text
+
+JOBS_DB = os.path.join("cfg", "jobs.db")
+JOB_KINDS = ("search", "list_pages", "fetch_details")
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+ACTIVE_STATUSES = ("queued", "running")
+LEASE_EXPIRED_ERROR = "任务租约过期且已达最大重试次数"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedup_key TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    repeat_every REAL,
+    run_at REAL NOT NULL,
+    leased_until REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (dedup_key)
+    WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority DESC, run_at);
+"""
+
+JOBS_LUA = """
+local prefix = ARGV[1]
+local function k(name) return prefix .. name end
+local function move(id, kind, old, new)
+    redis.call('HSET', k('job:' .. id), 'status', new)
+    redis.call('ZREM', k('jobs:status:' .. old), id)
+    redis.call('ZADD', k('jobs:status:' .. new), id, id)
+    redis.call('HINCRBY', k('jobs:counts'), kind .. '|' .. old, -1)
+    redis.call('HINCRBY', k('jobs:counts'), kind .. '|' .. new, 1)
+end
+local function ready_score(job)
+    local priority = tonumber(redis.call('HGET', job, 'priority'))
+    return -priority * 1e10 + tonumber(redis.call('HGET', job, 'run_at'))
+end
+local function release_dedup(id)
+    local dedup = redis.call('HGET', k('job:' .. id), 'dedup_key')
+    if dedup and dedup ~= '' and redis.call('HGET', k('jobs:dedup'), dedup) == id then
+        redis.call('HDEL', k('jobs:dedup'), dedup)
+    end
+end
+local function requeue(id, kind, run_at)
+    redis.call('HSET', k('job:' .. id), 'run_at', run_at, 'leased_until', '')
+    redis.call('ZREM', k('jobs:running'), id)
+    redis.call('ZADD', k('jobs:queued:' .. kind), run_at, id)
+    move(id, kind, 'running', 'queued')
+end
+"""
+
+SUBMIT_LUA = JOBS_LUA + """
+local kind, dedup, priority = ARGV[2], ARGV[4], tonumber(ARGV[5])
+local now = ARGV[9]
+if dedup ~= '' then
+    local existing = redis.call('HGET', k('jobs:dedup'), dedup)
+    if existing then
+        local job = k('job:' .. existing)
+        if priority > tonumber(redis.call('HGET', job, 'priority')) then
+            redis.call('HSET', job, 'priority', priority, 'updated_at', now)
+            local other = redis.call('HGET', job, 'kind')
+            if redis.call('ZSCORE', k('jobs:ready:' .. other), existing) then
+                redis.call('ZADD', k('jobs:ready:' .. other), ready_score(job), existing)
+            end
+        end
+        return {tonumber(existing), 0}
+    end
+end
+local id = redis.call('INCR', k('jobs:seq'))
+redis.call('HSET', k('job:' .. id), 'id', id, 'kind', kind, 'payload', ARGV[3],
+    'dedup_key', dedup, 'priority', priority, 'status', 'queued', 'attempts', 0,
+    'max_attempts', ARGV[6], 'repeat_every', ARGV[7], 'run_at', ARGV[8],
+    'leased_until', '', 'worker', '', 'result', '', 'error', '',
+    'created_at', now, 'updated_at', now)
+redis.call('ZADD', k('jobs:queued:' .. kind), ARGV[8], id)
+redis.call('ZADD', k('jobs:ids'), id, id)
+redis.call('ZADD', k('jobs:status:queued'), id, id)
+redis.call('HINCRBY', k('jobs:counts'), kind .. '|queued', 1)
+if dedup ~= '' then
+    redis.call('HSET', k('jobs:dedup'), dedup, id)
+end
+return {id, 1}
+"""
+
+CLAIM_LUA = JOBS_LUA + """
+local now, lease, worker = tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4]
+local expired = redis.call('ZRANGEBYSCORE', k('jobs:running'), '-inf', now,
+    'LIMIT', 0, 100)
+for _, id in ipairs(expired) do
+    local job = k('job:' .. id)
+    local kind = redis.call('HGET', job, 'kind')
+    local attempts = tonumber(redis.call('HGET', job, 'attempts'))
+    if attempts >= tonumber(redis.call('HGET', job, 'max_attempts')) then
+        redis.call('HSET', job, 'leased_until', '', 'error', ARGV[5],
+            'updated_at', now)
+        redis.call('ZREM', k('jobs:running'), id)
+        move(id, kind, 'running', 'failed')
+        release_dedup(id)
+    else
+        requeue(id, kind, redis.call('HGET', job, 'run_at'))
+    end
+end
+local best, best_kind, best_score = nil, nil, nil
+for i = 6, #ARGV do
+    local kind = ARGV[i]
+    local due = redis.call('ZRANGEBYSCORE', k('jobs:queued:' .. kind), '-inf', now,
+        'LIMIT', 0, 500)
+    for _, id in ipairs(due) do
+        redis.call('ZREM', k('jobs:queued:' .. kind), id)
+        redis.call('ZADD', k('jobs:ready:' .. kind), ready_score(k('job:' .. id)), id)
+    end
+    local top = redis.call('ZRANGE', k('jobs:ready:' .. kind), 0, 0, 'WITHSCORES')
+    if top[1] and (best == nil or tonumber(top[2]) < best_score) then
+        best, best_kind, best_score = top[1], kind, tonumber(top[2])
+    end
+end
+if best == nil then
+    return false
+end
+local job = k('job:' .. best)
+redis.call('ZREM', k('jobs:ready:' .. best_kind), best)
+redis.call('HINCRBY', job, 'attempts', 1)
+redis.call('HSET', job, 'leased_until', now + lease, 'worker', worker,
+    'updated_at', now)
+redis.call('ZADD', k('jobs:running'), now + lease, best)
+move(best, best_kind, 'queued', 'running')
+return best
+"""
+
+FINISH_LUA = JOBS_LUA + """
+local id, now, action, worker = ARGV[2], tonumber(ARGV[3]), ARGV[4], ARGV[5]
+local job = k('job:' .. id)
+local status = redis.call('HGET', job, 'status')
+local kind = redis.call('HGET', job, 'kind')
+if action == 'cancel' then
+    if status ~= 'queued' and status ~= 'running' then
+        return false
+    end
+    redis.call('ZREM', k('jobs:queued:' .. kind), id)
+    redis.call('ZREM', k('jobs:ready:' .. kind), id)
+    redis.call('ZREM', k('jobs:running'), id)
+    redis.call('HSET', job, 'leased_until', '', 'updated_at', now)
+    move(id, kind, status, 'cancelled')
+    release_dedup(id)
+    return 'cancelled'
+end
+if status ~= 'running' or redis.call('HGET', job, 'worker') ~= worker then
+    return false
+end
+if action == 'extend' then
+    local leased = now + tonumber(ARGV[6])
+    redis.call('HSET', job, 'leased_until', leased)
+    redis.call('ZADD', k('jobs:running'), leased, id)
+    return 'running'
+end
+redis.call('HSET', job, 'updated_at', now)
+if action == 'complete' then
+    redis.call('HSET', job, 'result', ARGV[6], 'error', '')
+    local every = tonumber(redis.call('HGET', job, 'repeat_every'))
+    if every and every > 0 then
+        redis.call('HSET', job, 'attempts', 0)
+        requeue(id, kind, now + every)
+        return 'queued'
+    end
+    redis.call('HSET', job, 'leased_until', '')
+    redis.call('ZREM', k('jobs:running'), id)
+    move(id, kind, 'running', 'done')
+    release_dedup(id)
+    return 'done'
+end
+if action == 'release' then
+    local attempts = tonumber(redis.call('HGET', job, 'attempts'))
+    redis.call('HSET', job, 'attempts', math.max(attempts - 1, 0))
+    requeue(id, kind, now + tonumber(ARGV[6]))
+    return 'queued'
+end
+redis.call('HSET', job, 'error', ARGV[7])
+local attempts = tonumber(redis.call('HGET', job, 'attempts'))
+if attempts < tonumber(redis.call('HGET', job, 'max_attempts')) then
+    requeue(id, kind, now + tonumber(ARGV[6]))
+    return 'queued'
+end
+redis.call('HSET', job, 'leased_until', '', 'run_at', now + tonumber(ARGV[6]))
+redis.call('ZREM', k('jobs:running'), id)
+move(id, kind, 'running', 'failed')
+release_dedup(id)
+return 'failed'
+"""
+
+JOB_INT_FIELDS = ("id", "priority", "attempts", "max_attempts")
+JOB_FLOAT_FIELDS = ("repeat_every", "run_at", "leased_until", "created_at")
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+def default_dedup_key(kind: str, payload: Dict[str, Any]) -> Optional[str]:
+    if kind == "search" and payload.get("keyword"):
+        return f"search:{payload['keyword']}"
+    if payload.get("fakeid"):
+        return f"{kind}:{payload['fakeid']}"
+    return None
+
+
+class JobQueue:
+    def __init__(self, path: str = JOBS_DB) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, row: sqlite3.Row | None) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        dedup_key: str | None = None,
+        max_attempts: int = 5,
+        delay: float = 0.0,
+        repeat_every: float | None = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}")
+        dedup_key = dedup_key or default_dedup_key(kind, payload)
+        now = time.time()
+        conn = self._conn()
+        try:
+            cur = conn.execute(
+                "INSERT INTO jobs (kind, payload, dedup_key, priority, max_attempts, "
+                "repeat_every, run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    json.dumps(payload, ensure_ascii=False),
+                    dedup_key,
+                    priority,
+                    max_attempts,
+                    repeat_every,
+                    now + delay,
+                    now,
+                    now,
+                ),
+            )
+        except sqlite3.IntegrityError:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND status IN (?, ?)",
+                (dedup_key, *ACTIVE_STATUSES),
+            ).fetchone()
+            if row is not None:
+                if priority > row["priority"]:
+                    conn.execute(
+                        "UPDATE jobs SET priority = ?, updated_at = ? WHERE id = ?",
+                        (priority, now, row["id"]),
+                    )
+                logger.debug(f"任务已存在，跳过重复提交 {dedup_key}")
+                return self.get(row["id"]), False
+            raise
+        logger.info(f"已提交任务 #{cur.lastrowid} {kind} {dedup_key or ''}")
+        return self.get(cur.lastrowid), True
+
+    def claim(
+        self, worker: str, kinds: Iterable[str] | None = None, lease: float = 600.0
+    ) -> Optional[Dict[str, Any]]:
+        kinds = tuple(kinds or JOB_KINDS)
+        marks = ", ".join("?" for _ in kinds)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                "UPDATE jobs SET status = 'failed', leased_until = NULL, "
+                "error = ?, updated_at = ? WHERE status = 'running' "
+                "AND leased_until < ? AND attempts >= max_attempts",
+                (LEASE_EXPIRED_ERROR, now, now),
+            ).rowcount
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE kind IN ({marks}) AND ("
+                "(status = 'queued' AND run_at <= ?) OR "
+                "(status = 'running' AND leased_until < ?)"
+                ") ORDER BY priority DESC, run_at, id LIMIT 1",
+                (*kinds, now, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                    "leased_until = ?, worker = ?, updated_at = ? WHERE id = ?",
+                    (now + lease, worker, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if expired:
+            logger.warning(f"{expired} 个任务租约过期且重试次数已用尽，标记为失败")
+        return self.get(row["id"]) if row is not None else None
+
+    def extend(self, job: Dict[str, Any], lease: float) -> bool:
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET leased_until = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            (now + lease, now, job["id"], job["worker"]),
+        )
+        return cur.rowcount > 0
+
+    def complete(self, job: Dict[str, Any], result: Any = None) -> None:
+        now = time.time()
+        result = json.dumps(result, ensure_ascii=False)
+        if job.get("repeat_every"):
+            self._conn().execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, "
+                "leased_until = NULL, result = ?, error = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND worker = ?",
+                (now + job["repeat_every"], result, now, job["id"], job["worker"]),
+            )
+            return
+        self._conn().execute(
+            "UPDATE jobs SET status = 'done', leased_until = NULL, result = ?, "
+            "error = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            (result, now, job["id"], job["worker"]),
+        )
+
+    def fail(self, job: Dict[str, Any], error: str, retry_in: float) -> str:
+        now = time.time()
+        status = "queued" if job["attempts"] < job["max_attempts"] else "failed"
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = ?, run_at = ?, leased_until = NULL, "
+            "error = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            (status, now + retry_in, error, now, job["id"], job["worker"]),
+        )
+        return status if cur.rowcount else job["status"]
+
+    def release(self, job: Dict[str, Any], retry_in: float) -> None:
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), "
+            "run_at = ?, leased_until = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            (now + retry_in, now, job["id"], job["worker"]),
+        )
+
+    def cancel(self, job_id: int) -> bool:
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = 'cancelled', leased_until = NULL, "
+            "updated_at = ? WHERE id = ? AND status IN (?, ?)",
+            (time.time(), job_id, *ACTIVE_STATUSES),
+        )
+        return cur.rowcount > 0
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row(row)
+
+    def list(
+        self,
+        status: str | None = None,
+        kind: str | None = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT * FROM jobs {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        )
+        return [self._row(r) for r in rows]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Dict[str, int]] = {}
+        rows = self._conn().execute(
+            "SELECT kind, status, COUNT(*) AS n FROM jobs GROUP BY kind, status"
+        )
+        for row in rows:
+            counts.setdefault(row["kind"], {})[row["status"]] = row["n"]
+        return counts
+
+
+class RedisJobQueue:
+    def __init__(self, state: Any) -> None:
+        self.state = state
+        self.client = state.client
+        self._submit = self.client.register_script(SUBMIT_LUA)
+        self._claim = self.client.register_script(CLAIM_LUA)
+        self._finish = self.client.register_script(FINISH_LUA)
+
+    def _row(self, data: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+        if not data:
+            return None
+        job: Dict[str, Any] = {}
+        for key, value in data.items():
+            value = to_text(value)
+            job[to_text(key)] = None if value == "" else value
+        for key in JOB_INT_FIELDS:
+            job[key] = int(job[key])
+        for key in (*JOB_FLOAT_FIELDS, "updated_at"):
+            if job.get(key) is not None:
+                job[key] = float(job[key])
+        job["payload"] = json.loads(job["payload"])
+        if job.get("result") is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        dedup_key: str | None = None,
+        max_attempts: int = 5,
+        delay: float = 0.0,
+        repeat_every: float | None = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}")
+        dedup_key = dedup_key or default_dedup_key(kind, payload)
+        now = time.time()
+        job_id, created = self._submit(
+            args=[
+                self.state.prefix,
+                kind,
+                json.dumps(payload, ensure_ascii=False),
+                dedup_key or "",
+                priority,
+                max_attempts,
+                "" if repeat_every is None else repeat_every,
+                now + delay,
+                now,
+            ]
+        )
+        if created:
+            logger.info(f"已提交任务 #{job_id} {kind} {dedup_key or ''}")
+        else:
+            logger.debug(f"任务已存在，跳过重复提交 {dedup_key}")
+        return self.get(int(job_id)), bool(created)
+
+    def claim(
+        self, worker: str, kinds: Iterable[str] | None = None, lease: float = 600.0
+    ) -> Optional[Dict[str, Any]]:
+        kinds = tuple(kinds or JOB_KINDS)
+        job_id = self._claim(
+            args=[
+                self.state.prefix,
+                time.time(),
+                lease,
+                worker,
+                LEASE_EXPIRED_ERROR,
+                *kinds,
+            ]
+        )
+        if not job_id:
+            return None
+        return self.get(int(job_id))
+
+    def _transition(
+        self, job_id: int, action: str, worker: str, *args: Any
+    ) -> Optional[str]:
+        status = self._finish(
+            args=[self.state.prefix, job_id, time.time(), action, worker, *args]
+        )
+        return to_text(status) if status else None
+
+    def extend(self, job: Dict[str, Any], lease: float) -> bool:
+        return self._transition(job["id"], "extend", job["worker"], lease) is not None
+
+    def complete(self, job: Dict[str, Any], result: Any = None) -> None:
+        self._transition(
+            job["id"],
+            "complete",
+            job["worker"],
+            json.dumps(result, ensure_ascii=False),
+        )
+
+    def fail(self, job: Dict[str, Any], error: str, retry_in: float) -> str:
+        status = self._transition(job["id"], "fail", job["worker"], retry_in, error)
+        return status or job["status"]
+
+    def release(self, job: Dict[str, Any], retry_in: float) -> None:
+        self._transition(job["id"], "release", job["worker"], retry_in)
+
+    def cancel(self, job_id: int) -> bool:
+        return self._transition(job_id, "cancel", "") is not None
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        return self._row(self.client.hgetall(self.state.key(f"job:{job_id}")))
+
+    def list(
+        self,
+        status: str | None = None,
+        kind: str | None = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        index = self.state.key(f"jobs:status:{status}" if status else "jobs:ids")
+        jobs: List[Dict[str, Any]] = []
+        start, skipped = 0, 0
+        while len(jobs) < limit:
+            ids = self.client.zrevrange(index, start, start + 199)
+            if not ids:
+                break
+            start += len(ids)
+            pipe = self.client.pipeline(transaction=False)
+            for job_id in ids:
+                pipe.hgetall(self.state.key(f"job:{to_text(job_id)}"))
+            for data in pipe.execute():
+                job = self._row(data)
+                if job is None or (kind and job["kind"] != kind):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                jobs.append(job)
+                if len(jobs) >= limit:
+                    break
+        return jobs
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Dict[str, int]] = {}
+        for field, value in self.state.hgetall("jobs:counts").items():
+            kind, status = field.split("|", 1)
+            if int(value) > 0:
+                counts.setdefault(kind, {})[status] = int(value)
+        return counts
+
+
+def create_job_queue(path: str = JOBS_DB, state: Any = None) -> Any:
+    if isinstance(state, RedisState):
+        return RedisJobQueue(state)
+    return JobQueue(path)
+
+
+def crawl_handlers(
+    aclient: Any,
+    pool: SessionPool,
+    crawler: HistoryCrawler,
+    fetcher: BulkFetcher,
+    index: ArticleIndex,
+    queue: JobQueue,
+) -> Dict[str, Handler]:
+    async def search(payload: Dict[str, Any]) -> Dict[str, Any]:
+        session = pool.acquire()
+        if session is None:
+            raise NoSessionAvailable("账号池中没有可用会话")
+        raw = None
+        try:
+            fakeid, raw = await aclient.get_fakeid_by_name(
+                session.wx_cfg, payload["keyword"]
+            )
+        finally:
+            pool.release(session, raw, failed=raw is None)
+        if fakeid and payload.get("follow"):
+            queue.submit(
+                "list_pages",
+                {"fakeid": fakeid, "fetch_details": payload.get("fetch_details")},
+            )
+        return {"fakeid": fakeid}
+
+    async def list_pages(payload: Dict[str, Any]) -> Dict[str, Any]:
+        fakeid = payload["fakeid"]
+        result = await crawler.crawl(None, fakeid, payload.get("max_pages"))
+        links = [
+            normalize_link(item.get("link"))
+            for item in result["items"]
+            if item.get("link")
+        ]
+        if links and payload.get("fetch_details"):
+            queue.submit("fetch_details", {"urls": links})
+        return {
+            "pages": result["pages"],
+            "complete": result["complete"],
+            "new_count": len(result["items"]),
+        }
+
+    async def fetch_details(payload: Dict[str, Any]) -> Dict[str, Any]:
+        urls = list(payload.get("urls") or [])
+        if payload.get("fakeid") or payload.get("from_index"):
+            urls.extend(await asyncio.to_thread(index.links, payload.get("fakeid")))
+        tracker = fetcher.service.tracker
+        if payload.get("due") and tracker is not None:
+            limit = payload.get("limit")
+            urls.extend(await asyncio.to_thread(tracker.due_urls, limit))
+        async with fetcher.lock:
+            await fetcher.run(urls)
+            stats = fetcher.snapshot()
+        if stats["total"] and stats["failed"] == stats["done"]:
+            raise RuntimeError(f"文章详情全部抓取失败: {stats['failed']} 篇")
+        keys = ("total", "ok", "failed", "skipped", "unchanged", "removed")
+        return {k: stats[k] for k in keys}
+
+    return {"search": search, "list_pages": list_pages, "fetch_details": fetch_details}
+
+
+class JobWorker:
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Handler],
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        lease: float = 600.0,
+        backoff_base: float = 30.0,
+        backoff_cap: float = 1800.0,
+        no_session_delay: float = 60.0,
+        name: str | None = None,
+        heartbeat: float | None = None,
+    ) -> None:
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.heartbeat = heartbeat or lease / 3
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.no_session_delay = no_session_delay
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = 0
+        self.failed = 0
+        self.running = 0
+        self._tasks: List[asyncio.Task] = []
+
+    async def _keep_leased(self, job: Dict[str, Any]) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            if not await asyncio.to_thread(self.queue.extend, job, self.lease):
+                logger.warning(f"任务 #{job['id']} 租约已失效，停止续约")
+                return
+
+    async def _run_leased(self, handler: Handler, job: Dict[str, Any]) -> Any:
+        heartbeat = asyncio.create_task(self._keep_leased(job))
+        try:
+            return await handler(job["payload"])
+        finally:
+            heartbeat.cancel()
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers[job["kind"]]
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            result = await self._run_leased(handler, job)
+        except NoSessionAvailable:
+            logger.warning(f"任务 #{job['id']} 暂无可用会话，稍后重试")
+            await asyncio.to_thread(self.queue.release, job, self.no_session_delay)
+            return
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.queue.release, job, 0)
+            raise
+        except Exception as e:
+            self.failed += 1
+            delay = backoff_delay(
+                job["attempts"] - 1, self.backoff_base, self.backoff_cap
+            )
+            error = f"{type(e).__name__}: {e}"
+            status = await asyncio.to_thread(self.queue.fail, job, error, delay)
+            logger.error(
+                f"任务 #{job['id']} {job['kind']} 失败({job['attempts']}/"
+                f"{job['max_attempts']}): {error}，状态 {status}"
+            )
+            return
+        finally:
+            self.running -= 1
+        self.processed += 1
+        await asyncio.to_thread(self.queue.complete, job, result)
+        logger.info(
+            f"任务 #{job['id']} {job['kind']} 完成，"
+            f"耗时 {time.perf_counter() - started:.1f}s"
+        )
+
+    async def _loop(self, worker: str) -> None:
+        kinds = list(self.handlers)
+        while True:
+            job = await asyncio.to_thread(self.queue.claim, worker, kinds, self.lease)
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self._execute(job)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        logger.info(f"任务调度器启动 worker={self.name} 并发 {self.concurrency}")
+        self._tasks = [
+            asyncio.create_task(self._loop(f"{self.name}/{i}"))
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run(self) -> None:
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker": self.name,
+            "active": bool(self._tasks),
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,219 @@
+import hashlib
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator, List
+
+from loguru import logger
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    ProcessCollector,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+trace: Any = None
+
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+UPSTREAM_SECONDS = Histogram(
+    "clawler_upstream_request_seconds",
+    "Upstream request latency",
+    ["endpoint", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+    registry=REGISTRY,
+)
+UPSTREAM_BYTES = Counter(
+    "clawler_upstream_bytes_total",
+    "Bytes received from upstream",
+    ["endpoint"],
+    registry=REGISTRY,
+)
+PARSE_SECONDS = Histogram(
+    "clawler_parse_seconds",
+    "Article HTML parse time",
+    ["mode"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    registry=REGISTRY,
+)
+STORAGE_WRITE_SECONDS = Histogram(
+    "clawler_storage_write_seconds",
+    "Storage write time",
+    ["target"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+    registry=REGISTRY,
+)
+
+_config = {"sample_rate": 0.0, "max_chars": 2048, "tracing": False}
+
+
+def configure(
+    debug_sample_rate: float = 0.0,
+    debug_max_chars: int = 2048,
+    tracing: bool = False,
+) -> None:
+    _config["sample_rate"] = debug_sample_rate
+    _config["max_chars"] = debug_max_chars
+    global trace
+    if tracing and trace is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logger.warning("未安装 opentelemetry-api，已关闭链路追踪")
+    _config["tracing"] = tracing and trace is not None
+
+
+def debug_payload(endpoint: str, text: str) -> None:
+    rate = _config["sample_rate"]
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+    limit = _config["max_chars"]
+    suffix = f"...(共 {len(text)} 字符)" if len(text) > limit else ""
+    logger.debug(f"{endpoint} response={text[:limit]}{suffix}")
+
+
+def token_label(token: str) -> str:
+    return hashlib.sha256(str(token).encode("utf-8")).hexdigest()[:12]
+
+
+def span(name: str, **attributes: Any):
+    if not _config["tracing"]:
+        return nullcontext()
+    return trace.get_tracer("clawler").start_as_current_span(
+        name, attributes=attributes
+    )
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - started)
+
+
+def observe_upstream(
+    endpoint: str, status: int | str, seconds: float, size: int = 0
+) -> None:
+    UPSTREAM_SECONDS.labels(endpoint, str(status)).observe(seconds)
+    if size:
+        UPSTREAM_BYTES.labels(endpoint).inc(size)
+
+
+class ServiceCollector:
+    def __init__(
+        self,
+        cache: Any = None,
+        pool: Any = None,
+        limiter: Any = None,
+        jobs: Any = None,
+        fetcher: Any = None,
+    ) -> None:
+        self.cache = cache
+        self.pool = pool
+        self.limiter = limiter
+        self.jobs = jobs
+        self.fetcher = fetcher
+
+    def _cache(self) -> Iterator[Any]:
+        lookups = CounterMetricFamily(
+            "clawler_cache_lookups",
+            "Response cache lookups",
+            labels=["endpoint", "result"],
+        )
+        hit_rate = GaugeMetricFamily(
+            "clawler_cache_hit_ratio", "Response cache hit ratio", labels=["endpoint"]
+        )
+        stats = self.cache.stats()
+        for endpoint, metrics in stats["endpoints"].items():
+            for result in ("hits", "disk_hits", "misses", "coalesced"):
+                lookups.add_metric([endpoint, result], metrics[result])
+            hit_rate.add_metric([endpoint], metrics["hit_rate"])
+        yield lookups
+        yield hit_rate
+        yield GaugeMetricFamily(
+            "clawler_cache_entries", "Response cache entries", value=stats["entries"]
+        )
+
+    def _pool(self) -> Iterator[Any]:
+        sessions = self.pool.snapshot()
+        healthy = GaugeMetricFamily(
+            "clawler_pool_sessions", "Pooled sessions", labels=["state"]
+        )
+        up = sum(1 for s in sessions if s["healthy"])
+        healthy.add_metric(["healthy"], up)
+        healthy.add_metric(["unavailable"], len(sessions) - up)
+        yield healthy
+        inflight = GaugeMetricFamily(
+            "clawler_pool_inflight", "In-flight requests per session", labels=["token"]
+        )
+        errors = GaugeMetricFamily(
+            "clawler_pool_error_rate", "Recent error rate per session", labels=["token"]
+        )
+        for s in sessions:
+            label = token_label(s["token"])
+            inflight.add_metric([label], s["inflight"])
+            errors.add_metric([label], s["error_rate"])
+        yield inflight
+        yield errors
+
+    def _limiter(self) -> Iterator[Any]:
+        rate = GaugeMetricFamily(
+            "clawler_rate_limit",
+            "Adaptive request rate (req/s)",
+            labels=["session", "endpoint"],
+        )
+        for limit in self.limiter.snapshot():
+            session = limit["session"]
+            if limit["endpoint"] != "article":
+                session = token_label(session)
+            rate.add_metric([session, limit["endpoint"]], limit["rate"])
+        yield rate
+
+    def _jobs(self) -> Iterator[Any]:
+        gauge = GaugeMetricFamily(
+            "clawler_jobs", "Jobs by kind and status", labels=["kind", "status"]
+        )
+        for kind, statuses in self.jobs.counts().items():
+            for status, count in statuses.items():
+                gauge.add_metric([kind, status], count)
+        yield gauge
+
+    def _fetcher(self) -> Iterator[Any]:
+        stats = self.fetcher.snapshot()
+        gauge = GaugeMetricFamily(
+            "clawler_fetch_articles", "Current batch fetch progress", labels=["state"]
+        )
+        states = ("total", "ok", "failed", "skipped", "unchanged", "removed")
+        for state in (*states, "in_flight"):
+            gauge.add_metric([state], stats[state])
+        yield gauge
+        yield GaugeMetricFamily(
+            "clawler_parse_queue_depth",
+            "Articles waiting for the parse pool",
+            value=stats["parse"]["queue_depth"],
+        )
+
+    def collect(self) -> Iterator[Any]:
+        sources: List[Callable[[], Iterator[Any]]] = []
+        for name in ("cache", "pool", "limiter", "jobs", "fetcher"):
+            if getattr(self, name) is not None:
+                sources.append(getattr(self, f"_{name}"))
+        for source in sources:
+            try:
+                yield from source()
+            except Exception as e:
+                logger.warning(f"采集指标失败 {source.__name__}: {e}")
+
+
+def register(collector: ServiceCollector) -> None:
+    REGISTRY.register(collector)
+
+
+def render() -> bytes:
+    return generate_latest(REGISTRY)
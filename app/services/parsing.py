@@ -0,0 +1,153 @@
+import re
+from typing import Any, Dict, Iterator, Optional
+
+BIZ_RE = re.compile(r'var biz\s*=\s*"(.*?)";')
+CREATE_TIME_RE = re.compile(r"var createTime = '(.*?)';")
+MSG_LINK_RE = re.compile(r'var msg_link = "(.*?)";')
+HEADER_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+XPATHS = {
+    "rich_media_content": (
+        '//div[contains(concat(" ", normalize-space(@class), " "), '
+        '" rich_media_content ")]'
+    ),
+    "activity-name": (
+        '//h1[@id="activity-name"]'
+        '[contains(concat(" ", normalize-space(@class), " "), " rich_media_title ")]'
+    ),
+    "js_name": '//a[@id="js_name"]',
+}
+_compiled: Dict[str, Any] = {}
+HIDDEN_TAGS = {"script", "style", "template"}
+
+
+def detect_encoding(body: bytes, content_type: str | None = None) -> Optional[str]:
+    if content_type:
+        m = HEADER_CHARSET_RE.search(content_type)
+        if m:
+            return m.group(1)
+    m = META_CHARSET_RE.search(body[:4096])
+    if m:
+        return m.group(1).decode("ascii")
+    return None
+
+
+def decode_html(body: bytes, content_type: str | None = None) -> str:
+    encoding = detect_encoding(body, content_type)
+    if encoding:
+        try:
+            return body.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        from charset_normalizer import from_bytes
+
+        best = from_bytes(body).best()
+        return str(best) if best is not None else body.decode("utf-8", "replace")
+
+
+def _strings(root) -> Iterator[str]:
+    from lxml import etree
+
+    hidden = 0
+    events = ("start", "end", "comment", "pi")
+    for event, el in etree.iterwalk(root, events=events):
+        if event in ("comment", "pi"):
+            if not hidden and el.tail:
+                yield el.tail
+            continue
+        skip = not isinstance(el.tag, str) or el.tag in HIDDEN_TAGS
+        if event == "start":
+            if skip:
+                hidden += 1
+            elif not hidden and el.text:
+                yield el.text
+            continue
+        if skip:
+            hidden -= 1
+        if el is not root and not hidden and el.tail:
+            yield el.tail
+
+
+def get_text(el, separator: str = "") -> str:
+    return separator.join(s for s in (t.strip() for t in _strings(el)) if s)
+
+
+def _first(tree, name: str):
+    xpath = _compiled.get(name)
+    if xpath is None:
+        from lxml import etree
+
+        xpath = _compiled[name] = etree.XPath(XPATHS[name])
+    found = xpath(tree)
+    if not found:
+        raise ValueError(f"文章页面缺少 {name}")
+    return found[0]
+
+
+def _parse_tree(html: str):
+    import lxml.html
+
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+
+
+def _script_fields(html: str) -> Dict[str, str]:
+    m = BIZ_RE.search(html)
+    if m is None:
+        raise ValueError("文章页面缺少 var biz")
+    biz = m.group(1).replace('" || "', "").replace('"', "")
+    m = CREATE_TIME_RE.search(html)
+    if m is None:
+        raise ValueError("文章页面缺少 var createTime")
+    return {"biz": biz, "create_time": m.group(1)}
+
+
+def extract_link(html: str) -> Optional[str]:
+    m = MSG_LINK_RE.search(html)
+    if m is None:
+        return None
+    return m.group(1).replace("\\x26amp;", "&").replace("&amp;", "&") or None
+
+
+def extract_article(html: str) -> Dict:
+    tree = _parse_tree(html)
+    content = get_text(_first(tree, "rich_media_content"), "\n")
+    title = get_text(_first(tree, "activity-name"))
+    author = get_text(_first(tree, "js_name"))
+    fields = _script_fields(html)
+    return {
+        "status": 1,
+        "content": content,
+        "title": title,
+        "author": author,
+        "create_time": fields["create_time"],
+        "biz": fields["biz"],
+    }
+
+
+def extract_article_bs4(html: str) -> Dict:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    content = soup.find("div", class_="rich_media_content").get_text(
+        "\n", strip=True
+    )
+    title = soup.find(
+        "h1", {"class": "rich_media_title", "id": "activity-name"}
+    ).get_text(strip=True)
+    author = soup.find("a", {"id": "js_name"}).get_text(strip=True)
+    fields = _script_fields(html)
+    return {
+        "status": 1,
+        "content": content,
+        "title": title,
+        "author": author,
+        "create_time": fields["create_time"],
+        "biz": fields["biz"],
+    }
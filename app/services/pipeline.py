@@ -0,0 +1,113 @@
+import asyncio
+import glob
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.services.clawlers import ArticleService
+from app.services.metrics import PARSE_SECONDS, timed
+from app.services.parsing import decode_html, extract_article, extract_link
+
+
+def parse_worker(html: str) -> Dict:
+    return extract_article(html)
+
+
+class ParsePipeline:
+    def __init__(
+        self,
+        service: ArticleService,
+        workers: int | None = None,
+        queue_size: int = 256,
+        executor: Executor | None = None,
+    ) -> None:
+        self.service = service
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.parsed = 0
+        self.failed = 0
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue: asyncio.Queue | None = None
+        self._consumers: List[asyncio.Task] = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "parsed": self.parsed,
+            "failed": self.failed,
+        }
+
+    async def start(self) -> None:
+        if self._consumers:
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._consumers = [
+            asyncio.create_task(self._consume()) for _ in range(self.workers)
+        ]
+
+    async def submit(
+        self, url: str, html: str, write_html: bool = True
+    ) -> asyncio.Future:
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((url, html, write_html, future))
+        return future
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            url, html, write_html, future = await self._queue.get()
+            try:
+                with timed(PARSE_SECONDS, "process_pool"):
+                    data = await loop.run_in_executor(
+                        self._executor, parse_worker, html
+                    )
+                await asyncio.to_thread(
+                    self.service.save_article, url, html, data, write_html
+                )
+                self.parsed += 1
+                future.set_result(data)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"解析文章失败 {type(e).__name__}: {e} url={url}")
+                future.set_result(None)
+            finally:
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        await self.join()
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self._queue = None
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown()
+            self._executor = None
+
+
+async def reparse_directory(
+    pipeline: ParsePipeline, directory: str = "HTML"
+) -> List[Optional[Dict]]:
+    futures = []
+    paths = sorted(glob.glob(os.path.join(directory, "*.html")))
+    logger.info(f"重新解析 {len(paths)} 个 HTML 文件")
+    for path in paths:
+        with open(path, "rb") as f:
+            html = decode_html(f.read())
+        url = extract_link(html) or ""
+        futures.append(await pipeline.submit(url, html, write_html=False))
+    results = await asyncio.gather(*futures)
+    logger.info(f"重新解析完成: {pipeline.stats()}")
+    return list(results)
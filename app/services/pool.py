@@ -0,0 +1,340 @@
+import glob
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from loguru import logger
+
+from app.services.sessions import SessionRegistry
+from app.services.storage import SessionStorage, write_json_atomic
+
+SESSIONS_DIR = os.path.join("cfg", "sessions")
+RET_OK = 0
+RET_INVALID_SESSION = 200003
+RET_FREQ_CONTROL = 200013
+SESSIONS_KEY = "sessions"
+SESSIONS_VERSION_KEY = "sessions:version"
+COOLDOWN_KEY = "sessions:cooldown"
+EVICTED_KEY = "sessions:evicted"
+
+
+class NoSessionAvailable(RuntimeError):
+    pass
+
+
+def response_ret(data: Any) -> Optional[int]:
+    if not isinstance(data, dict):
+        return None
+    try:
+        return int((data.get("base_resp") or {}).get("ret"))
+    except (TypeError, ValueError):
+        return None
+
+
+class PooledSession:
+    def __init__(
+        self,
+        wx_cfg: Dict[str, Any],
+        path: str | None = None,
+        window: int = 50,
+        shared: bool = False,
+    ) -> None:
+        self.wx_cfg = wx_cfg
+        self.key = str(wx_cfg.get("token"))
+        self.path = path
+        self.shared = shared
+        self.expiry = float(wx_cfg.get("expiry") or 0)
+        self.inflight = 0
+        self.requests = 0
+        self.cooldown_until = 0.0
+        self.last_ret: Optional[int] = None
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+
+    def expired(self, now: float | None = None) -> bool:
+        return not self.expiry or (now or time.time()) >= self.expiry
+
+    def healthy(self, now: float | None = None) -> bool:
+        now = now or time.time()
+        return not self.expired(now) and now >= self.cooldown_until
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "token": self.key,
+            "persisted": self.path is not None or self.shared,
+            "expiry": self.expiry or None,
+            "healthy": self.healthy(now),
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "error_rate": round(self.error_rate(), 4),
+            "cooldown_remaining": max(0, round(self.cooldown_until - now)),
+            "last_ret": self.last_ret,
+        }
+
+
+class SessionPool:
+    def __init__(
+        self,
+        directory: str = SESSIONS_DIR,
+        storage: SessionStorage | None = None,
+        registry: SessionRegistry | None = None,
+        strategy: str = "least_loaded",
+        cooldown: float = 1800.0,
+        error_cooldown: float = 300.0,
+        error_threshold: float = 0.5,
+        window: int = 50,
+        state: Any = None,
+        limiter: Any = None,
+    ) -> None:
+        if strategy not in ("least_loaded", "round_robin"):
+            raise ValueError(f"不支持的调度策略: {strategy}")
+        self.directory = directory
+        self.storage = storage
+        self.registry = registry
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.error_cooldown = error_cooldown
+        self.error_threshold = error_threshold
+        self.window = window
+        self.state = state
+        self.limiter = limiter
+        self._sessions: Dict[str, PooledSession] = {}
+        self._evicted: set[str] = set()
+        self._shared: Dict[str, str] = {}
+        self._dir_key: Any = None
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+        if state is not None:
+            self._import_directory()
+
+    def _session_path(self, token: str) -> str:
+        name = re.sub(r"[^0-9A-Za-z_-]", "_", token)
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _dir_stat(self) -> Any:
+        try:
+            st = os.stat(self.directory)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _import_directory(self) -> None:
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    wx_cfg = json.load(f)
+            except Exception:
+                logger.warning(f"会话文件无法解析: {path}")
+                continue
+            if not wx_cfg.get("token"):
+                continue
+            value = json.dumps(wx_cfg, ensure_ascii=False)
+            if self.state.hsetnx(SESSIONS_KEY, str(wx_cfg["token"]), value):
+                imported += 1
+        if imported:
+            self.state.incr(SESSIONS_VERSION_KEY)
+            logger.info(f"已将 {imported} 个本地会话导入共享状态")
+
+    def _track(
+        self,
+        wx_cfg: Dict[str, Any] | None,
+        path: str | None,
+        shared: bool = False,
+    ) -> None:
+        if not wx_cfg or not wx_cfg.get("token"):
+            return
+        token = str(wx_cfg["token"])
+        if token in self._evicted:
+            return
+        current = self._sessions.get(token)
+        if current is not None and current.wx_cfg is wx_cfg:
+            return
+        session = PooledSession(wx_cfg, path=path, window=self.window, shared=shared)
+        if current is not None:
+            session.inflight = current.inflight
+            session.requests = current.requests
+            session.cooldown_until = current.cooldown_until
+            session.outcomes = current.outcomes
+            session.last_ret = current.last_ret
+        self._sessions[token] = session
+
+    def _refresh_shared(self) -> None:
+        version = self.state.get(SESSIONS_VERSION_KEY)
+        if version != self._dir_key:
+            entries = self.state.hgetall(SESSIONS_KEY)
+            evicted = set(self.state.hgetall(EVICTED_KEY))
+            with self._lock:
+                self._dir_key = version
+                self._evicted = evicted
+                for token, value in entries.items():
+                    if self._shared.get(token) == value and token in self._sessions:
+                        continue
+                    try:
+                        wx_cfg = json.loads(value)
+                    except ValueError:
+                        logger.warning(f"共享会话无法解析: {token}")
+                        continue
+                    self._shared[token] = value
+                    self._track(wx_cfg, None, shared=True)
+                removed = [
+                    t
+                    for t, s in self._sessions.items()
+                    if (s.shared and t not in entries) or t in evicted
+                ]
+                for token in removed:
+                    del self._sessions[token]
+                    self._shared.pop(token, None)
+        now = time.time()
+        for token, until in self.state.hgetall(COOLDOWN_KEY).items():
+            if float(until) <= now:
+                self.state.hdel(COOLDOWN_KEY, token)
+                continue
+            with self._lock:
+                session = self._sessions.get(token)
+                if session is not None:
+                    session.cooldown_until = max(session.cooldown_until, float(until))
+
+    def refresh(self) -> None:
+        if self.state is not None:
+            self._refresh_shared()
+            if self.storage is not None:
+                wx_cfg = self.storage.load_session()
+                with self._lock:
+                    self._track(wx_cfg, None)
+            return
+        with self._lock:
+            dir_key = self._dir_stat()
+            if dir_key is not None and dir_key != self._dir_key:
+                self._dir_key = dir_key
+                on_disk = set()
+                pattern = os.path.join(self.directory, "*.json")
+                for path in sorted(glob.glob(pattern)):
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            wx_cfg = json.load(f)
+                    except Exception:
+                        logger.warning(f"会话文件无法解析: {path}")
+                        continue
+                    on_disk.add(str(wx_cfg.get("token")))
+                    self._track(wx_cfg, path)
+                removed = [
+                    t for t, s in self._sessions.items() if s.path and t not in on_disk
+                ]
+                for token in removed:
+                    del self._sessions[token]
+            if self.storage is not None:
+                self._track(self.storage.load_session(), None)
+
+    def add(self, wx_cfg: Dict[str, Any]) -> PooledSession:
+        token = str(wx_cfg["token"])
+        path = None
+        if self.state is not None:
+            value = json.dumps(wx_cfg, ensure_ascii=False)
+            self.state.hset(SESSIONS_KEY, token, value)
+            self.state.hdel(EVICTED_KEY, token)
+            self.state.incr(SESSIONS_VERSION_KEY)
+        else:
+            path = self._session_path(token)
+            write_json_atomic(path, wx_cfg)
+        with self._lock:
+            self._evicted.discard(token)
+            if self.state is not None:
+                self._shared[token] = value
+            self._track(wx_cfg, path, shared=self.state is not None)
+            logger.info(f"会话已加入账号池: {token}，当前 {len(self._sessions)} 个")
+            return self._sessions[token]
+
+    def acquire(self) -> Optional[PooledSession]:
+        self.refresh()
+        now = time.time()
+        with self._lock:
+            candidates = [s for s in self._sessions.values() if s.healthy(now)]
+            if not candidates:
+                return None
+            if self.strategy == "round_robin":
+                candidates.sort(key=lambda s: s.key)
+                session = candidates[next(self._rr) % len(candidates)]
+            else:
+                session = min(
+                    candidates, key=lambda s: (s.inflight, s.error_rate(), s.requests)
+                )
+            session.inflight += 1
+            session.requests += 1
+            return session
+
+    def release(
+        self, session: PooledSession, data: Any = None, failed: bool = False
+    ) -> None:
+        ret = response_ret(data)
+        with self._lock:
+            session.inflight = max(0, session.inflight - 1)
+            session.last_ret = ret
+            if ret == RET_INVALID_SESSION:
+                self._evict_locked(session, "invalid session")
+                return
+            ok = not failed and ret in (None, RET_OK)
+            session.outcomes.append(ok)
+            if ret == RET_FREQ_CONTROL:
+                self._cool_down_locked(session, self.cooldown)
+                logger.warning(
+                    f"会话 {session.key} 触发频率限制，冷却 {self.cooldown:.0f}s"
+                )
+            elif (
+                len(session.outcomes) >= 10
+                and session.error_rate() >= self.error_threshold
+            ):
+                self._cool_down_locked(session, self.error_cooldown)
+                session.outcomes.clear()
+                logger.warning(
+                    f"会话 {session.key} 错误率过高，冷却 {self.error_cooldown:.0f}s"
+                )
+
+    def _cool_down_locked(self, session: PooledSession, seconds: float) -> None:
+        session.cooldown_until = time.time() + seconds
+        if self.state is not None:
+            self.state.hset(COOLDOWN_KEY, session.key, repr(session.cooldown_until))
+
+    def _evict_locked(self, session: PooledSession, reason: str) -> None:
+        self._sessions.pop(session.key, None)
+        self._evicted.add(session.key)
+        if self.state is not None:
+            self._shared.pop(session.key, None)
+            self.state.hdel(SESSIONS_KEY, session.key)
+            self.state.hset(EVICTED_KEY, session.key, repr(time.time()))
+            self.state.incr(SESSIONS_VERSION_KEY)
+        if session.path and os.path.exists(session.path):
+            os.remove(session.path)
+        if self.registry is not None:
+            self.registry.drop(session.key)
+        if self.limiter is not None:
+            self.limiter.forget(session.key)
+        logger.warning(f"会话 {session.key} 已移出账号池: {reason}")
+
+    def evict(self, token: str, reason: str = "manual") -> bool:
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return False
+            self._evict_locked(session, reason)
+            return True
+
+    def sessions(self) -> List[PooledSession]:
+        self.refresh()
+        with self._lock:
+            return list(self._sessions.values())
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            return [s.snapshot() for s in self._sessions.values()]
@@ -0,0 +1,235 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from loguru import logger
+
+RATES_KEY = "ratelimit:rates"
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now <= self.updated:
+            return
+        refill = (now - self.updated) * self.rate
+        self.tokens = min(self.capacity, self.tokens + refill)
+        self.updated = now
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()
+        self.rate = rate
+
+    def hold(self, seconds: float) -> None:
+        self._refill()
+        self.tokens = 0.0
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                held = max(self.updated - time.monotonic(), 0.0)
+                await asyncio.sleep(held + (tokens - self.tokens) / self.rate)
+
+
+class AdaptiveRate:
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1.0,
+        min_rate: float = 0.05,
+        max_rate: float = 5.0,
+    ) -> None:
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.bucket = TokenBucket(min(max(rate, min_rate), max_rate), burst)
+        self.paused_until = 0.0
+        self.counts = {"ok": 0, "throttled": 0, "blocked": 0, "error": 0}
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def set_rate(self, rate: float) -> None:
+        self.bucket.set_rate(min(max(rate, self.min_rate), self.max_rate))
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.bucket.hold(self.paused_until - time.monotonic())
+
+    async def acquire(self) -> None:
+        await self.bucket.acquire()
+
+
+class SharedAdaptiveRate:
+    def __init__(
+        self,
+        state: Any,
+        key: str,
+        rate: float,
+        burst: float = 1.0,
+        min_rate: float = 0.05,
+        max_rate: float = 5.0,
+    ) -> None:
+        self.state = state
+        self.key = key
+        self.bucket_key = f"ratelimit:bucket:{key}"
+        self.burst = max(burst, 1.0)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._rate = min(max(rate, min_rate), max_rate)
+        self.paused_until = 0.0
+        self.counts = {"ok": 0, "throttled": 0, "blocked": 0, "error": 0}
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def sync(self) -> float:
+        value = self.state.hget(RATES_KEY, self.key)
+        if value is not None:
+            self._rate = min(max(float(value), self.min_rate), self.max_rate)
+        return self._rate
+
+    def set_rate(self, rate: float) -> None:
+        self._rate = min(max(rate, self.min_rate), self.max_rate)
+        self.state.hset(RATES_KEY, self.key, repr(self._rate))
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.state.hold(self.bucket_key, seconds + self.burst / self._rate)
+
+    def _reserve(self) -> float:
+        return self.state.reserve(self.bucket_key, self.sync(), self.burst)
+
+    async def acquire(self) -> None:
+        wait = await asyncio.to_thread(self._reserve)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveRateController:
+    def __init__(
+        self,
+        initial_rate: float = 1.0,
+        min_rate: float = 0.05,
+        max_rate: float = 5.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        burst: float = 2.0,
+        throttle_pause: float = 60.0,
+        block_pause: float = 300.0,
+        initial_rates: Dict[str, float] | None = None,
+        state: Any = None,
+    ) -> None:
+        self.initial_rate = initial_rate
+        self.initial_rates = initial_rates or {}
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.throttle_pause = throttle_pause
+        self.block_pause = block_pause
+        self.state = state
+        self._limits: Dict[Tuple[str, str], Any] = {}
+
+    def limit(self, session: str, endpoint: str) -> Any:
+        key = (session, endpoint)
+        limit = self._limits.get(key)
+        if limit is None:
+            rate = self.initial_rates.get(endpoint, self.initial_rate)
+            if self.state is not None:
+                limit = SharedAdaptiveRate(
+                    self.state,
+                    f"{session}:{endpoint}",
+                    rate,
+                    self.burst,
+                    self.min_rate,
+                    self.max_rate,
+                )
+            else:
+                limit = AdaptiveRate(rate, self.burst, self.min_rate, self.max_rate)
+            self._limits[key] = limit
+        return limit
+
+    async def acquire(self, session: str, endpoint: str) -> None:
+        await self.limit(session, endpoint).acquire()
+
+    def record(self, session: str, endpoint: str, outcome: str) -> None:
+        limit = self.limit(session, endpoint)
+        limit.counts[outcome] = limit.counts.get(outcome, 0) + 1
+        if outcome == "ok":
+            limit.set_rate(limit.rate + self.increase)
+            return
+        if outcome == "throttled":
+            pause = self.throttle_pause
+        elif outcome == "blocked":
+            pause = self.block_pause
+        else:
+            return
+        limit.set_rate(limit.rate * self.decrease)
+        limit.pause(pause)
+        logger.warning(
+            f"{endpoint} 限速下调至 {limit.rate:.3f}/s 并暂停 {pause:.0f}s "
+            f"({outcome}) session={session}"
+        )
+
+    def forget(self, session: str) -> None:
+        for key in [k for k in self._limits if k[0] == session]:
+            del self._limits[key]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "session": session,
+                "endpoint": endpoint,
+                "rate": round(limit.rate, 4),
+                "paused_remaining": max(0, round(limit.paused_until - now, 1)),
+                **limit.counts,
+            }
+            for (session, endpoint), limit in self._limits.items()
+        ]
+
+
+def create_rate_controller(
+    settings: Any, state: Any = None, article_rate: float | None = None
+) -> AdaptiveRateController | None:
+    if not settings.rate_adaptive:
+        return None
+    return AdaptiveRateController(
+        initial_rate=settings.rate_initial,
+        min_rate=settings.rate_min,
+        max_rate=settings.rate_max,
+        increase=settings.rate_increase,
+        decrease=settings.rate_decrease,
+        burst=settings.rate_burst,
+        throttle_pause=settings.rate_throttle_pause,
+        block_pause=settings.fetch_block_pause,
+        initial_rates={"article": article_rate or settings.fetch_rate_per_host},
+        state=state,
+    )
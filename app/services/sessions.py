@@ -0,0 +1,165 @@
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+HOME_REFERER = (
+    "https://mp.weixin.qq.com/cgi-bin/home?t=home/index&lang=zh_CN&token={token}"
+)
+ARTICLE_HEADERS = {
+    "Referer": "https://mp.weixin.qq.com/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+}
+ANONYMOUS = "__anonymous__"
+
+
+def build_headers(wx_cfg: dict) -> Dict[str, str]:
+    token = wx_cfg.get("token")
+    if not token:
+        logger.warning("token 为空，可能导致 invalid args")
+    headers = {
+        "Cookie": wx_cfg.get("cookies_str"),
+        "User-Agent": wx_cfg.get("user_agent"),
+        "Referer": HOME_REFERER.format(token=token or ""),
+        "Accept": "application/json, text/plain, */*",
+    }
+    return {k: v for k, v in headers.items() if v is not None}
+
+
+class HttpIdentity:
+    def __init__(
+        self,
+        key: str,
+        headers: Mapping[str, str],
+        fingerprint: Tuple = (),
+        timeout: float = 15.0,
+        limits: httpx.Limits | None = None,
+    ) -> None:
+        self.key = key
+        self.headers: Mapping[str, str] = MappingProxyType(dict(headers))
+        self.fingerprint = fingerprint
+        self.timeout = timeout
+        self.limits = limits or httpx.Limits()
+        self.inflight = 0
+        self._session: Any = None
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def session(self) -> Any:
+        if self._session is None:
+            import requests
+
+            session = requests.Session()
+            session.trust_env = False
+            session.headers.update(self.headers)
+            self._session = session
+        return self._session
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=dict(self.headers),
+                timeout=self.timeout,
+                limits=self.limits,
+                trust_env=False,
+            )
+        return self._client
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class SessionRegistry:
+    def __init__(
+        self,
+        timeout: float = 15.0,
+        max_connections: int = 200,
+        max_keepalive: int = 50,
+        keepalive_expiry: float = 30.0,
+    ) -> None:
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._identities: Dict[str, HttpIdentity] = {}
+        self._retired: list[HttpIdentity] = []
+        self._lock = threading.Lock()
+
+    def _new_identity(
+        self, key: str, headers: Mapping[str, str], fingerprint: Tuple
+    ) -> HttpIdentity:
+        return HttpIdentity(
+            key, headers, fingerprint, timeout=self.timeout, limits=self.limits
+        )
+
+    def get(self, wx_cfg: dict) -> HttpIdentity:
+        key = wx_cfg.get("token") or ANONYMOUS
+        fingerprint = (wx_cfg.get("cookies_str"), wx_cfg.get("user_agent"))
+        with self._lock:
+            identity = self._identities.get(key)
+            if identity is not None and identity.fingerprint == fingerprint:
+                return identity
+            if identity is not None:
+                logger.info(f"会话 {key} 的 cookies 已变化，重建连接池")
+                self._retired.append(identity)
+            identity = self._new_identity(key, build_headers(wx_cfg), fingerprint)
+            self._identities[key] = identity
+            return identity
+
+    def anonymous(self) -> HttpIdentity:
+        with self._lock:
+            identity = self._identities.get(ANONYMOUS)
+            if identity is None:
+                identity = self._new_identity(ANONYMOUS, ARTICLE_HEADERS, ())
+                self._identities[ANONYMOUS] = identity
+            return identity
+
+    def drop(self, key: str) -> None:
+        with self._lock:
+            identity = self._identities.pop(key, None)
+            if identity is not None:
+                self._retired.append(identity)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return [k for k in self._identities if k != ANONYMOUS]
+
+    async def reap(self) -> int:
+        if not self._retired:
+            return 0
+        with self._lock:
+            idle = [i for i in self._retired if i.inflight <= 0]
+            self._retired = [i for i in self._retired if i.inflight > 0]
+        for identity in idle:
+            await identity.aclose()
+        return len(idle)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            identities = list(self._identities.values()) + self._retired
+            self._identities.clear()
+            self._retired.clear()
+        for identity in identities:
+            await identity.aclose()
+
+
+_default_registry: Optional[SessionRegistry] = None
+
+
+def default_registry() -> SessionRegistry:
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = SessionRegistry()
+    return _default_registry
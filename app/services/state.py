@@ -0,0 +1,281 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from loguru import logger
+
+STATE_DB = os.path.join("cfg", "state.db")
+STATE_BACKENDS = ("local", "sqlite", "redis")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS state_hash (
+    name TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (name, field)
+);
+"""
+
+RESERVE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[3]) / tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2]) / tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local next_tat = tat + interval
+local wait = next_tat - tolerance - now
+if wait < 0 then wait = 0 end
+local ttl = math.ceil((next_tat - now) * 1000) + 1000
+redis.call('SET', KEYS[1], string.format('%.6f', next_tat), 'PX', ttl)
+return string.format('%.6f', wait)
+"""
+
+HOLD_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local target = now + tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < target then
+    local ttl = math.ceil(tonumber(ARGV[1]) * 1000) + 1000
+    redis.call('SET', KEYS[1], string.format('%.6f', target), 'PX', ttl)
+end
+return 1
+"""
+
+DELETE_IF_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def to_text(value: Any) -> Any:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class SQLiteState:
+    def __init__(self, path: str = STATE_DB) -> None:
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _get(self, conn: sqlite3.Connection, key: str, now: float) -> Optional[str]:
+        row = conn.execute(
+            "SELECT value FROM state_kv WHERE key = ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (key, now),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _put(
+        self,
+        conn: sqlite3.Connection,
+        key: str,
+        value: str,
+        expires_at: float | None,
+    ) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO state_kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        return self._get(self._conn(), key, time.time())
+
+    def set(
+        self, key: str, value: str, ttl: float | None = None, nx: bool = False
+    ) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            if nx and self._get(conn, key, now) is not None:
+                return False
+            self._put(conn, key, value, now + ttl if ttl else None)
+        return True
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM state_kv WHERE key = ?", (key,))
+
+    def delete_if(self, key: str, value: str) -> bool:
+        cur = self._conn().execute(
+            "DELETE FROM state_kv WHERE key = ? AND value = ?", (key, value)
+        )
+        return cur.rowcount > 0
+
+    def incr(self, key: str) -> int:
+        with self._transaction() as conn:
+            value = int(self._get(conn, key, time.time()) or 0) + 1
+            self._put(conn, key, str(value), None)
+        return value
+
+    def hget(self, name: str, field: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM state_hash WHERE name = ? AND field = ?", (name, field)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def hset(self, name: str, field: str, value: str) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO state_hash (name, field, value) VALUES (?, ?, ?)",
+            (name, field, value),
+        )
+
+    def hsetnx(self, name: str, field: str, value: str) -> bool:
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO state_hash (name, field, value) VALUES (?, ?, ?)",
+            (name, field, value),
+        )
+        return cur.rowcount > 0
+
+    def hdel(self, name: str, field: str) -> bool:
+        cur = self._conn().execute(
+            "DELETE FROM state_hash WHERE name = ? AND field = ?", (name, field)
+        )
+        return cur.rowcount > 0
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        rows = self._conn().execute(
+            "SELECT field, value FROM state_hash WHERE name = ?", (name,)
+        )
+        return dict(rows.fetchall())
+
+    def reserve(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        now = time.time()
+        with self._transaction() as conn:
+            tat = max(float(self._get(conn, key, now) or 0), now)
+            next_tat = tat + cost / rate
+            self._put(conn, key, repr(next_tat), next_tat + 1)
+        return max(next_tat - burst / rate - now, 0.0)
+
+    def hold(self, key: str, seconds: float) -> None:
+        now = time.time()
+        target = now + seconds
+        with self._transaction() as conn:
+            if float(self._get(conn, key, now) or 0) < target:
+                self._put(conn, key, repr(target), target + 1)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": "sqlite", "path": self.path}
+
+
+class RedisState:
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "clawler:",
+        client: Any = None,
+    ) -> None:
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("使用 Redis 共享状态需要安装 redis") from None
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.url = url
+        self.prefix = prefix
+        self.client = client
+        self._reserve = client.register_script(RESERVE_LUA)
+        self._hold = client.register_script(HOLD_LUA)
+        self._delete_if = client.register_script(DELETE_IF_LUA)
+
+    def key(self, name: str) -> str:
+        return self.prefix + name
+
+    def get(self, key: str) -> Optional[str]:
+        return to_text(self.client.get(self.key(key)))
+
+    def set(
+        self, key: str, value: str, ttl: float | None = None, nx: bool = False
+    ) -> bool:
+        px = int(ttl * 1000) if ttl else None
+        return bool(self.client.set(self.key(key), value, px=px, nx=nx))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.key(key))
+
+    def delete_if(self, key: str, value: str) -> bool:
+        return bool(self._delete_if(keys=[self.key(key)], args=[value]))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.key(key)))
+
+    def hget(self, name: str, field: str) -> Optional[str]:
+        return to_text(self.client.hget(self.key(name), field))
+
+    def hset(self, name: str, field: str, value: str) -> None:
+        self.client.hset(self.key(name), field, value)
+
+    def hsetnx(self, name: str, field: str, value: str) -> bool:
+        return bool(self.client.hsetnx(self.key(name), field, value))
+
+    def hdel(self, name: str, field: str) -> bool:
+        return bool(self.client.hdel(self.key(name), field))
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        data = self.client.hgetall(self.key(name))
+        return {to_text(k): to_text(v) for k, v in data.items()}
+
+    def reserve(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        wait = self._reserve(keys=[self.key(key)], args=[rate, burst, cost])
+        return float(to_text(wait))
+
+    def hold(self, key: str, seconds: float) -> None:
+        self._hold(keys=[self.key(key)], args=[seconds])
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": "redis", "url": self.url, "prefix": self.prefix}
+
+
+def create_state_backend(
+    backend: str = "local",
+    path: str = STATE_DB,
+    redis_url: str = "redis://localhost:6379/0",
+    prefix: str = "clawler:",
+) -> Any:
+    if backend not in STATE_BACKENDS:
+        raise ValueError(f"不支持的共享状态后端: {backend}")
+    if backend == "local":
+        return None
+    if backend == "redis":
+        state: Any = RedisState(redis_url, prefix)
+    else:
+        state = SQLiteState(path)
+    logger.info(f"共享状态后端: {state.describe()}")
+    return state
@@ -1,35 +1,149 @@
+import glob
+import gzip
+import io
 import json
 import os
+import re
+import threading
 import time
-from typing import Any, Dict
+import zlib
+from typing import IO, Any, Dict, Iterator, List, Tuple
 
 from loguru import logger
 
+from app.services.decoding import loads
+from app.services.metrics import STORAGE_WRITE_SECONDS, timed
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 OUTPUT_JSON = os.path.join("cfg", "cookies.json")
+CHECKPOINT_JSON = os.path.join("cfg", "crawl_checkpoints.json")
+RAW_RESULT_JSONL = "appmsgpublish_result.jsonl"
+SEARCH_RESULT_JSONL = "searchbiz_result.jsonl"
+COMPRESSION_EXT = {None: "", "gzip": ".gz", "zstd": ".zst"}
+CURRENT_SESSION_KEY = "session:current"
+CHECKPOINTS_KEY = "crawl:checkpoints"
 
 
 class SessionStorage:
-    def __init__(self, path: str = OUTPUT_JSON) -> None:
+    def __init__(
+        self,
+        path: str = OUTPUT_JSON,
+        raw_data_file: str = RAW_RESULT_JSONL,
+        search_data_file: str = SEARCH_RESULT_JSONL,
+        result_compression: str | None = None,
+        result_segment_bytes: int | None = None,
+        result_fsync_every: int = 64,
+        result_fsync_interval: float = 1.0,
+        result_writer: str | None = None,
+        state: Any = None,
+    ) -> None:
         self.path = path
+        self.state = state
+        self.raw_data_file = raw_data_file
+        self.search_data_file = search_data_file
+        self._result_options = {
+            "compression": result_compression,
+            "segment_bytes": result_segment_bytes,
+            "fsync_every": result_fsync_every,
+            "fsync_interval": result_fsync_interval,
+            "writer": result_writer,
+        }
+        self._result_logs: Dict[str, ResultLog] = {}
+        self._result_lock = threading.Lock()
+        self._session_cache: Tuple[Any, Any, float] | None = None
+        self._missing_logged = False
+        self._expired_logged = False
 
-    def load_session(self) -> Dict[str, Any] | None:
+    def _stat_key(self) -> Any:
+        if self.state is not None:
+            return self.state.get(CURRENT_SESSION_KEY)
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            expiry = data.get("expiry")
-            if expiry and time.time() < expiry:
-                logger.info("复用本地 cookies")
-                return data
-            logger.warning("cookies 已过期或无效，需重新登录")
+            st = os.stat(self.path)
+        except OSError:
             return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _read_session(self, key: Any) -> Dict[str, Any] | None:
+        try:
+            if self.state is not None:
+                data = json.loads(key)
+            else:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            expiry = float(data.get("expiry") or 0)
         except Exception:
-            logger.info("未找到本地会话文件，需重新登录")
+            logger.warning("会话文件无法解析，需重新登录")
+            data, expiry = None, 0.0
+        self._session_cache = (key, data, expiry)
+        self._expired_logged = False
+        if data is not None:
+            logger.info("已加载本地 cookies")
+        return data
+
+    def load_session(self) -> Dict[str, Any] | None:
+        key = self._stat_key()
+        if key is None:
+            if self._session_cache is not None or not self._missing_logged:
+                logger.info("未找到本地会话文件，需重新登录")
+                self._missing_logged = True
+            self._session_cache = None
             return None
+        self._missing_logged = False
+        cached = self._session_cache
+        if cached is not None and cached[0] == key:
+            data, expiry = cached[1], cached[2]
+        else:
+            data = self._read_session(key)
+            expiry = self._session_cache[2]
+        if data is None:
+            return None
+        if expiry and time.time() < expiry:
+            return data
+        if not self._expired_logged:
+            logger.warning("cookies 已过期或无效，需重新登录")
+            self._expired_logged = True
+        return None
 
     def persist_session(self, data: Dict[str, Any]) -> None:
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if self.state is not None:
+            self.state.set(CURRENT_SESSION_KEY, json.dumps(data, ensure_ascii=False))
+        else:
+            write_json_atomic(self.path, data)
+        self._session_cache = None
+        self._expired_logged = False
+
+    def result_log(self, filename: str | None = None) -> "ResultLog":
+        filename = filename or self.raw_data_file
+        with self._result_lock:
+            log = self._result_logs.get(filename)
+            if log is None:
+                log = self._result_logs[filename] = ResultLog(
+                    filename, **self._result_options
+                )
+            return log
+
+    def append_result(self, new_data: Any, filename: str | None = None) -> None:
+        with timed(STORAGE_WRITE_SECONDS, "result_log"):
+            self.result_log(filename).append(new_data)
+
+    def append_search_result(self, record: Any) -> None:
+        self.append_result(record, self.search_data_file)
+
+    def iter_results(self, filename: str | None = None) -> Iterator[Any]:
+        filename = filename or self.raw_data_file
+        if filename.endswith(".json"):
+            return iter_json_results(filename)
+        return self.result_log(filename).iter_records()
+
+    def close(self) -> None:
+        with self._result_lock:
+            logs = list(self._result_logs.values())
+        for log in logs:
+            log.close()
 
     def append_json_result(self, filename: str, new_data: Any) -> None:
         try:
@@ -44,6 +158,233 @@ class SessionStorage:
             json.dump(history, f, ensure_ascii=False, indent=2)
 
 
+class CheckpointStore:
+    def __init__(self, path: str = CHECKPOINT_JSON, state: Any = None) -> None:
+        self.path = path
+        self.state = state
+        self._lock = threading.Lock()
+
+    def _read_all(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def load(self, fakeid: str) -> Dict[str, Any]:
+        if self.state is not None:
+            value = self.state.hget(CHECKPOINTS_KEY, fakeid)
+            return json.loads(value) if value else {}
+        with self._lock:
+            return dict(self._read_all().get(fakeid) or {})
+
+    def save(self, fakeid: str, checkpoint: Dict[str, Any]) -> None:
+        checkpoint = dict(checkpoint, updated_at=int(time.time()))
+        if self.state is not None:
+            self.state.hset(
+                CHECKPOINTS_KEY, fakeid, json.dumps(checkpoint, ensure_ascii=False)
+            )
+            return
+        with self._lock:
+            data = self._read_all()
+            data[fakeid] = checkpoint
+            write_json_atomic(self.path, data)
+
+    def all(self) -> Dict[str, Any]:
+        if self.state is not None:
+            return {
+                k: json.loads(v) for k, v in self.state.hgetall(CHECKPOINTS_KEY).items()
+            }
+        with self._lock:
+            return self._read_all()
+
+
+class ResultLog:
+    def __init__(
+        self,
+        path: str,
+        compression: str | None = None,
+        segment_bytes: int | None = None,
+        fsync_every: int = 64,
+        fsync_interval: float = 1.0,
+        writer: str | None = None,
+    ) -> None:
+        if compression not in COMPRESSION_EXT:
+            raise ValueError(f"不支持的压缩格式: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("使用 zstd 压缩需要安装 zstandard")
+        self.path = path
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.writer = re.sub(r"[^0-9A-Za-z_-]", "_", writer) if writer else None
+        self._lock = threading.Lock()
+        self._raw: IO[bytes] | None = None
+        self._writer: Any = None
+        self._segment_size = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def _stem(self) -> str:
+        root, ext = os.path.splitext(self.path)
+        return root if ext == ".jsonl" else self.path
+
+    @property
+    def _writer_stem(self) -> str:
+        return f"{self._stem}.{self.writer}" if self.writer else self._stem
+
+    def _segment_path(self, index: int) -> str:
+        ext = COMPRESSION_EXT[self.compression]
+        if self.segment_bytes is None:
+            if self.writer:
+                return f"{self._writer_stem}.jsonl{ext}"
+            return f"{self.path}{ext}"
+        return f"{self._writer_stem}.{index:05d}.jsonl{ext}"
+
+    def segments(self) -> List[str]:
+        if self.segment_bytes is None:
+            path = f"{self._writer_stem}.jsonl" if self.writer else self.path
+            candidates = [path + ext for ext in COMPRESSION_EXT.values()]
+            return [p for p in candidates if os.path.exists(p)]
+        pattern = f"{glob.escape(self._writer_stem)}.[0-9][0-9][0-9][0-9][0-9].jsonl*"
+        return sorted(glob.glob(pattern))
+
+    def all_segments(self) -> List[str]:
+        found = {self.path + ext for ext in COMPRESSION_EXT.values()}
+        found = {p for p in found if os.path.exists(p)}
+        found.update(glob.glob(f"{glob.escape(self._stem)}.*.jsonl*"))
+        return sorted(found)
+
+    def _open_segment(self) -> None:
+        index = 0
+        existing = self.segments()
+        if self.segment_bytes is not None and existing:
+            last = existing[-1]
+            index = int(re.search(r"\.(\d{5})\.jsonl", last).group(1))
+            if os.path.getsize(last) >= self.segment_bytes:
+                index += 1
+        path = self._segment_path(index)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._raw = open(path, "ab")
+        self._segment_size = self._raw.tell()
+        if self.compression == "gzip":
+            self._writer = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        elif self.compression == "zstd":
+            self._writer = zstandard.ZstdCompressor().stream_writer(
+                self._raw, closefd=False
+            )
+        else:
+            self._writer = self._raw
+
+    def _close_segment(self) -> None:
+        if self._raw is None:
+            return
+        self._sync()
+        if self._writer is not self._raw:
+            self._writer.close()
+        self._raw.close()
+        self._raw = self._writer = None
+
+    def _sync(self) -> None:
+        if self._raw is None:
+            return
+        if self.compression == "gzip":
+            self._writer.flush(zlib.Z_SYNC_FLUSH)
+        elif self.compression == "zstd":
+            self._writer.flush(zstandard.FLUSH_FRAME)
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, record: Any) -> None:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._raw is None:
+                self._open_segment()
+            self._writer.write(line)
+            self._segment_size += len(line)
+            self._pending += 1
+            if self._writer is self._raw:
+                self._raw.flush()
+            if (
+                self._pending >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval
+            ):
+                self._sync()
+            if (
+                self.segment_bytes is not None
+                and self._segment_size >= self.segment_bytes
+            ):
+                self._close_segment()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_segment()
+
+    def iter_records(self) -> Iterator[Any]:
+        self.flush()
+        for path in self.all_segments():
+            yield from _iter_jsonl(path)
+
+
+def _open_compressed(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("读取 zstd 文件需要安装 zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True
+        )
+    return open(path, "rb")
+
+
+def _iter_jsonl(path: str) -> Iterator[Any]:
+    with _open_compressed(path) as raw:
+        reader = io.BufferedReader(raw) if path.endswith(".zst") else raw
+        while True:
+            try:
+                line = reader.readline()
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                logger.debug(f"{path} 末尾存在未完整写入的数据，已跳过")
+                return
+            if not line:
+                return
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except ValueError:
+                logger.warning(f"{path} 存在无法解析的行，已跳过")
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def iter_json_results(filename: str) -> Iterator[Any]:
+    with open(filename, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    yield from ([data] if isinstance(data, dict) else data)
+
+
 def load_session(path: str) -> Dict[str, Any] | None:
     return SessionStorage(path).load_session()
 
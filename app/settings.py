@@ -1,13 +1,126 @@
 from __future__ import annotations
 
+import os
+
 from pydantic import BaseModel
 
+ENV_PREFIX = "CLAWLER_"
+ROLES = ("api", "login", "fetch")
+
 
 class Settings(BaseModel):
     cookies_path: str = "cfg/cookies.json"
     qr_save_path: str = "wx_login_qrcode.png"
-    raw_data_file: str = "appmsgpublish_result.json"
+    browser_headless: bool = True
+    browser_pool_size: int = 1
+    browser_warm_on_start: bool = False
+    login_scan_timeout: float = 180.0
+    token_refresh_interval: float = 600.0
+    token_refresh_margin: float = 3600.0
+    sessions_dir: str = "cfg/sessions"
+    pool_strategy: str = "least_loaded"
+    pool_freq_cooldown: float = 1800.0
+    pool_error_cooldown: float = 300.0
+    pool_error_threshold: float = 0.5
+    raw_data_file: str = "appmsgpublish_result.jsonl"
+    search_data_file: str = "searchbiz_result.jsonl"
+    result_compression: str | None = None
+    result_segment_bytes: int | None = None
+    result_fsync_every: int = 64
+    result_fsync_interval: float = 1.0
     links_output_file: str = "title_url_map.json"
+    wx_base_url: str = "https://mp.weixin.qq.com"
+    http_timeout: float = 15.0
+    http_max_connections: int = 200
+    http_max_keepalive: int = 50
+    http_keepalive_expiry: float = 30.0
+    http_per_host_limit: int = 100
+    cache_max_entries: int = 2048
+    cache_disk_path: str | None = None
+    cache_searchbiz_ttl: float = 86400.0
+    cache_appmsgpublish_ttl: float = 300.0
+    index_path: str = "cfg/articles.db"
+    fulltext_enabled: bool = True
+    fulltext_tokenizer: str = "bigram"
+    fulltext_title_weight: float = 5.0
+    fulltext_snippet_chars: int = 120
+    accounts_path: str = "cfg/accounts.db"
+    search_count: int = 5
+    search_batch_concurrency: int = 4
+    search_batch_max_names: int = 5000
+    search_negative_ttl: float = 86400.0
+    article_storage: str = "files"
+    blob_backend: str = "local"
+    blob_root: str = "cfg/blobs"
+    blob_manifest_path: str = "cfg/manifest.db"
+    blob_compression: str | None = "zstd"
+    blob_level: int = 3
+    blob_dictionary_path: str | None = None
+    blob_s3_bucket: str | None = None
+    blob_s3_prefix: str = ""
+    blob_s3_endpoint_url: str | None = None
+    fetch_skip_stored: bool = True
+    refresh_enabled: bool = True
+    refresh_path: str = "cfg/freshness.db"
+    refresh_min_interval: float = 3600.0
+    refresh_max_interval: float = 2592000.0
+    refresh_age_factor: float = 0.25
+    refresh_keep_versions: bool = True
+    rate_adaptive: bool = True
+    rate_initial: float = 1.0
+    rate_min: float = 0.05
+    rate_max: float = 5.0
+    rate_increase: float = 0.05
+    rate_decrease: float = 0.5
+    rate_burst: float = 2.0
+    rate_throttle_pause: float = 60.0
+    debug_payload_sample_rate: float = 0.0
+    debug_payload_max_chars: int = 2048
+    tracing_enabled: bool = False
+    fetch_concurrency: int = 8
+    fetch_rate_per_host: float = 2.0
+    fetch_burst: float = 4.0
+    fetch_max_retries: int = 4
+    fetch_backoff_base: float = 1.0
+    fetch_backoff_cap: float = 60.0
+    fetch_block_pause: float = 300.0
+    fetch_timeout: float = 15.0
+    parse_workers: int = 0
+    parse_queue_size: int = 256
+    crawl_checkpoint_path: str = "cfg/crawl_checkpoints.json"
+    crawl_page_size: int = 20
+    crawl_page_delay: float = 1.0
+    jobs_path: str = "cfg/jobs.db"
+    jobs_in_api: bool = True
+    job_concurrency: int = 2
+    job_poll_interval: float = 1.0
+    job_lease: float = 600.0
+    job_max_attempts: int = 5
+    job_backoff_base: float = 30.0
+    job_backoff_cap: float = 1800.0
+    state_backend: str = "local"
+    state_path: str = "cfg/state.db"
+    state_redis_url: str = "redis://localhost:6379/0"
+    state_prefix: str = "clawler:"
+    worker_id: str | None = None
+    roles: str = "api,login,fetch"
+
+
+def parse_roles(value: str) -> set[str]:
+    roles = {r.strip() for r in value.split(",") if r.strip()}
+    unknown = roles - set(ROLES)
+    if unknown:
+        raise ValueError(f"不支持的进程角色: {', '.join(sorted(unknown))}")
+    return roles
+
+
+def load_settings() -> Settings:
+    overrides = {
+        name: os.environ[ENV_PREFIX + name.upper()]
+        for name in Settings.model_fields
+        if ENV_PREFIX + name.upper() in os.environ
+    }
+    return Settings(**overrides)
 
 
-settings = Settings()
+settings = load_settings()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.decoding import PublishDecoder, available_backends
+from app.services.storage import ResultLog
+
+
+def load_corpus(path: str) -> list[bytes]:
+    lines = []
+    for record in ResultLog(path).iter_records():
+        if isinstance(record, dict) and record.get("publish_page"):
+            lines.append(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+    return lines
+
+
+def bench(decoder: PublishDecoder, lines: list[bytes], rounds: int) -> float:
+    start = time.perf_counter()
+    articles = 0
+    for _ in range(rounds):
+        for line in lines:
+            articles += len(decoder.extract_articles(decoder.loads(line)))
+    elapsed = time.perf_counter() - start
+    per_page = elapsed / (rounds * len(lines)) * 1e6
+    print(
+        f"{decoder.backend:<8} total={elapsed:.3f}s per_page={per_page:.1f}us "
+        f"articles={articles}"
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="appmsgpublish 响应解码基准")
+    parser.add_argument("--input", default="appmsgpublish_result.jsonl")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    lines = load_corpus(args.input)
+    if not lines:
+        raise SystemExit(f"{args.input} 中没有 appmsgpublish 响应")
+    print(f"pages={len(lines)} bytes={sum(map(len, lines))}")
+
+    baseline = PublishDecoder("json")
+    expected = [baseline.extract_articles(baseline.loads(line)) for line in lines]
+    timings = {}
+    for backend in available_backends():
+        decoder = PublishDecoder(backend)
+        got = [decoder.extract_articles(decoder.loads(line)) for line in lines]
+        if got != expected:
+            print(f"{backend} 输出与 json 不一致")
+        timings[backend] = bench(decoder, lines, args.rounds)
+    for backend, elapsed in timings.items():
+        print(f"{backend:<8} speedup={timings['json'] / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
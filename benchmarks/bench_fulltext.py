@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.fulltext import FullTextIndex
+from app.services.index import ArticleIndex
+
+
+class Corpus:
+    def __init__(self, vocabulary: int, seed: int) -> None:
+        self.rng = random.Random(seed)
+        chars = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+        self.words = [
+            "".join(self.rng.choices(chars, k=self.rng.choice((2, 2, 2, 3, 4))))
+            for _ in range(vocabulary)
+        ]
+        weights = (1 / (rank + 1) for rank in range(vocabulary))
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def text(self, length: int) -> str:
+        parts, size = [], 0
+        while size < length:
+            words = self.rng.choices(self.words, cum_weights=self.cum_weights, k=12)
+            sentence = "".join(words) + "。"
+            parts.append(sentence)
+            size += len(sentence)
+        return "".join(parts)
+
+    def query(self) -> str:
+        words = self.rng.choices(self.words, cum_weights=self.cum_weights, k=1)
+        if self.rng.random() < 0.3:
+            words.append(self.rng.choice(self.words))
+        return " ".join(words)
+
+
+def article(corpus: Corpus, n: int, chars: int) -> tuple[str, dict]:
+    url = f"https://mp.weixin.qq.com/s?__biz=BENCH{n % 500}&mid={n}&idx=1"
+    data = {
+        "biz": f"BENCH{n % 500}",
+        "title": corpus.text(16)[:24],
+        "author": f"作者{n % 500}",
+        "create_time": 1_600_000_000 + n * 60,
+        "content": corpus.text(chars),
+    }
+    return url, data
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+
+def run_queries(index: ArticleIndex, corpus: Corpus, count: int, label: str) -> None:
+    latencies, hits = [], 0
+    for _ in range(count):
+        q = corpus.query()
+        started = time.perf_counter()
+        hits += len(index.fulltext_search(q, limit=20))
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{label:<16} queries={count} p50={percentile(latencies, 0.5):.2f}ms "
+        f"p99={percentile(latencies, 0.99):.2f}ms avg_hits={hits / count:.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="全文索引基准（合成语料）")
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--chars", type=int, default=800, help="每篇正文字数")
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--incremental", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--tokenizer", default="bigram")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", help="保留生成的数据库到该目录")
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="clawler-fts-")
+    path = os.path.join(workdir, "articles.db")
+    corpus = Corpus(args.vocabulary, args.seed)
+    try:
+        plain = ArticleIndex(path)
+        started = time.perf_counter()
+        batch = []
+        for n in range(args.docs):
+            url, data = article(corpus, n, args.chars)
+            key = ("BENCH", str(n), 1)
+            batch.append(
+                {
+                    "biz": key[0],
+                    "appmsgid": key[1],
+                    "itemidx": key[2],
+                    "title": data["title"],
+                    "link": url,
+                    "author": data["author"],
+                    "create_time": data["create_time"],
+                    "content": data["content"],
+                }
+            )
+            if len(batch) == 5000:
+                plain._upsert(batch, ("content",))
+                batch = []
+        plain._upsert(batch, ("content",))
+        elapsed = time.perf_counter() - started
+        print(f"corpus           docs={args.docs} {elapsed:.1f}s")
+
+        index = ArticleIndex(path, fulltext=FullTextIndex(args.tokenizer))
+        started = time.perf_counter()
+        count = index.build_fulltext(optimize=False)
+        elapsed = time.perf_counter() - started
+        print(
+            f"bulk index       docs={count} {elapsed:.1f}s "
+            f"{count / elapsed:.0f} docs/s"
+        )
+        run_queries(index, corpus, args.queries, "before optimize")
+
+        started = time.perf_counter()
+        index.fulltext.optimize(index._conn())
+        print(f"optimize         {time.perf_counter() - started:.1f}s")
+        run_queries(index, corpus, args.queries, "after optimize")
+
+        started = time.perf_counter()
+        for n in range(args.incremental):
+            url, data = article(corpus, args.docs + n, args.chars)
+            index.upsert_details(url, data)
+        elapsed = time.perf_counter() - started
+        print(
+            f"incremental      docs={args.incremental} "
+            f"{args.incremental / elapsed:.0f} docs/s"
+        )
+        run_queries(index, corpus, args.queries, "after updates")
+        size = sum(
+            os.path.getsize(os.path.join(workdir, f)) for f in os.listdir(workdir)
+        )
+        print(f"database         {size / 2**20:.1f} MB {index.fulltext_stats()}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
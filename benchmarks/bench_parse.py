@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.parsing import decode_html, extract_article, extract_article_bs4
+
+
+def load_corpus(directory: str) -> list[tuple[str, bytes]]:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "rb") as f:
+            corpus.append((path, f.read()))
+    return corpus
+
+
+def bench(name: str, fn, pages: list[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            fn(html)
+    elapsed = time.perf_counter() - start
+    per_page = elapsed / (rounds * len(pages)) * 1000
+    print(f"{name:<8} total={elapsed:.3f}s per_page={per_page:.3f}ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="文章 HTML 解析基准")
+    parser.add_argument("--dir", default="HTML", help="保存的文章 HTML 目录")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.dir)
+    if not corpus:
+        raise SystemExit(f"{args.dir} 下没有 .html 文件")
+
+    pages = []
+    mismatches = 0
+    for path, body in corpus:
+        html = decode_html(body)
+        try:
+            expected = extract_article_bs4(html)
+        except Exception:
+            continue
+        if extract_article(html) != expected:
+            mismatches += 1
+            print(f"输出不一致: {path}")
+        pages.append(html)
+    total_bytes = sum(len(body) for _, body in corpus)
+    print(f"pages={len(pages)} mismatches={mismatches} bytes={total_bytes}")
+
+    start = time.perf_counter()
+    for _, body in corpus:
+        decode_html(body, "text/html; charset=utf-8")
+    print(f"decode   total={time.perf_counter() - start:.3f}s")
+
+    slow = bench("bs4", extract_article_bs4, pages, args.rounds)
+    fast = bench("lxml", extract_article, pages, args.rounds)
+    print(f"speedup={slow / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = (
+    "fastapi",
+    "uvicorn",
+    "httpx",
+    "requests",
+    "selenium",
+    "lxml",
+    "bs4",
+    "PIL",
+    "jieba",
+    "opentelemetry",
+)
+TARGETS = {
+    "serve": ("api,login,fetch", "import app.main"),
+    "api": ("api", "import app.main"),
+    "login": (
+        "api,login",
+        "import app.main\n"
+        "import selenium.webdriver\n"
+        "import selenium.webdriver.support.expected_conditions",
+    ),
+    "fetch": (
+        "api,login,fetch",
+        "import run\n"
+        "from app.services.fetcher import BulkFetcher\n"
+        "from app.services.pipeline import ParsePipeline",
+    ),
+    "parse": (
+        "api,login,fetch",
+        "from app.services.pipeline import parse_worker\n"
+        "import lxml.html",
+    ),
+}
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|( *)(\S+)")
+
+
+def child_env(roles: str) -> dict[str, str]:
+    env = dict(os.environ)
+    env["CLAWLER_ROLES"] = roles
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (ROOT, env.get("PYTHONPATH")) if p
+    )
+    return env
+
+
+def probe(roles: str, code: str, cwd: str) -> tuple[float, dict]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY)],
+        cwd=cwd,
+        env=child_env(roles),
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1])
+    return wall, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def top_packages(roles: str, code: str, cwd: str, count: int) -> list[tuple]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd,
+        env=child_env(roles),
+        capture_output=True,
+        text=True,
+    )
+    totals: dict[str, int] = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            totals[m.group(3).split(".")[0]] += int(m.group(1))
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="各运行模式的导入耗时与内存基准")
+    parser.add_argument("--modes", default=",".join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="列出耗时最多的顶层包")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="clawler-startup-")
+    try:
+        for mode in args.modes.split(","):
+            roles, code = TARGETS[mode]
+            probe(roles, code, workdir)
+            walls, imports, rss = [], [], []
+            for _ in range(args.repeat):
+                wall, result = probe(roles, code, workdir)
+                walls.append(wall)
+                imports.append(result["import_seconds"])
+                rss.append(result["rss_kb"])
+            print(
+                f"{mode:<6} process={statistics.median(walls) * 1000:.0f}ms "
+                f"import={statistics.median(imports) * 1000:.0f}ms "
+                f"rss={statistics.median(rss) / 1024:.1f}MB "
+                f"loaded={','.join(result['loaded']) or '-'}"
+            )
+            for name, micros in top_packages(roles, code, workdir, args.top):
+                print(f"       {name:<24} {micros / 1000:.1f}ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+
+import uvicorn
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import HTMLResponse, RedirectResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.clawlers import ANTI_BOT_MARKER
+from app.services.ratelimit import TokenBucket
+from app.services.storage import ResultLog
+
+WX_HOST = "https://mp.weixin.qq.com"
+FREQ_CONTROL = {"base_resp": {"ret": 200013, "err_msg": "freq control"}}
+LOGIN_TOKEN = "1000000001"
+SESSION_MAX_AGE = 4 * 86400
+PUBLISHED_AT = 1704067200.0
+DELETED_PAGE = "<html><body><p>该内容已被发布者删除</p></body></html>"
+
+LOGIN_PAGE = """<!DOCTYPE html><html><head><meta charset="utf-8"></head>
+<body><div class="login__type__container__scan__qrcode">
+<img src="/_login/qrcode.png" width="200" height="200"></div>
+<script>setInterval(function () {
+  fetch("/_login/status").then(function (r) { return r.json(); })
+    .then(function (s) { if (s.scanned) { location.href = "/"; } });
+}, 200);</script></body></html>"""
+HOME_PAGE = """<!DOCTYPE html><html><head><meta charset="utf-8"></head>
+<body><a href="/cgi-bin/appmsg?t=media/appmsg_edit&token={token}&lang=zh_CN">
+新的创作</a></body></html>"""
+
+
+def qr_png(size: int = 200, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    cells = [[rng.random() < 0.5 for _ in range(25)] for _ in range(25)]
+    rows = []
+    for y in range(size):
+        row = cells[y * 25 // size]
+        pixels = bytes(0 if row[x * 25 // size] else 255 for x in range(size))
+        rows.append(b"\x00" + pixels)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"".join(rows)))
+        + chunk(b"IEND", b"")
+    )
+
+ARTICLE_TEMPLATE = """<!DOCTYPE html><html><head><meta charset="utf-8">
+<script>var biz = "{biz}" || "";var createTime = '{create_time}';
+var msg_link = "{link}";</script></head>
+<body><h1 class="rich_media_title " id="activity-name">{title}</h1>
+<a id="js_name" href="#">{author}</a>
+<div class="rich_media_content " id="js_content">{body}</div>
+</body></html>"""
+
+
+def publish_response(publish_list: list[dict], total: int) -> dict:
+    publish_page = {"total_count": total, "publish_list": publish_list}
+    return {
+        "base_resp": {"ret": 0, "err_msg": "ok"},
+        "publish_page": json.dumps(publish_page, ensure_ascii=False),
+    }
+
+
+class Fixtures:
+    def __init__(self, directory: str | None, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.search = None
+        self.searches: dict[str, dict] = {}
+        self.pages: list[dict] = []
+        self.articles: list[str] = []
+        if directory:
+            self._load(directory)
+
+    def _rewrite(self, text: str) -> str:
+        return text.replace(WX_HOST, self.base_url).replace(
+            WX_HOST.replace("/", "\\/"), self.base_url.replace("/", "\\/")
+        )
+
+    def _load(self, directory: str) -> None:
+        path = os.path.join(directory, "searchbiz_result.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.search = json.load(f)
+        path = os.path.join(directory, "searchbiz_result.jsonl")
+        if os.path.exists(path):
+            for record in ResultLog(path).iter_records():
+                if isinstance(record, dict) and "query" in record:
+                    self.searches[record["query"]] = record["response"]
+        path = os.path.join(directory, "appmsgpublish_result.jsonl")
+        if os.path.exists(path):
+            for record in ResultLog(path).iter_records():
+                if isinstance(record, dict) and record.get("publish_page"):
+                    text = self._rewrite(json.dumps(record, ensure_ascii=False))
+                    self.pages.append(json.loads(text))
+        for path in sorted(glob.glob(os.path.join(directory, "HTML", "*.html"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                self.articles.append(f.read())
+        print(
+            f"fixtures: search={self.search is not None or len(self.searches)} "
+            f"pages={len(self.pages)} "
+            f"articles={len(self.articles)}"
+        )
+
+    def search_result(self, query: str) -> dict:
+        if query in self.searches:
+            return self.searches[query]
+        if self.search is not None:
+            return self.search
+        names = (f"{query}资讯", query, f"{query}服务号")
+        items = []
+        for name in names:
+            fakeid = f"MzI{zlib.crc32(name.encode('utf-8')) % 10**8:08d}=="
+            items.append({"fakeid": fakeid, "nickname": name, "alias": ""})
+        return {
+            "base_resp": {"ret": 0, "err_msg": "ok"},
+            "list": items,
+            "total": len(items),
+        }
+
+    def publish_page(self, fakeid: str, begin: int, count: int, total: int) -> dict:
+        if self.pages:
+            page = begin // max(count, 1)
+            if page < len(self.pages):
+                return self.pages[page]
+            return publish_response([], begin)
+        publish_list = []
+        for n in range(begin, min(begin + count, total)):
+            mid = 2_000_000_000 - n
+            create_time = 1_700_000_000 - n * 3600
+            appmsgex = [
+                {
+                    "aid": f"{mid}_{idx}",
+                    "appmsgid": mid,
+                    "itemidx": idx,
+                    "title": f"{fakeid} 第 {n} 期 第 {idx} 篇",
+                    "digest": "基准测试摘要" * 5,
+                    "link": f"{self.base_url}/s?__biz={fakeid}&mid={mid}&idx={idx}",
+                    "cover": f"{self.base_url}/cover/{mid}_{idx}.jpg",
+                    "create_time": create_time,
+                    "update_time": create_time,
+                }
+                for idx in (1, 2, 3)
+            ]
+            publish_info = {"type": 9, "appmsgex": appmsgex}
+            publish_list.append(
+                {
+                    "publish_type": 101,
+                    "publish_info": json.dumps(publish_info, ensure_ascii=False),
+                }
+            )
+        return publish_response(publish_list, total)
+
+    def article(self, biz: str, mid: str, idx: str) -> str:
+        if self.articles:
+            key = f"{biz}:{mid}:{idx}".encode("utf-8")
+            return self.articles[zlib.crc32(key) % len(self.articles)]
+        link = f"{self.base_url}/s?__biz={biz}&amp;mid={mid}&amp;idx={idx}"
+        body = "".join(f"<p>第 {i} 段正文内容，用于基准测试。</p>" for i in range(200))
+        return ARTICLE_TEMPLATE.format(
+            biz=biz,
+            create_time="2024-01-01 08:00",
+            link=link,
+            title=f"文章 {mid}-{idx}",
+            author="基准测试",
+            body=body,
+        )
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    base_url = args.base_url or f"http://{args.host}:{args.port}"
+    fixtures = Fixtures(args.fixtures, base_url)
+    bucket = TokenBucket(args.max_rps, args.max_rps) if args.max_rps else None
+    counters = {"requests": 0, "throttled": 0, "blocked": 0, "not_modified": 0}
+    edits: dict[str, tuple[int, float]] = {}
+    deleted: set[str] = set()
+    app = FastAPI(title="Fake WeChat backend")
+
+    async def delay() -> None:
+        latency = args.latency_ms + random.uniform(0, args.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def throttled() -> bool:
+        counters["requests"] += 1
+        over = bucket is not None and not bucket.try_acquire()
+        if over or random.random() < args.throttle_rate:
+            counters["throttled"] += 1
+            return True
+        return False
+
+    @app.get("/cgi-bin/searchbiz")
+    async def searchbiz(query: str = Query("")) -> dict:
+        await delay()
+        if throttled():
+            return FREQ_CONTROL
+        return fixtures.search_result(query)
+
+    @app.get("/cgi-bin/appmsgpublish")
+    async def appmsgpublish(
+        fakeid: str = Query(""), begin: int = Query(0), count: int = Query(5)
+    ) -> dict:
+        await delay()
+        if throttled():
+            return FREQ_CONTROL
+        return fixtures.publish_page(fakeid, begin, count, args.total_publishes)
+
+    def not_modified(request: Request, etag: str, modified: float) -> bool:
+        match = request.headers.get("If-None-Match")
+        if match is not None:
+            return etag in [tag.strip() for tag in match.split(",")]
+        since = request.headers.get("If-Modified-Since")
+        if since is None:
+            return False
+        try:
+            return parsedate_to_datetime(since).timestamp() >= int(modified)
+        except (TypeError, ValueError):
+            return False
+
+    @app.get("/s")
+    async def article(request: Request) -> Response:
+        await delay()
+        counters["requests"] += 1
+        if random.random() < args.block_rate:
+            counters["blocked"] += 1
+            html = f"<html><body>{ANTI_BOT_MARKER}</body></html>"
+            return Response(content=html, media_type="text/html; charset=utf-8")
+        q = request.query_params
+        mid = q.get("mid", "")
+        if mid in deleted:
+            return Response(content=DELETED_PAGE, media_type="text/html; charset=utf-8")
+        html = fixtures.article(q.get("__biz", ""), mid, q.get("idx", "1"))
+        revision, modified = edits.get(mid, (0, PUBLISHED_AT))
+        if revision:
+            html = html.replace(
+                'id="js_content">', f'id="js_content"><p>第 {revision} 次修改</p>', 1
+            )
+        etag = f'"{zlib.crc32(html.encode("utf-8")):08x}"'
+        headers = {"ETag": etag, "Last-Modified": formatdate(modified, usegmt=True)}
+        if not_modified(request, etag, modified):
+            counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=html, media_type="text/html; charset=utf-8", headers=headers
+        )
+
+    @app.post("/_articles/{mid}/edit")
+    def edit_article(mid: str) -> dict:
+        revision = edits.get(mid, (0, PUBLISHED_AT))[0] + 1
+        edits[mid] = (revision, time.time())
+        return {"mid": mid, "revision": revision}
+
+    @app.post("/_articles/{mid}/delete")
+    def delete_article(mid: str) -> dict:
+        deleted.add(mid)
+        return {"mid": mid, "deleted": True}
+
+    login = {"scanned": False}
+    qrcode = qr_png()
+
+    @app.get("/")
+    def login_page() -> Response:
+        if not login["scanned"]:
+            return HTMLResponse(LOGIN_PAGE)
+        resp = RedirectResponse(
+            f"/cgi-bin/home?t=home/index&lang=zh_CN&token={LOGIN_TOKEN}", 302
+        )
+        resp.set_cookie("slave_sid", f"fake-{LOGIN_TOKEN}", max_age=SESSION_MAX_AGE)
+        resp.set_cookie("slave_user", "gh_fake", max_age=SESSION_MAX_AGE)
+        return resp
+
+    @app.get("/cgi-bin/home")
+    def home(request: Request) -> Response:
+        if request.cookies.get("slave_sid") != f"fake-{LOGIN_TOKEN}":
+            return RedirectResponse("/", 302)
+        return HTMLResponse(HOME_PAGE.format(token=LOGIN_TOKEN))
+
+    @app.get("/_login/qrcode.png")
+    def login_qrcode() -> Response:
+        return Response(content=qrcode, media_type="image/png")
+
+    @app.get("/_login/status")
+    def login_status() -> dict:
+        return login
+
+    @app.post("/_login/scan")
+    def login_scan() -> dict:
+        login["scanned"] = True
+        return login
+
+    @app.get("/_stats")
+    def stats() -> dict:
+        return {**counters, "time": time.time()}
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="本地模拟 mp.weixin.qq.com")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9010)
+    parser.add_argument("--base-url", help="文章链接使用的地址，默认 http://host:port")
+    parser.add_argument(
+        "--fixtures",
+        help="录制目录，可包含 searchbiz_result.json(l)、appmsgpublish_result.jsonl、HTML/",
+    )
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0.0, help="随机返回 ret=200013 的比例"
+    )
+    parser.add_argument(
+        "--max-rps", type=float, default=0.0, help="接口超过该速率返回 ret=200013"
+    )
+    parser.add_argument(
+        "--block-rate", type=float, default=0.0, help="文章页返回环境异常验证页的比例"
+    )
+    parser.add_argument("--total-publishes", type=int, default=200)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
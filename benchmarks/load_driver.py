@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+SCENARIOS = ("search", "articles", "details")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(pid: int) -> list[int]:
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            with open(f"/proc/{current}/task/{current}/children", "r") as f:
+                pending.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def cpu_seconds(pid: int) -> float | None:
+    total, found = 0.0, False
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        total += (int(fields[11]) + int(fields[12])) / CLK_TCK
+        found = True
+    return total if found else None
+
+
+def memory_mb(pid: int) -> dict:
+    found: dict = {}
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/status", "r") as f:
+                for line in f:
+                    if line.startswith(("VmRSS:", "VmHWM:")):
+                        name, value = line.split(":", 1)
+                        found[name] = found.get(name, 0) + int(value.split()[0])
+        except OSError:
+            continue
+    return {
+        "rss_mb": round(found["VmRSS"] / 1024, 1) if "VmRSS" in found else None,
+        "peak_rss_mb": round(found["VmHWM"] / 1024, 1) if "VmHWM" in found else None,
+    }
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return round(values[k] * 1000, 2)
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"等待 {url} 启动超时")
+
+
+class Stack:
+    def __init__(self, args: argparse.Namespace, concurrency: int) -> None:
+        self.args = args
+        self.concurrency = concurrency
+        self.workdir = tempfile.mkdtemp(prefix="clawler-bench-")
+        self.procs: list[subprocess.Popen] = []
+        self.fake_url = args.fake
+        self.target = args.target
+        self.pid = args.pid
+
+    def _spawn(self, cmd: list[str], env: dict) -> subprocess.Popen:
+        path = os.path.join(self.workdir, f"proc{len(self.procs)}.log")
+        with open(path, "wb") as log:
+            proc = subprocess.Popen(
+                cmd, cwd=self.workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+        self.procs.append(proc)
+        return proc
+
+    async def start(self) -> None:
+        paths = [ROOT, os.environ.get("PYTHONPATH", "")]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in paths if p))
+        if self.fake_url is None:
+            port = free_port()
+            self.fake_url = f"http://127.0.0.1:{port}"
+            cmd = [
+                sys.executable,
+                os.path.join(ROOT, "benchmarks", "fake_wechat.py"),
+                "--port",
+                str(port),
+                "--latency-ms",
+                str(self.args.latency_ms),
+                "--jitter-ms",
+                str(self.args.jitter_ms),
+                "--throttle-rate",
+                str(self.args.throttle_rate),
+                "--max-rps",
+                str(self.args.max_rps),
+                "--block-rate",
+                str(self.args.block_rate),
+            ]
+            if self.args.fixtures:
+                cmd += ["--fixtures", os.path.abspath(self.args.fixtures)]
+            self._spawn(cmd, env)
+            await wait_ready(f"{self.fake_url}/_stats")
+        if self.target is not None:
+            return
+        sessions = os.path.join(self.workdir, "cfg", "sessions")
+        os.makedirs(sessions)
+        with open(os.path.join(sessions, "bench.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {"token": "bench", "cookies_str": "bench=1", "expiry": 4102444800}, f
+            )
+        port = free_port()
+        self.target = f"http://127.0.0.1:{port}"
+        env.update(
+            {
+                "CLAWLER_WX_BASE_URL": self.fake_url,
+                "CLAWLER_CACHE_SEARCHBIZ_TTL": "0",
+                "CLAWLER_CACHE_APPMSGPUBLISH_TTL": "0",
+                "CLAWLER_RATE_ADAPTIVE": str(self.args.adaptive).lower(),
+                "CLAWLER_JOBS_IN_API": str(self.args.api_workers > 1).lower(),
+                "CLAWLER_FETCH_CONCURRENCY": str(self.concurrency),
+                "CLAWLER_FETCH_RATE_PER_HOST": "100000",
+                "CLAWLER_FETCH_BURST": "100000",
+            }
+        )
+        cmd = [sys.executable, os.path.join(ROOT, "run.py"), "--port", str(port)]
+        if self.args.api_workers > 1:
+            env.setdefault("CLAWLER_STATE_BACKEND", "sqlite")
+            cmd += ["--workers", str(self.args.api_workers)]
+        proc = self._spawn(cmd, env)
+        self.pid = proc.pid
+        await wait_ready(f"{self.target}/health")
+
+    def stop(self) -> None:
+        for proc in reversed(self.procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if not self.args.keep:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+async def closed_loop(
+    client: httpx.AsyncClient, concurrency: int, total: int, request
+) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                resp = await request(client, i)
+                ok = resp.status_code == 200 and resp.json().get("ok", True)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+async def run_search(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    return await client.get("/search", params={"keyword": f"bench{i % 50}"})
+
+
+async def run_articles(client: httpx.AsyncClient, i: int) -> httpx.Response:
+    params = {"fakeid": f"F{i % 20}", "begin": (i * 5) % 200, "count": 5}
+    return await client.get("/articles", params={**params, "include_raw": "false"})
+
+
+async def run_details_job(
+    client: httpx.AsyncClient, urls: list[str]
+) -> tuple[dict, float]:
+    started = time.perf_counter()
+    resp = await client.post(
+        "/jobs", json={"kind": "fetch_details", "payload": {"urls": urls}}
+    )
+    resp.raise_for_status()
+    job_id = resp.json()["job"]["id"]
+    while True:
+        await asyncio.sleep(0.2)
+        job = (await client.get(f"/jobs/{job_id}")).json()["job"]
+        if job["status"] in ("done", "failed", "cancelled"):
+            stats = job["result"] or {"total": len(urls), "failed": len(urls)}
+            return {**stats, "done": stats["total"]}, time.perf_counter() - started
+
+
+async def run_details(
+    client: httpx.AsyncClient, fake_url: str, total: int, shared: bool = False
+) -> tuple[dict, float]:
+    urls = [f"{fake_url}/s?__biz=BENCH&mid={1000 + i}&idx=1" for i in range(total)]
+    if shared:
+        return await run_details_job(client, urls)
+    started = time.perf_counter()
+    resp = await client.post("/articles/details/batch", json={"urls": urls})
+    resp.raise_for_status()
+    while True:
+        await asyncio.sleep(0.2)
+        status = (await client.get("/articles/details/batch")).json()
+        if not status["running"]:
+            return status["stats"], time.perf_counter() - started
+
+
+async def run_level(args: argparse.Namespace, concurrency: int) -> list[dict]:
+    stack = Stack(args, concurrency)
+    results = []
+    try:
+        await stack.start()
+        limits = httpx.Limits(max_connections=concurrency * 2)
+        async with httpx.AsyncClient(
+            base_url=stack.target, timeout=120, limits=limits
+        ) as client:
+            for scenario in args.scenarios:
+                cpu_before = cpu_seconds(stack.pid) if stack.pid else None
+                started = time.perf_counter()
+                if scenario == "details":
+                    stats, elapsed = await run_details(
+                        client, stack.fake_url, args.requests, args.api_workers > 1
+                    )
+                    latencies, errors, done = [], stats["failed"], stats["done"]
+                else:
+                    request = run_search if scenario == "search" else run_articles
+                    latencies, errors = await closed_loop(
+                        client, concurrency, args.requests, request
+                    )
+                    elapsed = time.perf_counter() - started
+                    done = len(latencies)
+                cpu_after = cpu_seconds(stack.pid) if stack.pid else None
+                result = {
+                    "scenario": scenario,
+                    "concurrency": concurrency,
+                    "requests": done,
+                    "errors": errors,
+                    "elapsed": round(elapsed, 3),
+                    "throughput": round(done / elapsed, 2) if elapsed else 0.0,
+                    "p50_ms": percentile(latencies, 0.5),
+                    "p99_ms": percentile(latencies, 0.99),
+                    "cpu_pct": (
+                        round((cpu_after - cpu_before) / elapsed * 100, 1)
+                        if cpu_before is not None and cpu_after is not None
+                        else None
+                    ),
+                    **(memory_mb(stack.pid) if stack.pid else {}),
+                }
+                print(format_row(result), flush=True)
+                results.append(result)
+    finally:
+        stack.stop()
+    return results
+
+
+HEADER = (
+    f"{'scenario':<10}{'conc':>6}{'reqs':>8}{'err':>6}{'req/s':>10}"
+    f"{'p50 ms':>10}{'p99 ms':>10}{'cpu %':>8}{'rss MB':>9}{'peak MB':>9}"
+)
+
+
+def format_row(r: dict) -> str:
+    def cell(value, width: int) -> str:
+        return f"{'-' if value is None else value:>{width}}"
+
+    return (
+        f"{r['scenario']:<10}{r['concurrency']:>6}{r['requests']:>8}{r['errors']:>6}"
+        f"{r['throughput']:>10}{cell(r['p50_ms'], 10)}{cell(r['p99_ms'], 10)}"
+        f"{cell(r['cpu_pct'], 8)}{cell(r.get('rss_mb'), 9)}"
+        f"{cell(r.get('peak_rss_mb'), 9)}"
+    )
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)}
+    ok = True
+    for r in results:
+        base = baseline.get((r["scenario"], r["concurrency"]))
+        if not base or not base["throughput"]:
+            continue
+        change = r["throughput"] / base["throughput"] - 1
+        if change < -tolerance:
+            ok = False
+            print(
+                f"吞吐下降: {r['scenario']} c={r['concurrency']} "
+                f"{base['throughput']} -> {r['throughput']} ({change:+.1%})"
+            )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="爬虫服务压测")
+    parser.add_argument("--scenarios", default="search,articles,details")
+    parser.add_argument("--concurrency", default="1,8,32", help="逗号分隔的并发档位")
+    parser.add_argument("--requests", type=int, default=500, help="每个场景的请求数")
+    parser.add_argument("--target", help="已运行的服务地址，默认自动启动")
+    parser.add_argument("--pid", type=int, help="--target 对应的进程号，用于采集 CPU/内存")
+    parser.add_argument("--fake", help="已运行的模拟后端地址，默认自动启动")
+    parser.add_argument("--fixtures", help="模拟后端使用的录制目录")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--max-rps", type=float, default=0.0, help="模拟后端接口超过该速率返回 ret=200013"
+    )
+    parser.add_argument(
+        "--block-rate", type=float, default=0.0, help="模拟后端文章页返回验证页的比例"
+    )
+    parser.add_argument("--adaptive", action="store_true", help="保留自适应限速")
+    parser.add_argument(
+        "--api-workers", type=int, default=1, help="服务进程数，大于 1 时使用共享状态"
+    )
+    parser.add_argument("--keep", action="store_true", help="保留临时工作目录")
+    parser.add_argument("--output", help="将结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与之前的 JSON 结果比较吞吐")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"未知场景: {', '.join(sorted(unknown))}")
+
+    print(HEADER)
+    results = []
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        results.extend(asyncio.run(run_level(args, concurrency)))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,240 @@
 from __future__ import annotations
 
 import argparse
+import os
+from typing import TYPE_CHECKING
 
-import uvicorn
+if TYPE_CHECKING:
+    from app.services.clawlers import ArticleService
+    from app.services.index import ArticleIndex
+
+MODE_ROLES = {"api": "api", "login": "api,login", "worker": "fetch"}
+
+
+def article_index() -> ArticleIndex:
+    from app.services.fulltext import FullTextIndex
+    from app.services.index import ArticleIndex
+    from app.settings import settings
+
+    fulltext = None
+    if settings.fulltext_enabled:
+        fulltext = FullTextIndex(
+            settings.fulltext_tokenizer, settings.fulltext_title_weight
+        )
+    return ArticleIndex(settings.index_path, fulltext=fulltext)
+
+
+def article_service(index: ArticleIndex) -> ArticleService:
+    from app.services.blobstore import create_article_manifest
+    from app.services.clawlers import ArticleService
+    from app.services.freshness import FreshnessTracker
+    from app.settings import settings
+
+    manifest = None
+    if settings.article_storage == "blobs":
+        manifest = create_article_manifest(
+            manifest_path=settings.blob_manifest_path,
+            backend=settings.blob_backend,
+            root=settings.blob_root,
+            compression=settings.blob_compression,
+            level=settings.blob_level,
+            dictionary_path=settings.blob_dictionary_path,
+            s3_bucket=settings.blob_s3_bucket,
+            s3_prefix=settings.blob_s3_prefix,
+            s3_endpoint_url=settings.blob_s3_endpoint_url,
+        )
+    tracker = None
+    if settings.refresh_enabled:
+        tracker = FreshnessTracker(
+            settings.refresh_path,
+            min_interval=settings.refresh_min_interval,
+            max_interval=settings.refresh_max_interval,
+            age_factor=settings.refresh_age_factor,
+            keep_versions=settings.refresh_keep_versions,
+        )
+    return ArticleService(index=index, manifest=manifest, tracker=tracker)
+
+
+def run_fetch(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from app.services.fetcher import BulkFetcher, load_urls
+    from app.services.pipeline import ParsePipeline
+    from app.services.ratelimit import create_rate_controller
+    from app.services.state import create_state_backend
+    from app.settings import settings
+
+    index = article_index()
+    urls = load_urls(args.input) if args.input else []
+    if args.from_index or args.fakeid:
+        urls.extend(index.links(args.fakeid))
+    service = article_service(index)
+    if args.due and service.tracker is not None:
+        urls.extend(service.tracker.due_urls())
+    state = create_state_backend(
+        settings.state_backend,
+        path=settings.state_path,
+        redis_url=settings.state_redis_url,
+        prefix=settings.state_prefix,
+    )
+    fetcher = BulkFetcher(
+        service=service,
+        concurrency=args.concurrency or settings.fetch_concurrency,
+        rate_per_host=args.rate or settings.fetch_rate_per_host,
+        burst=settings.fetch_burst,
+        max_retries=settings.fetch_max_retries,
+        backoff_base=settings.fetch_backoff_base,
+        backoff_cap=settings.fetch_backoff_cap,
+        block_pause=settings.fetch_block_pause,
+        timeout=settings.fetch_timeout,
+        skip_stored=settings.fetch_skip_stored and not args.refetch,
+        pipeline=ParsePipeline(
+            service,
+            workers=args.workers or settings.parse_workers or None,
+            queue_size=settings.parse_queue_size,
+        ),
+        limiter=create_rate_controller(settings, state, article_rate=args.rate),
+    )
+
+    async def _run() -> None:
+        try:
+            await fetcher.run(urls)
+        finally:
+            await fetcher.close()
+            await service.registry.aclose()
+
+    asyncio.run(_run())
+
+
+def run_parse(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from app.services.pipeline import ParsePipeline, reparse_directory
+    from app.settings import settings
+
+    pipeline = ParsePipeline(
+        article_service(article_index()),
+        workers=args.workers or settings.parse_workers or None,
+        queue_size=settings.parse_queue_size,
+    )
+
+    async def _run() -> None:
+        try:
+            await reparse_directory(pipeline, args.dir)
+        finally:
+            await pipeline.close()
+
+    asyncio.run(_run())
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from app import main as service
+
+    worker = service.job_worker()
+    if args.concurrency:
+        worker.concurrency = args.concurrency
+
+    async def _run() -> None:
+        try:
+            await worker.run()
+        finally:
+            await service.shutdown()
+
+    asyncio.run(_run())
+
+
+def run_fulltext(args: argparse.Namespace) -> None:
+    index = article_index()
+    if index.fulltext is None:
+        raise SystemExit("全文索引未启用（CLAWLER_FULLTEXT_ENABLED=false）")
+    count = index.build_fulltext(rebuild=args.rebuild, optimize=not args.no_optimize)
+    print(f"全文索引新增 {count} 篇: {index.fulltext_stats()}")
+
+
+def run_train_dict(args: argparse.Namespace) -> None:
+    from app.services.blobstore import dictionary_samples, train_dictionary
+    from app.settings import settings
+
+    output = args.output or settings.blob_dictionary_path or "cfg/article.dict"
+    samples = dictionary_samples(args.dir)
+    if not samples:
+        raise SystemExit(f"{args.dir} 下没有样本文件")
+    with open(output, "wb") as f:
+        f.write(train_dictionary(samples))
+    print(f"已用 {len(samples)} 个样本训练 zstd 字典: {output}")
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Wechat Official Crawler service")
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        default="serve",
+        choices=[
+            "serve",
+            "api",
+            "login",
+            "fetch",
+            "parse",
+            "worker",
+            "train-dict",
+            "fulltext",
+        ],
+    )
     parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--port", type=int, default=8010)
     parser.add_argument("--reload", action="store_true")
+    parser.add_argument("--input", help="fetch: title_url_map.json 或逐行 URL 文件")
+    parser.add_argument("--from-index", action="store_true")
+    parser.add_argument("--fakeid")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--rate", type=float, help="fetch: 每个 host 每秒请求数")
+    parser.add_argument(
+        "--workers", type=int, help="serve: 服务进程数；fetch/parse: 解析进程数"
+    )
+    parser.add_argument("--dir", default="HTML", help="parse/train-dict: HTML 目录")
+    parser.add_argument("--refetch", action="store_true", help="fetch: 忽略已存储的文章")
+    parser.add_argument("--due", action="store_true", help="fetch: 加入到期需复查的文章")
+    parser.add_argument("--output", help="train-dict: 字典输出路径")
+    parser.add_argument("--rebuild", action="store_true", help="fulltext: 清空后重建")
+    parser.add_argument(
+        "--no-optimize", action="store_true", help="fulltext: 写入后不合并索引段"
+    )
     args = parser.parse_args()
 
-    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=args.reload)
+    if args.mode in MODE_ROLES:
+        os.environ["CLAWLER_ROLES"] = MODE_ROLES[args.mode]
+    if args.mode == "fetch":
+        run_fetch(args)
+        return
+    if args.mode == "parse":
+        run_parse(args)
+        return
+    if args.mode == "worker":
+        run_worker(args)
+        return
+    if args.mode == "train-dict":
+        run_train_dict(args)
+        return
+    if args.mode == "fulltext":
+        run_fulltext(args)
+        return
+    if args.workers and args.workers > 1:
+        from app.settings import settings
+
+        if settings.state_backend == "local":
+            raise SystemExit("多进程运行需要配置 CLAWLER_STATE_BACKEND=sqlite 或 redis")
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        reload=args.reload,
+        workers=args.workers,
+    )
 
 
 if __name__ == "__main__":
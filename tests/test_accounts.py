@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+import pytest
+
+from app.services.accounts import AccountDirectory, AccountResolver
+from app.services.clawlers import AsyncWechatClient
+from app.services.pool import NoSessionAvailable, SessionPool
+from app.services.sessions import SessionRegistry
+from app.services.storage import SessionStorage
+from tests.conftest import fake_wechat_server, free_port
+
+MISSING = "不存在的公众号"
+
+
+class CountingClient:
+    def __init__(self, client: AsyncWechatClient) -> None:
+        self.client = client
+        self.active = 0
+        self.peak = 0
+        self.queries = []
+
+    async def get_fakeid_by_name(self, wx_cfg, kw, count=5):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.queries.append(kw)
+        try:
+            await asyncio.sleep(0.02)
+            return await self.client.get_fakeid_by_name(wx_cfg, kw, count)
+        finally:
+            self.active -= 1
+
+
+def make_resolver(base_url: str, negative_ttl: float = 3600, **kwargs):
+    pool = SessionPool(directory="cfg/sessions", cooldown=60)
+    pool.add({"token": "1001", "cookies_str": "a=1", "expiry": time.time() + 3600})
+    client = CountingClient(
+        AsyncWechatClient(
+            storage=SessionStorage("cfg/cookies.json"),
+            registry=SessionRegistry(),
+            base_url=base_url,
+        )
+    )
+    directory = AccountDirectory("cfg/accounts.db", negative_ttl=negative_ttl)
+    return AccountResolver(client, pool, directory, **kwargs), pool, client
+
+
+def resolve(resolver: AccountResolver, *batches, refresh: bool = False):
+    async def run():
+        try:
+            return [await resolver.resolve_many(b, refresh=refresh) for b in batches]
+        finally:
+            await resolver.client.client.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def recorded_wechat():
+    os.makedirs("fixtures")
+    record = {
+        "query": MISSING,
+        "response": {"base_resp": {"ret": 0, "err_msg": "ok"}, "list": []},
+    }
+    with open("fixtures/searchbiz_result.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    with fake_wechat_server("--fixtures", "fixtures") as base_url:
+        yield base_url
+
+
+def test_directory_normalizes_names_and_expires_negative_entries():
+    directory = AccountDirectory("cfg/accounts.db", negative_ttl=60)
+    candidate = {"fakeid": "MzA=", "nickname": "ABC News", "exact": True}
+    directory.save("ABC  News", [candidate])
+    directory.save(MISSING, [])
+    for name in ("abc news", " ABCNEWS", "abc\tnews"):
+        assert directory.get(name)["fakeid"] == "MzA="
+    assert directory.get(MISSING)["fakeid"] is None
+
+    later = time.time() + 120
+    found = directory.get_many(["abcnews", MISSING, "unknown"], now=later)
+    assert list(found) == ["abcnews"]
+    assert found["abcnews"]["name"] == "ABC  News" and found["abcnews"]["exact"]
+    assert directory.stats() == {"names": 2, "resolved": 1, "exact": 1}
+
+
+def test_resolve_many_dedups_by_name_key_and_reuses_the_table(fake_wechat):
+    resolver, pool, client = make_resolver(fake_wechat)
+    names = ["人民日报", " 人民 日报", "新华社", "人民日报", ""]
+    first, second = resolve(resolver, names, ["人民日报", "新华社"])
+    assert sorted(client.queries) == ["人民日报", "新华社"]
+    assert [r["name"] for r in first] == ["人民日报", "人民 日报", "新华社", "人民日报"]
+    assert len({r["fakeid"] for r in first}) == 2
+    assert all(r["exact"] and r["source"] == "upstream" for r in first[:3])
+    assert first[0]["candidates"][0]["nickname"] == "人民日报"
+    assert [r["source"] for r in second] == ["table", "table"]
+    assert [r["fakeid"] for r in second] == [first[0]["fakeid"], first[2]["fakeid"]]
+    assert pool.sessions()[0].inflight == 0
+
+
+def test_negative_results_are_cached_until_the_ttl(recorded_wechat):
+    resolver, _, client = make_resolver(recorded_wechat)
+    first, second = resolve(resolver, [MISSING], [MISSING])
+    assert first[0]["fakeid"] is None and first[0]["source"] == "upstream"
+    assert second[0]["fakeid"] is None and second[0]["source"] == "table"
+    assert client.queries == [MISSING]
+
+    resolver, _, client = make_resolver(recorded_wechat, negative_ttl=0)
+    (again,) = resolve(resolver, [MISSING])
+    assert again[0]["source"] == "upstream" and client.queries == [MISSING]
+    (forced,) = resolve(make_resolver(recorded_wechat)[0], [MISSING], refresh=True)
+    assert forced[0]["source"] == "upstream"
+
+
+def test_concurrent_lookups_are_bounded_and_release_sessions(fake_wechat):
+    resolver, pool, client = make_resolver(fake_wechat, concurrency=3)
+    names = [f"账号{n}" for n in range(10)]
+    (results,) = resolve(resolver, names)
+    assert client.peak == 3
+    assert sorted(client.queries) == sorted(names)
+    assert all(r["fakeid"] for r in results)
+    session = pool.sessions()[0]
+    assert session.inflight == 0 and session.requests == 10
+
+
+def test_failed_lookups_release_sessions_and_report_errors():
+    resolver, pool, _ = make_resolver(f"http://127.0.0.1:{free_port()}")
+    (results,) = resolve(resolver, ["甲", "乙"])
+    assert [r["source"] for r in results] == ["error", "error"]
+    assert {r["error"] for r in results} == {"ConnectError"}
+    session = pool.sessions()[0]
+    assert session.inflight == 0 and list(session.outcomes) == [False, False]
+    assert resolver.directory.stats()["names"] == 0
+
+
+def test_freq_control_cools_the_session_and_fails_the_rest():
+    with fake_wechat_server("--throttle-rate", "1") as base_url:
+        resolver, pool, client = make_resolver(base_url, concurrency=1)
+        (results,) = resolve(resolver, ["甲", "乙", "丙"])
+        throttled = httpx.get(f"{base_url}/_stats").json()["throttled"]
+    assert results[0]["error"] == "ret=200013"
+    assert [r["error"] for r in results[1:]] == ["NoSessionAvailable"] * 2
+    assert throttled == 1 and client.queries == ["甲"]
+    session = pool.sessions()[0]
+    assert session.inflight == 0 and not session.healthy()
+
+
+def test_unknown_names_need_a_session():
+    resolver, pool, _ = make_resolver("http://127.0.0.1:1")
+    resolver.directory.save("人民日报", [{"fakeid": "MzA=", "exact": True}])
+    pool.evict("1001")
+    (known,) = resolve(resolver, ["人民日报"])
+    assert known[0]["source"] == "table"
+    with pytest.raises(NoSessionAvailable):
+        resolve(resolver, ["新华社"])
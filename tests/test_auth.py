@@ -0,0 +1,149 @@
+import time
+from urllib.parse import urljoin
+
+import httpx
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+from app.services.auth import WechatAuth
+from app.services.browser import BrowserPool
+from app.services.pool import SessionPool
+from app.services.storage import SessionStorage
+from benchmarks.fake_wechat import LOGIN_TOKEN
+
+
+class FakeElement:
+    def __init__(self, png: bytes) -> None:
+        self.screenshot_as_png = png
+        self.location = {"x": 0, "y": 0}
+        self.size = {"width": 200, "height": 200}
+
+    def is_displayed(self) -> bool:
+        return True
+
+
+class FakeDriver:
+    def __init__(self) -> None:
+        self.http = httpx.Client(follow_redirects=True, timeout=5)
+        self.url = "about:blank"
+        self.page_source = ""
+        self.quit_called = False
+
+    def get(self, url: str) -> None:
+        if url == "about:blank":
+            self.url, self.page_source = url, ""
+            return
+        resp = self.http.get(url)
+        self.url, self.page_source = str(resp.url), resp.text
+
+    @property
+    def current_url(self) -> str:
+        if "/_login/status" in self.page_source:
+            status = self.http.get(urljoin(self.url, "/_login/status")).json()
+            if status["scanned"]:
+                self.get(urljoin(self.url, "/"))
+        return self.url
+
+    def execute_script(self, script: str):
+        if "navigator.userAgent" in script:
+            return "fake-browser"
+        return "<img" in self.page_source
+
+    def find_element(self, by: str, value: str) -> FakeElement:
+        if f'class="{value.lstrip(".")}"' not in self.page_source:
+            raise NoSuchElementException(value)
+        png = self.http.get(urljoin(self.url, "/_login/qrcode.png")).content
+        return FakeElement(png)
+
+    def get_cookies(self):
+        return [
+            {"name": c.name, "value": c.value, "path": c.path, "expiry": c.expires}
+            for c in self.http.cookies.jar
+        ]
+
+    def add_cookie(self, cookie) -> None:
+        self.http.cookies.set(cookie["name"], cookie["value"])
+
+    def delete_all_cookies(self) -> None:
+        self.http.cookies.clear()
+
+    def quit(self) -> None:
+        self.quit_called = True
+        self.http.close()
+
+
+def make_auth(base_url: str, scan_timeout: float = 10):
+    storage = SessionStorage("cfg/cookies.json")
+    pool = SessionPool(directory="cfg/sessions", storage=storage)
+    browsers = BrowserPool(FakeDriver)
+    auth = WechatAuth(
+        storage=storage,
+        pool=pool,
+        browsers=browsers,
+        base_url=base_url,
+        scan_timeout=scan_timeout,
+    )
+    return auth, pool, browsers
+
+
+def wait_for(ticket, statuses, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while ticket.status not in statuses:
+        assert time.monotonic() < deadline, ticket.status
+        time.sleep(0.02)
+
+
+def test_login_ticket_flow(fake_wechat):
+    auth, pool, browsers = make_auth(fake_wechat)
+    ticket = auth.start_login()
+    assert auth.get_ticket(ticket.id) is ticket
+    wait_for(ticket, ("waiting_scan", "failed"))
+    assert ticket.status == "waiting_scan", ticket.message
+    assert ticket.qr_png.startswith(b"\x89PNG")
+
+    httpx.post(f"{fake_wechat}/_login/scan")
+    wait_for(ticket, ("success", "failed"))
+    assert ticket.status == "success", ticket.message
+    assert ticket.token == LOGIN_TOKEN
+
+    saved = SessionStorage("cfg/cookies.json").load_session()
+    assert saved["token"] == LOGIN_TOKEN
+    assert "slave_sid=" in saved["cookies_str"]
+    assert saved["user_agent"] == "fake-browser"
+    assert saved["expiry"] > time.time()
+    assert [s.key for s in pool.sessions()] == [LOGIN_TOKEN]
+    browsers.close()
+
+
+def test_login_ticket_fails_after_scan_timeout(fake_wechat):
+    auth, pool, browsers = make_auth(fake_wechat, scan_timeout=0.3)
+    ticket = auth.start_login()
+    wait_for(ticket, ("success", "failed"))
+    assert ticket.status == "failed"
+    assert ticket.qr_png is not None
+    assert pool.sessions() == []
+    browsers.close()
+
+
+def test_login_endpoint_does_not_block(fake_wechat, monkeypatch):
+    pytest.importorskip("fastapi.testclient")
+    from fastapi.testclient import TestClient
+
+    import app.main as main
+
+    auth, _, browsers = make_auth(fake_wechat)
+    monkeypatch.setattr(main.auth, "value", auth)
+    started = time.monotonic()
+    resp = TestClient(main.app).post("/login")
+    assert resp.status_code == 200
+    assert time.monotonic() - started < 5
+    login_id = resp.json()["login_id"]
+    ticket = auth.get_ticket(login_id)
+    wait_for(ticket, ("waiting_scan", "failed"))
+    assert TestClient(main.app).get(f"/login/{login_id}").json()["status"] == (
+        "waiting_scan"
+    )
+    httpx.post(f"{fake_wechat}/_login/scan")
+    wait_for(ticket, ("success", "failed"))
+    assert ticket.status == "success"
+    browsers.close()
@@ -0,0 +1,144 @@
+import io
+import os
+
+import pytest
+
+from app.services.blobstore import (
+    ArticleManifest,
+    BlobStore,
+    LocalBlobBackend,
+    S3BlobBackend,
+    blob_digest,
+    object_key,
+)
+
+URL = "https://mp.weixin.qq.com/s?__biz=MzA1&mid=100&idx=1&sn=abc"
+HTML = "<html><body><p>正文</p></body></html>" * 50
+DATA = {"title": "标题", "content": "正文" * 50}
+
+
+class ClientError(Exception):
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3:
+    def __init__(self) -> None:
+        self.objects = {}
+        self.puts = 0
+        self.fail_head = None
+
+    def head_object(self, Bucket, Key):
+        if self.fail_head:
+            raise ClientError(self.fail_head)
+        if (Bucket, Key) not in self.objects:
+            raise ClientError("404")
+        return {"ContentLength": len(self.objects[Bucket, Key])}
+
+    def put_object(self, Bucket, Key, Body):
+        self.puts += 1
+        self.objects[Bucket, Key] = bytes(Body)
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError("NoSuchKey")
+        return {"Body": io.BytesIO(self.objects[Bucket, Key])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+def test_local_backend_writes_atomically(tmp_path):
+    backend = LocalBlobBackend(str(tmp_path / "blobs"))
+    store = BlobStore(backend, compression="gzip")
+    digest = store.put(HTML.encode("utf-8"))
+    assert digest == blob_digest(HTML.encode("utf-8"))
+    assert store.get(digest) == HTML.encode("utf-8")
+    path = backend._path(object_key(digest))
+    assert os.path.getsize(path) < len(HTML.encode("utf-8"))
+    assert os.listdir(os.path.dirname(path)) == [digest]
+    backend.delete(object_key(digest))
+    assert not store.exists(digest)
+
+
+def test_manifest_skips_unchanged_articles(tmp_path):
+    store = BlobStore(LocalBlobBackend(str(tmp_path / "blobs")), compression=None)
+    manifest = ArticleManifest(str(tmp_path / "manifest.db"), store)
+    assert manifest.save_article(URL, HTML, DATA)
+    assert not manifest.save_article(URL + "&chksm=1", HTML, DATA)
+    assert manifest.load(URL) == DATA
+    assert manifest.load(URL, "html") == HTML
+    assert manifest.load(URL, "text") == DATA["content"]
+    assert manifest.stats() == {"articles": 1, "html_bytes": len(HTML.encode("utf-8"))}
+
+
+def test_manifest_dedups_on_parsed_content(tmp_path):
+    store = BlobStore(LocalBlobBackend(str(tmp_path / "blobs")), compression=None)
+    manifest = ArticleManifest(str(tmp_path / "manifest.db"), store)
+    assert manifest.save_article(URL, HTML, DATA)
+    volatile = HTML.replace("<body>", '<body data-nonce="42">', 1)
+    assert not manifest.save_article(URL, volatile, DATA)
+    assert manifest.load(URL, "html") == HTML
+
+    edited = {**DATA, "content": "更正后的正文"}
+    assert manifest.save_article(URL, HTML, edited)
+    assert manifest.load(URL, "text") == "更正后的正文"
+    assert manifest.save_article(URL, HTML, {**edited, "title": "新标题"})
+    assert manifest.load(URL)["title"] == "新标题"
+
+
+def test_manifest_without_html_keeps_the_previous_html(tmp_path):
+    store = BlobStore(LocalBlobBackend(str(tmp_path / "blobs")), compression=None)
+    manifest = ArticleManifest(str(tmp_path / "manifest.db"), store)
+    assert manifest.save_article(URL, HTML, DATA)
+    edited = {**DATA, "content": "只更新正文"}
+    assert manifest.save_article(URL, "", edited, write_html=False)
+    assert manifest.load(URL, "html") == HTML
+    assert manifest.load(URL, "text") == "只更新正文"
+    assert manifest.stats()["html_bytes"] == len(HTML.encode("utf-8"))
+
+    other = URL.replace("mid=100", "mid=101")
+    assert manifest.save_article(other, HTML, DATA, write_html=False)
+    assert manifest.load(other, "html") is None
+    assert manifest.stats()["html_bytes"] == len(HTML.encode("utf-8"))
+    assert manifest.save_article(other, HTML, DATA)
+    assert manifest.load(other, "html") == HTML
+
+
+def test_s3_backend_against_fake_bucket():
+    client = FakeS3()
+    backend = S3BlobBackend("articles", prefix="/wechat/", client=client)
+    store = BlobStore(backend, compression="gzip")
+    digest = store.put(HTML.encode("utf-8"))
+    assert store.put(HTML.encode("utf-8")) == digest
+    assert client.puts == 1
+    assert list(client.objects) == [("articles", f"wechat/{object_key(digest)}")]
+    assert store.get(digest) == HTML.encode("utf-8")
+
+    manifest = ArticleManifest("manifest.db", store)
+    assert manifest.save_article(URL, HTML, DATA)
+    assert manifest.load(URL) == DATA
+    assert client.puts == 3
+
+    backend.delete(object_key(digest))
+    assert not store.exists(digest)
+
+
+def test_s3_backend_raises_unexpected_errors():
+    client = FakeS3()
+    client.fail_head = "AccessDenied"
+    backend = S3BlobBackend("articles", client=client)
+    with pytest.raises(ClientError):
+        backend.exists("objects/aa/bb/aabb")
+
+
+def test_zstd_dictionary_roundtrip_on_s3():
+    zstandard = pytest.importorskip("zstandard")
+    samples = [(HTML + str(i) * 40).encode("utf-8") for i in range(200)]
+    dictionary = zstandard.train_dictionary(4096, samples).as_bytes()
+    client = FakeS3()
+    store = BlobStore(S3BlobBackend("articles", client=client), dictionary=dictionary)
+    digest = store.put(samples[0])
+    reader = BlobStore(S3BlobBackend("articles", client=client))
+    assert reader.get(digest) == samples[0]
@@ -0,0 +1,89 @@
+import asyncio
+
+from app.services.cache import ResponseCache
+from app.services.clawlers import is_ok_response
+
+OK = {"base_resp": {"ret": 0}, "list": []}
+INVALID_SESSION = {"base_resp": {"ret": 200003}}
+
+
+def fetcher(value, calls, delay=0.01):
+    async def fetch():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+
+    return fetch
+
+
+def test_ok_responses_are_cached_and_coalesced():
+    cache = ResponseCache({"searchbiz": 60})
+    calls = []
+
+    async def run():
+        first = await asyncio.gather(
+            *(
+                cache.get_or_fetch(
+                    "searchbiz", {"query": "a"}, fetcher(OK, calls), is_ok_response
+                )
+                for _ in range(5)
+            )
+        )
+        again = await cache.get_or_fetch(
+            "searchbiz", {"query": "a"}, fetcher(OK, calls), is_ok_response
+        )
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first == [OK] * 5 and again == OK
+    assert len(calls) == 1
+    stats = cache.stats()["endpoints"]["searchbiz"]
+    assert stats["coalesced"] == 4 and stats["hits"] == 1
+
+
+def test_error_response_is_not_shared_with_other_sessions(tmp_path):
+    cache = ResponseCache({"searchbiz": 60}, disk_path=str(tmp_path / "c.db"))
+    calls = []
+
+    async def run():
+        session_a = asyncio.create_task(
+            cache.get_or_fetch(
+                "searchbiz",
+                {"query": "a", "token": "A"},
+                fetcher(INVALID_SESSION, calls),
+                is_ok_response,
+            )
+        )
+        while not calls:
+            await asyncio.sleep(0)
+        session_b = await cache.get_or_fetch(
+            "searchbiz",
+            {"query": "a", "token": "B"},
+            fetcher(OK, calls),
+            is_ok_response,
+        )
+        return await session_a, session_b
+
+    session_a, session_b = asyncio.run(run())
+    assert session_a == INVALID_SESSION
+    assert session_b == OK
+    assert calls == [INVALID_SESSION, OK]
+    assert cache.memory.get('searchbiz:{"query": "a"}')[1] == OK
+
+
+def test_error_response_is_not_cached():
+    cache = ResponseCache({"appmsgpublish": 60})
+    calls = []
+
+    async def run():
+        for _ in range(2):
+            await cache.get_or_fetch(
+                "appmsgpublish",
+                {"fakeid": "x"},
+                fetcher(INVALID_SESSION, calls),
+                is_ok_response,
+            )
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert len(cache.memory) == 0
@@ -0,0 +1,90 @@
+import asyncio
+
+from app.services.clawlers import AsyncWechatClient, WechatClient
+from app.services.decoding import extract_articles
+from app.services.ratelimit import AdaptiveRateController
+from app.services.sessions import SessionRegistry
+from app.services.storage import SessionStorage
+from tests.conftest import fake_wechat_server
+
+WX_CFG = {"token": "1001", "cookies_str": "slave_sid=abc", "user_agent": "pytest"}
+
+
+def make_client(base_url: str, **kwargs) -> AsyncWechatClient:
+    storage = SessionStorage("cfg/cookies.json")
+    return AsyncWechatClient(
+        storage=storage, registry=SessionRegistry(), base_url=base_url, **kwargs
+    )
+
+
+def test_async_search_and_article_list(fake_wechat):
+    async def run():
+        client = make_client(fake_wechat)
+        try:
+            fakeid, raw = await client.get_fakeid_by_name(WX_CFG, "人民日报")
+            page = await client.get_article_list(WX_CFG, fakeid, begin=0, count=5)
+        finally:
+            await client.aclose()
+        return fakeid, raw, page
+
+    fakeid, raw, page = asyncio.run(run())
+    assert raw["base_resp"]["ret"] == 0
+    assert fakeid == raw["list"][1]["fakeid"]
+    items = extract_articles(page)
+    assert len(items) == 15
+    assert all(item["link"].startswith(fake_wechat) for item in items)
+    storage = SessionStorage("cfg/cookies.json")
+    assert [r["query"] for r in storage.iter_results(storage.search_data_file)] == [
+        "人民日报"
+    ]
+    assert len(list(storage.iter_results())) == 1
+
+
+def test_async_client_keeps_many_requests_in_flight(fake_wechat):
+    async def run():
+        client = make_client(fake_wechat, per_host_limit=4)
+        try:
+            return await asyncio.gather(
+                *(client.get_fakeid_by_name(WX_CFG, f"账号{n}") for n in range(40))
+            )
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+    assert all(fakeid for fakeid, _ in results)
+    assert len({fakeid for fakeid, _ in results}) == 40
+
+
+def test_sync_client_matches_async_client(fake_wechat):
+    storage = SessionStorage("cfg/cookies.json")
+    registry = SessionRegistry()
+    client = WechatClient(storage=storage, registry=registry, base_url=fake_wechat)
+    fakeid, raw = client.get_fakeid_by_name(WX_CFG, "人民日报")
+
+    async def run():
+        aclient = make_client(fake_wechat)
+        try:
+            return await aclient.get_fakeid_by_name(WX_CFG, "人民日报")
+        finally:
+            await aclient.aclose()
+
+    assert asyncio.run(run()) == (fakeid, raw)
+    registry.get(WX_CFG).close()
+
+
+def test_async_client_reports_freq_control():
+    limiter = AdaptiveRateController(initial_rate=5.0, throttle_pause=0.2)
+
+    async def run(base_url):
+        client = make_client(base_url, limiter=limiter)
+        try:
+            return await client.get_article_list(WX_CFG, "MzI0", count=5)
+        finally:
+            await client.aclose()
+
+    with fake_wechat_server("--throttle-rate", "1") as base_url:
+        data = asyncio.run(run(base_url))
+    assert data["base_resp"]["ret"] == 200013
+    [limit] = limiter.snapshot()
+    assert limit["throttled"] == 1
+    assert limit["rate"] < 5.0
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from app.services.crawler import HistoryCrawler
+from app.services.export import stream_upstream
+from app.services.storage import CheckpointStore
+
+
+def publish_page(start: int, count: int) -> dict:
+    publish_list = []
+    for n in range(start, start + count):
+        appmsg = {"appmsgid": 1000 - n, "create_time": 1_700_000_000 - n, "title": n}
+        info = json.dumps({"appmsgex": [appmsg]})
+        publish_list.append({"publish_info": info})
+    return {
+        "base_resp": {"ret": 0},
+        "publish_page": json.dumps({"publish_list": publish_list}),
+    }
+
+
+class PagedClient:
+    def __init__(self, pages: dict) -> None:
+        self.pages = pages
+        self.calls = []
+
+    async def get_article_list(self, wx_cfg, fakeid, begin=0, count=5):
+        self.calls.append(begin)
+        return self.pages[begin]
+
+
+def make_crawler(pages: dict) -> HistoryCrawler:
+    return HistoryCrawler(
+        PagedClient(pages),
+        CheckpointStore("cfg/checkpoints.json"),
+        page_size=5,
+        page_delay=0,
+    )
+
+
+BAD_PAGES = (
+    {"raw": "<html>当前环境异常，完成验证后即可继续访问</html>"},
+    {"base_resp": {"ret": 0}, "publish_page": "{not json"},
+    {"base_resp": {"ret": 0}},
+    {"base_resp": {"ret": 200003}},
+)
+
+
+def test_bad_page_keeps_cursor_and_resumes():
+    for n, bad in enumerate(BAD_PAGES):
+        fakeid = f"fakeid{n}"
+        pages = {0: publish_page(0, 5), 5: publish_page(5, 5), 10: bad}
+        crawler = make_crawler(pages)
+        result = asyncio.run(crawler.crawl({}, fakeid))
+        assert not result["complete"]
+        assert result["checkpoint"]["cursor"] == 10
+        assert result["checkpoint"]["newest_time"] is None
+        assert len(result["items"]) == 10
+
+        pages[10] = publish_page(10, 3)
+        result = asyncio.run(crawler.crawl({}, fakeid))
+        assert result["complete"]
+        assert crawler.client.calls[-1] == 10
+        assert result["checkpoint"]["cursor"] is None
+        assert result["checkpoint"]["newest_time"] == 1_700_000_000
+
+
+def test_empty_publish_list_completes():
+    crawler = make_crawler({0: publish_page(0, 5), 5: publish_page(5, 0)})
+    result = asyncio.run(crawler.crawl({}, "fakeid"))
+    assert result["complete"]
+    assert result["checkpoint"]["cursor"] is None
+
+
+def test_stream_upstream_reports_bad_page():
+    crawler = make_crawler({0: publish_page(0, 5), 5: BAD_PAGES[0]})
+    crawler.pool = None
+
+    async def collect():
+        return [json.loads(line) async for line in stream_upstream(crawler, "x")]
+
+    records = asyncio.run(collect())
+    assert len(records) == 6
+    assert records[-1] == {"_error": {"begin": 5, "ret": None}}
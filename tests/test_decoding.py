@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from app.services.decoding import PublishDecoder
+
+BACKENDS = ["json", "orjson", "msgspec"]
+
+APPMSG = {
+    "aid": "2650000001_1",
+    "appmsgid": 2650000001,
+    "itemidx": 1,
+    "title": "标题 \"引号\" \\ 反斜杠 😀",
+    "link": "https:\\/\\/mp.weixin.qq.com\\/s?__biz=MzA5&mid=2650000001",
+    "create_time": 1700000000,
+    "is_deleted": False,
+    "copyright_stat": None,
+    "album_id": 0,
+    "cover_img_theme_color": {"r": 12, "g": 34, "b": 56},
+    "appmsg_album_infos": [{"id": "1", "title": "合集", "tags": ["a", "b"]}],
+    "pic_cdn_url_1_1": "https://mmbiz.qpic.cn/1.jpg",
+    "ratio": 0.5625,
+}
+
+
+def page(*publish_infos) -> dict:
+    publish_list = [{"publish_type": 101, "publish_info": i} for i in publish_infos]
+    return {
+        "base_resp": {"ret": 0, "err_msg": "ok"},
+        "publish_page": json.dumps(
+            {"total_count": len(publish_list), "publish_list": publish_list},
+            ensure_ascii=False,
+        ),
+    }
+
+
+def info(*appmsgs, **extra) -> str:
+    return json.dumps({"type": 9, "appmsgex": list(appmsgs), **extra})
+
+
+RAW_PAGES = {
+    "nested": page(
+        info(APPMSG, {**APPMSG, "itemidx": 2, "title": ""}, sent_info={"time": 1}),
+        info({**APPMSG, "appmsgid": 7}),
+    ),
+    "bytes": {"publish_page": page(info(APPMSG))["publish_page"].encode("utf-8")},
+    "empty_info": page("", None, info()),
+    "null_appmsgex": page(json.dumps({"appmsgex": None})),
+    "bad_info": page("{not json", info(APPMSG)),
+    "non_dict_items": page(json.dumps({"appmsgex": [1, "x", APPMSG]})),
+    "no_list": {"publish_page": json.dumps({"total_count": 0})},
+    "non_dict_entries": {"publish_page": json.dumps({"publish_list": [1, None]})},
+    "list_page": {"publish_page": "[]"},
+    "bad_page": {"publish_page": "{not json"},
+    "missing_page": {"base_resp": {"ret": 200013}},
+    "not_dict": ["publish_page"],
+}
+
+
+def decoder(backend: str) -> PublishDecoder:
+    if backend != "json":
+        pytest.importorskip(backend)
+    return PublishDecoder(backend)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("case", list(RAW_PAGES))
+def test_backends_decode_identically(backend, case):
+    raw = RAW_PAGES[case]
+    expected = PublishDecoder("json").decode_page(raw)
+    got = decoder(backend).decode_page(raw)
+    assert got == expected
+    assert json.dumps(got, ensure_ascii=False) == json.dumps(
+        expected, ensure_ascii=False
+    )
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_nested_publish_info_is_fully_decoded(backend):
+    groups = decoder(backend).decode_page(RAW_PAGES["nested"])
+    assert [len(group) for group in groups] == [2, 1]
+    first = groups[0][0]
+    assert first == APPMSG
+    assert first["cover_img_theme_color"] == {"r": 12, "g": 34, "b": 56}
+    assert first["appmsg_album_infos"][0]["tags"] == ["a", "b"]
+    assert decoder(backend).extract_articles(RAW_PAGES["nested"])[2]["appmsgid"] == 7
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        PublishDecoder("simdjson")
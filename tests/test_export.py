@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.services.crawler import HistoryCrawler
+from app.services.index import ArticleIndex
+from app.services.storage import CheckpointStore
+from tests.test_crawler import PagedClient, publish_page
+
+
+def appmsg(biz: str, mid: int, create_time: int) -> dict:
+    return {
+        "title": f"{biz}-{mid}",
+        "digest": "摘要\n第二行",
+        "link": f"https://mp.weixin.qq.com/s?__biz={biz}&mid={mid}&idx=1&sn=x",
+        "create_time": create_time,
+    }
+
+
+def read_stream(client: TestClient, **params) -> list[dict]:
+    with client.stream("GET", "/articles/stream", params=params) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/x-ndjson"
+        body = b"".join(resp.iter_bytes())
+    assert body == b"" or body.endswith(b"\n")
+    lines = body.decode("utf-8").split("\n")[:-1]
+    return [json.loads(line) for line in lines]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    index = ArticleIndex("cfg/articles.db")
+    items = [appmsg("A", mid, 1_700_000_000 + mid // 3) for mid in range(1, 1202)]
+    index.upsert_appmsgs("A", items)
+    index.upsert_appmsgs("B", [appmsg("B", 1, 1_700_000_000)])
+    monkeypatch.setattr(main.index, "value", index)
+    return TestClient(main.app)
+
+
+def test_index_stream_pages_past_the_batch_size(client):
+    records = read_stream(client, source="index", fakeid="A")
+    assert len(records) == 1201
+    assert len({r["appmsgid"] for r in records}) == 1201
+    times = [r["create_time"] for r in records]
+    assert times == sorted(times, reverse=True)
+    assert records[0]["digest"] == "摘要\n第二行"
+    assert {r["fakeid"] for r in records} == {"A"}
+    assert len(read_stream(client, source="index")) == 1202
+
+
+def test_index_stream_projects_fields_and_filters_by_time(client):
+    records = read_stream(
+        client,
+        source="index",
+        fakeid="A",
+        fields="title, create_time,missing",
+        since=1_700_000_100,
+        until=1_700_000_102,
+    )
+    assert len(records) == 6
+    assert all(list(r) == ["title", "create_time", "missing"] for r in records)
+    assert all(r["missing"] is None for r in records)
+    assert {r["create_time"] for r in records} == {1_700_000_100, 1_700_000_101}
+
+
+class LoggedIn:
+    def sessions(self):
+        return [object()]
+
+
+def test_upstream_stream_frames_pages_and_items(client, monkeypatch):
+    crawler = HistoryCrawler(
+        PagedClient({0: publish_page(0, 5), 5: publish_page(5, 2)}),
+        CheckpointStore("cfg/checkpoints.json"),
+        page_size=5,
+        page_delay=0,
+    )
+    monkeypatch.setattr(main.crawler, "value", crawler)
+    monkeypatch.setattr(main.pool, "value", LoggedIn())
+    records = read_stream(client, fakeid="X", fields="title", include_raw=True)
+    pages = [r["_page"] for r in records if "_page" in r]
+    assert [p["begin"] for p in pages] == [0, 5]
+    assert pages[0]["raw"] == publish_page(0, 5)
+    items = [r for r in records if "_page" not in r]
+    assert items == [{"title": n} for n in range(7)]
+
+    crawler.client.pages[0] = {"base_resp": {"ret": 200013}}
+    assert read_stream(client, fakeid="X") == [
+        {"_error": {"begin": 0, "ret": 200013}}
+    ]
+
+
+def test_upstream_stream_requires_fakeid(client):
+    assert client.get("/articles/stream").status_code == 400
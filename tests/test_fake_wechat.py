@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+from app.services.crawler import HistoryCrawler
+from app.services.decoding import publish_groups
+from app.services.storage import CheckpointStore
+from benchmarks.fake_wechat import Fixtures
+from tests.conftest import fake_wechat_server
+from tests.test_crawler import publish_page
+
+
+def record_pages(directory: str, count: int) -> None:
+    os.makedirs(directory)
+    path = os.path.join(directory, "appmsgpublish_result.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(count):
+            f.write(json.dumps(publish_page(n * 5, 5), ensure_ascii=False) + "\n")
+
+
+def test_recorded_pages_end_instead_of_cycling():
+    record_pages("fixtures", 2)
+    fixtures = Fixtures("fixtures", "http://127.0.0.1:1")
+    assert fixtures.publish_page("A", 0, 5, 200) == publish_page(0, 5)
+    assert fixtures.publish_page("A", 5, 5, 200) == publish_page(5, 5)
+    for begin in (10, 15, 500):
+        page = fixtures.publish_page("A", begin, 5, 200)
+        assert page["base_resp"]["ret"] == 0
+        assert publish_groups(page) == []
+
+
+class CrawlClient:
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url
+        self.calls = []
+
+    async def get_article_list(self, wx_cfg, fakeid, begin=0, count=5):
+        self.calls.append(begin)
+        params = {"fakeid": fakeid, "begin": begin, "count": count}
+        async with httpx.AsyncClient() as client:
+            resp = await client.get(
+                f"{self.base_url}/cgi-bin/appmsgpublish", params=params
+            )
+        return resp.json()
+
+
+def test_crawl_over_recorded_pages_terminates():
+    record_pages("fixtures", 3)
+    with fake_wechat_server("--fixtures", "fixtures") as base_url:
+        client = CrawlClient(base_url)
+        crawler = HistoryCrawler(
+            client, CheckpointStore("cfg/checkpoints.json"), page_size=5, page_delay=0
+        )
+        result = asyncio.run(crawler.crawl({}, "A"))
+    assert result["complete"]
+    assert len(result["items"]) == 15
+    assert client.calls == [0, 5, 10, 15]
+
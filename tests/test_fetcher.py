@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from app.services.clawlers import ArticleService
+from app.services.fetcher import BulkFetcher
+from app.services.pipeline import ParsePipeline
+from app.services.sessions import SessionRegistry
+from app.services.storage import SessionStorage
+from tests.conftest import fake_wechat_server
+
+
+def make_fetcher(**kwargs) -> BulkFetcher:
+    service = ArticleService(
+        storage=SessionStorage("cfg/cookies.json"), registry=SessionRegistry()
+    )
+    pipeline = ParsePipeline(service, workers=1, executor=ThreadPoolExecutor(1))
+    return BulkFetcher(
+        service,
+        concurrency=4,
+        rate_per_host=1000,
+        burst=1000,
+        backoff_base=0.01,
+        block_pause=0.05,
+        pipeline=pipeline,
+        skip_stored=False,
+        **kwargs,
+    )
+
+
+def article_urls(base_url: str, count: int) -> list:
+    return [f"{base_url}/s?__biz=MzI0&mid={n}&idx=1" for n in range(count)]
+
+
+def test_bulk_fetch_parses_articles(fake_wechat):
+    fetcher = make_fetcher()
+    results = asyncio.run(fetcher.run(article_urls(fake_wechat, 6)))
+    assert [r["title"] for r in results] == [f"文章 {n}-1" for n in range(6)]
+    stats = fetcher.snapshot()
+    assert stats["ok"] == 6 and stats["failed"] == 0
+
+
+def test_blocked_url_fails_after_max_retries():
+    fetcher = make_fetcher(max_retries=2)
+    with fake_wechat_server("--block-rate", "1") as base_url:
+        results = asyncio.run(
+            asyncio.wait_for(fetcher.run(article_urls(base_url, 1)), timeout=10)
+        )
+        counters = httpx.get(f"{base_url}/_stats").json()
+    assert results == [None]
+    stats = fetcher.snapshot()
+    assert stats["failed"] == 1
+    assert stats["retries"] == 2
+    assert counters["blocked"] == 3
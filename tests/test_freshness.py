@@ -0,0 +1,151 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from app.services.clawlers import ArticleService
+from app.services.fetcher import BulkFetcher
+from app.services.freshness import FreshnessTracker, parse_publish_time
+from app.services.pipeline import ParsePipeline
+from app.services.sessions import SessionRegistry
+from app.services.storage import SessionStorage
+
+DAY = 86400.0
+PUBLISHED = parse_publish_time("2024-01-01 08:00")
+
+
+def make_tracker(**kwargs) -> FreshnessTracker:
+    options = {"min_interval": 3600, "max_interval": 3650 * DAY, "age_factor": 0.25}
+    return FreshnessTracker("cfg/freshness.db", **{**options, **kwargs})
+
+
+def make_fetcher(tracker: FreshnessTracker) -> BulkFetcher:
+    service = ArticleService(
+        storage=SessionStorage("cfg/cookies.json"),
+        registry=SessionRegistry(),
+        tracker=tracker,
+    )
+    pipeline = ParsePipeline(service, workers=1, executor=ThreadPoolExecutor(1))
+    return BulkFetcher(
+        service, rate_per_host=1000, burst=1000, pipeline=pipeline, skip_stored=True
+    )
+
+
+def make_due(tracker: FreshnessTracker) -> None:
+    with tracker._conn() as conn:
+        conn.execute("UPDATE freshness SET next_check = 0")
+
+
+async def fetch(fetcher: BulkFetcher, url: str) -> dict:
+    await fetcher.run([url])
+    return fetcher.snapshot()
+
+
+def article_url(base_url: str, mid: int = 1) -> str:
+    return f"{base_url}/s?__biz=MzI0&mid={mid}&idx=1"
+
+
+def test_interval_grows_with_age_and_unchanged_streak():
+    tracker = make_tracker(max_interval=30 * DAY)
+    now = 1_700_000_000.0
+    assert tracker.interval(None, 0, now) == 3600
+    assert tracker.interval(now - 600, 0, now) == 3600
+    assert tracker.interval(now - 8 * DAY, 0, now) == 2 * DAY
+    assert tracker.interval(now - 8 * DAY, 2, now) == 8 * DAY
+    assert tracker.interval(now - 8 * DAY, 20, now) == 30 * DAY
+    assert tracker.interval(now + DAY, 3, now) == 8 * 3600
+
+
+def test_not_modified_refetch_touches_and_backs_off(fake_wechat):
+    tracker = make_tracker()
+    fetcher = make_fetcher(tracker)
+    url = article_url(fake_wechat)
+
+    async def run():
+        assert (await fetch(fetcher, url))["ok"] == 1
+        entry = tracker.get(url)
+        assert not tracker.is_due(url) and tracker.due_urls() == []
+        assert (await fetch(fetcher, url))["skipped"] == 1
+        make_due(tracker)
+        assert tracker.due_urls() == [url]
+        return entry, await fetch(fetcher, url)
+
+    entry, stats = asyncio.run(run())
+    assert entry["etag"] and entry["last_modified"]
+    assert entry["version"] == 1 and entry["published_at"] == PUBLISHED
+    first_wait = entry["next_check"] - entry["checked_at"]
+    expected = tracker.interval(PUBLISHED, 0, entry["checked_at"])
+    assert abs(first_wait - expected) < 1
+    assert tracker.conditional_headers(url) == {
+        "If-None-Match": entry["etag"],
+        "If-Modified-Since": entry["last_modified"],
+    }
+    assert stats["unchanged"] == 1 and stats["ok"] == 0
+    assert httpx.get(f"{fake_wechat}/_stats").json()["not_modified"] == 1
+    touched = tracker.get(url)
+    assert touched["unchanged"] == 1 and touched["version"] == 1
+    assert touched["checked_at"] > entry["checked_at"]
+    second_wait = touched["next_check"] - touched["checked_at"]
+    assert abs(second_wait - 2 * first_wait) < 60
+
+
+def test_fake_article_honours_if_modified_since(fake_wechat):
+    url = article_url(fake_wechat)
+    first = httpx.get(url)
+    assert first.status_code == 200
+    modified = first.headers["Last-Modified"]
+    assert httpx.get(url, headers={"If-Modified-Since": modified}).status_code == 304
+    older = "Sun, 31 Dec 2023 00:00:00 GMT"
+    assert httpx.get(url, headers={"If-Modified-Since": older}).status_code == 200
+    stale = {"If-None-Match": '"0"', "If-Modified-Since": modified}
+    assert httpx.get(url, headers=stale).status_code == 200
+
+
+def test_edited_article_is_stored_as_a_new_version(fake_wechat):
+    tracker = make_tracker()
+    fetcher = make_fetcher(tracker)
+    url = article_url(fake_wechat, 7)
+
+    async def run():
+        await fetch(fetcher, url)
+        before = tracker.get(url)
+        httpx.post(f"{fake_wechat}/_articles/7/edit")
+        make_due(tracker)
+        edited = await fetch(fetcher, url)
+        make_due(tracker)
+        return before, edited, await fetch(fetcher, url)
+
+    before, edited, again = asyncio.run(run())
+    assert edited["ok"] == 1 and again["unchanged"] == 1
+    after = tracker.get(url)
+    assert after["version"] == 2 and after["unchanged"] == 1
+    assert after["content_hash"] != before["content_hash"]
+    assert after["etag"] != before["etag"]
+    versions = tracker.versions(url, include_data=True)
+    assert [v["version"] for v in versions] == [1, 2]
+    assert "第 1 次修改" in versions[1]["data"]["content"]
+    assert "第 1 次修改" not in versions[0]["data"]["content"]
+    assert tracker.stats()["edited"] == 1
+
+
+def test_deleted_article_is_recorded_and_no_longer_due(fake_wechat):
+    tracker = make_tracker()
+    fetcher = make_fetcher(tracker)
+    url = article_url(fake_wechat, 9)
+
+    async def run():
+        await fetch(fetcher, url)
+        httpx.post(f"{fake_wechat}/_articles/9/delete")
+        make_due(tracker)
+        return await fetch(fetcher, url)
+
+    assert asyncio.run(run())["removed"] == 1
+    entry = tracker.get(url)
+    assert entry["status"] == "deleted" and entry["version"] == 2
+    assert entry["next_check"] >= time.time() + 3000 * DAY
+    assert tracker.conditional_headers(url) == {}
+    assert tracker.due_urls(now=entry["next_check"] + 1) == []
+    assert [v["status"] for v in tracker.versions(url)] == ["live", "deleted"]
+    assert tracker.stats()["deleted"] == 1
+    assert not tracker.record_deleted(url)
@@ -0,0 +1,91 @@
+import sqlite3
+
+from app.services.fulltext import (
+    FullTextIndex,
+    build_query,
+    make_snippet,
+    tokenize_bigram,
+)
+from app.services.index import ArticleIndex
+
+BIZ = "MzA5+NTI="
+
+
+def link(mid: int) -> str:
+    return f"https://mp.weixin.qq.com/s?__biz={BIZ}&mid={mid}&idx=1&sn=x"
+
+
+def make_index(*articles) -> ArticleIndex:
+    index = ArticleIndex("cfg/articles.db", fulltext=FullTextIndex())
+    for mid, (title, content) in enumerate(articles, 1):
+        index.upsert_details(
+            link(mid), {"title": title, "content": content, "create_time": mid}
+        )
+    return index
+
+
+def titles(index: ArticleIndex, q: str) -> list:
+    return sorted(item["title"] for item in index.fulltext_search(q))
+
+
+def test_tokenize_bigram_adds_the_last_character_of_each_run():
+    assert tokenize_bigram("春天来了") == "春天 天来 来了 了"
+    assert tokenize_bigram("字") == "字"
+    assert tokenize_bigram("Python 3 入门, ABC") == "python 3 入门 门 abc"
+    assert tokenize_bigram(None) == ""
+
+
+def test_build_query_per_term_kind():
+    assert build_query("字") == '"字"*'
+    assert build_query("春天来了") == '"春天 天来 来了"'
+    assert build_query("Python") == '"python"'
+    assert build_query("Python 入门 字") == '"python" AND "入门" AND "字"*'
+    assert build_query('say "hi"') == '"say" AND "hi"'
+    assert build_query("  ，。!") is None
+
+
+def test_single_character_queries_match_anywhere_in_a_run():
+    index = make_index(("春", "春天来了"), ("秋", "一个秋天"), ("冬", "冬"))
+    assert titles(index, "天") == ["春", "秋"]
+    assert titles(index, "了") == ["春"]
+    assert titles(index, "冬") == ["冬"]
+    assert titles(index, "来") == ["春"]
+    assert titles(index, "春天") == ["春"]
+    assert titles(index, "天来") == ["春"]
+    assert titles(index, "来天") == []
+    assert titles(index, "秋天 一个") == ["秋"]
+
+
+def test_search_returns_highlighted_snippets_and_honours_filters():
+    index = make_index(("Python 入门", "学习 python 的第一天"), ("杂谈", "无关内容"))
+    (item,) = index.fulltext_search("python")
+    assert item["title"] == "Python 入门"
+    assert item["snippet"] == "学习 <em>python</em> 的第一天"
+    assert index.fulltext_search("python", since=2) == []
+    assert titles(index, "内容") == ["杂谈"]
+    assert index.fulltext_search("") == []
+
+
+def test_make_snippet_centres_on_the_first_match():
+    text = "甲" * 100 + "关键词" + "乙" * 100
+    snippet = make_snippet(text, ["关键词"], width=30)
+    assert snippet == "..." + "甲" * 10 + "<em>关键词</em>" + "乙" * 17 + "..."
+    assert make_snippet("a  b\n\tc", ["B"]) == "a <em>b</em> c"
+    assert make_snippet("正文内容", [], width=2) == "正文"
+    assert make_snippet("正文内容", ["没有"], width=2) == "正文..."
+    assert make_snippet("春天春", ["春", "春天"]) == "<em>春天</em><em>春</em>"
+    assert make_snippet(None, ["春"]) == ""
+
+
+def test_indexes_written_by_an_older_format_are_cleared():
+    make_index(("春", "春天来了"))
+    conn = sqlite3.connect("cfg/articles.db")
+    with conn:
+        conn.execute(
+            "UPDATE articles_fts_meta SET value = 'bigram' WHERE key = 'tokenizer'"
+        )
+    conn.close()
+    index = ArticleIndex("cfg/articles.db", fulltext=FullTextIndex())
+    assert index.fulltext_stats()["documents"] == 0
+    assert index.build_fulltext() == 1
+    assert titles(index, "了") == ["春"]
@@ -0,0 +1,101 @@
+from app.services.fulltext import FullTextIndex
+from app.services.index import ArticleIndex, article_key, normalize_link
+
+BIZ = "MzA5+NTI="
+
+
+def link(mid: int, idx: int = 1, escaped: bool = False) -> str:
+    url = f"https://mp.weixin.qq.com/s?__biz={BIZ}&mid={mid}&idx={idx}&sn=x"
+    return url.replace("/", "\\/") if escaped else url
+
+
+def appmsg(mid: int, idx: int = 1, **fields) -> dict:
+    return {
+        "title": f"文章 {mid}-{idx}",
+        "digest": "摘要",
+        "link": link(mid, idx, escaped=True),
+        "cover": "https://mmbiz.qpic.cn/c.jpg",
+        "create_time": 1700000000 + mid,
+        **fields,
+    }
+
+
+def test_article_key_from_link_or_appmsg():
+    assert article_key(link(100, 2)) == (BIZ, "100", 2)
+    assert article_key(link(100, 2).replace("+", " ")) == (BIZ, "100", 2)
+    assert article_key(
+        "https://mp.weixin.qq.com/s/short", BIZ, {"appmsgid": 7, "itemidx": 3}
+    ) == (BIZ, "7", 3)
+    without_idx = f"https://mp.weixin.qq.com/s?__biz={BIZ}&mid=9"
+    assert article_key(without_idx) == (BIZ, "9", 1)
+    assert article_key("https://mp.weixin.qq.com/s/short") is None
+    assert normalize_link(link(1, escaped=True)) == link(1)
+
+
+def test_upsert_appmsgs_keeps_fields_missing_from_later_listings():
+    index = ArticleIndex("cfg/articles.db")
+    assert index.upsert_appmsgs("fake", [appmsg(1), appmsg(1, 2)]) == 2
+    index.upsert_appmsgs(
+        "fake", [appmsg(1, title="新标题", digest=None, cover=None, create_time="")]
+    )
+    row = index.get((BIZ, "1", 1))
+    assert row["title"] == "新标题"
+    assert row["digest"] == "摘要"
+    assert row["cover"] == "https://mmbiz.qpic.cn/c.jpg"
+    assert row["create_time"] == 1700000001
+    assert row["link"] == link(1)
+    assert index.upsert_appmsgs("fake", [{"title": "无链接"}]) == 0
+    assert len(index.search(fakeid="fake")) == 2
+
+
+def test_upsert_details_merges_into_listing_row():
+    index = ArticleIndex("cfg/articles.db")
+    index.upsert_appmsgs("fake", [appmsg(1)])
+    assert index.upsert_details(link(1), {"content": "正文", "author": "作者"})
+    row = index.get((BIZ, "1", 1))
+    assert row["title"] == "文章 1-1" and row["content"] == "正文"
+    assert row["author"] == "作者" and row["fakeid"] == "fake"
+    assert row["fetched_at"] is not None
+
+    short = "https://mp.weixin.qq.com/s/AbCdEf"
+    index.upsert_appmsgs("fake", [appmsg(2, link=short, appmsgid=2, itemidx=1)])
+    assert index.upsert_details(short, {"content": "短链正文"})
+    assert index.get(("fake", "2", 1))["content"] == "短链正文"
+    assert not index.upsert_details("https://mp.weixin.qq.com/s/unknown", {})
+
+
+def test_upsert_details_replaces_fulltext_entry():
+    index = ArticleIndex("cfg/articles.db", fulltext=FullTextIndex())
+    index.upsert_appmsgs("fake", [appmsg(1, title="旧闻")])
+    index.upsert_details(link(1), {"content": "第一版讲的是春天"})
+    assert [i["title"] for i in index.fulltext_search("春天")] == ["旧闻"]
+    index.upsert_details(link(1), {"content": "第二版改成了秋天"})
+    assert index.fulltext_search("春天") == []
+    assert [i["title"] for i in index.fulltext_search("秋天")] == ["旧闻"]
+    assert index.fulltext_stats()["documents"] == 1
+
+
+def test_scan_pages_by_keyset_without_gaps_or_duplicates():
+    index = ArticleIndex("cfg/articles.db")
+    items = [appmsg(mid, create_time=1700000000 + mid // 2) for mid in range(1, 8)]
+    items.append(appmsg(8, create_time=None))
+    index.upsert_appmsgs("fake", items)
+    index.upsert_appmsgs("other", [appmsg(9)])
+
+    pages, after = [], None
+    while True:
+        rows, after = index.scan(fakeid="fake", after=after, limit=3)
+        pages.append(rows)
+        if after is None:
+            break
+    seen = [row["appmsgid"] for page in pages for row in page]
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert sorted(seen, key=int) == [str(m) for m in range(1, 9)]
+    assert seen[-1] == "8"
+    times = [row["create_time"] or 0 for page in pages for row in page]
+    assert times == sorted(times, reverse=True)
+
+    rows, _ = index.scan(since=1700000002, until=1700000003)
+    assert sorted(row["appmsgid"] for row in rows) == ["4", "5"]
+    assert sorted(index.links("fake")) == sorted(link(m) for m in range(1, 9))
+    assert len(index.links()) == 9
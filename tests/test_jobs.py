@@ -0,0 +1,218 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.fetcher import BulkFetcher, FetchStats
+from app.services.jobs import JobQueue, JobWorker, RedisJobQueue, crawl_handlers
+from app.services.state import RedisState
+
+
+def sqlite_queue():
+    return JobQueue("cfg/jobs.db")
+
+
+def redis_queue():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisJobQueue(RedisState(client=fakeredis.FakeRedis(decode_responses=True)))
+
+
+@pytest.fixture(params=[sqlite_queue, redis_queue], ids=["sqlite", "redis"])
+def queue(request):
+    return request.param()
+
+
+def test_submit_dedups_and_claims_by_priority(queue):
+    low, created = queue.submit("list_pages", {"fakeid": "A"})
+    assert created
+    high, _ = queue.submit("search", {"keyword": "k"}, priority=1)
+    again, created = queue.submit("list_pages", {"fakeid": "A"}, priority=5)
+    assert not created and again["id"] == low["id"]
+    assert queue.get(low["id"])["priority"] == 5
+    assert queue.claim("w")["id"] == low["id"]
+    assert queue.claim("w", kinds=["fetch_details"]) is None
+    assert queue.claim("w")["id"] == high["id"]
+    assert queue.claim("w") is None
+    assert queue.counts() == {"list_pages": {"running": 1}, "search": {"running": 1}}
+
+
+def test_failed_job_retries_then_releases_dedup_key(queue):
+    job, _ = queue.submit("search", {"keyword": "k"}, max_attempts=2)
+    assert queue.fail(queue.claim("w"), "boom", 0) == "queued"
+    assert queue.fail(queue.claim("w"), "boom", 0) == "failed"
+    failed = queue.get(job["id"])
+    assert failed["status"] == "failed" and failed["error"] == "boom"
+    assert failed["attempts"] == 2
+    retry, created = queue.submit("search", {"keyword": "k"})
+    assert created and retry["id"] != job["id"]
+
+
+def test_release_does_not_count_an_attempt(queue):
+    job, _ = queue.submit("search", {"keyword": "k"})
+    queue.release(queue.claim("w"), 0)
+    released = queue.get(job["id"])
+    assert released["status"] == "queued" and released["attempts"] == 0
+
+
+def test_repeating_job_is_requeued_after_completion(queue):
+    job, _ = queue.submit("list_pages", {"fakeid": "A"}, repeat_every=60)
+    queue.complete(queue.claim("w"), {"pages": 1})
+    again = queue.get(job["id"])
+    assert again["status"] == "queued" and again["result"] == {"pages": 1}
+    assert again["run_at"] > time.time() + 50
+    assert queue.claim("w") is None
+
+
+def test_cancel_and_list(queue):
+    first, _ = queue.submit("search", {"keyword": "a"})
+    second, _ = queue.submit("list_pages", {"fakeid": "B"})
+    assert queue.cancel(first["id"])
+    assert not queue.cancel(first["id"])
+    assert [j["id"] for j in queue.list()] == [second["id"], first["id"]]
+    assert [j["id"] for j in queue.list(status="cancelled")] == [first["id"]]
+    assert [j["id"] for j in queue.list(kind="list_pages")] == [second["id"]]
+    assert [j["id"] for j in queue.list(limit=1, offset=1)] == [first["id"]]
+    assert queue.submit("search", {"keyword": "a"})[1]
+
+
+def claim_expired(queue):
+    queue.submit("search", {"keyword": "人民日报"})
+    stale = queue.claim("worker-a", lease=0.01)
+    time.sleep(0.05)
+    fresh = queue.claim("worker-b", lease=60)
+    assert fresh["id"] == stale["id"] and fresh["worker"] == "worker-b"
+    return stale, fresh
+
+
+def test_expired_lease_cannot_complete_reclaimed_job(queue):
+    stale, fresh = claim_expired(queue)
+    queue.complete(stale, {"fakeid": "stale"})
+    assert queue.get(fresh["id"])["status"] == "running"
+    queue.complete(fresh, {"fakeid": "fresh"})
+    job = queue.get(fresh["id"])
+    assert job["status"] == "done" and job["result"] == {"fakeid": "fresh"}
+
+
+def test_expired_lease_cannot_fail_or_release_reclaimed_job(queue):
+    stale, fresh = claim_expired(queue)
+    assert queue.fail(stale, "boom", 0) == "running"
+    queue.release(stale, 0)
+    job = queue.get(fresh["id"])
+    assert job["status"] == "running" and job["worker"] == "worker-b"
+    assert job["error"] is None
+    assert queue.fail(fresh, "boom", 0) == "queued"
+
+
+def test_extend_is_fenced_by_worker(queue):
+    stale, fresh = claim_expired(queue)
+    assert not queue.extend(stale, 60)
+    before = queue.get(fresh["id"])["leased_until"]
+    assert queue.extend(fresh, 120)
+    job = queue.get(fresh["id"])
+    assert job["leased_until"] > before and job["worker"] == "worker-b"
+    queue.complete(fresh, {})
+    assert not queue.extend(fresh, 60)
+
+
+def test_expired_job_out_of_attempts_fails_instead_of_rerunning(queue):
+    job, _ = queue.submit("search", {"keyword": "k"}, max_attempts=2)
+    queue.claim("worker-a", lease=0.01)
+    time.sleep(0.05)
+    assert queue.claim("worker-b", lease=0.01)["attempts"] == 2
+    time.sleep(0.05)
+    assert queue.claim("worker-c") is None
+    failed = queue.get(job["id"])
+    assert failed["status"] == "failed" and failed["error"]
+    assert failed["leased_until"] is None
+    assert queue.counts() == {"search": {"failed": 1}}
+    assert queue.submit("search", {"keyword": "k"})[1]
+
+
+def test_worker_heartbeat_keeps_long_jobs_leased(queue):
+    stolen = []
+
+    async def search(payload):
+        for _ in range(4):
+            await asyncio.sleep(0.1)
+            stolen.append(await asyncio.to_thread(queue.claim, "thief"))
+        return {"slow": True}
+
+    async def run():
+        worker = JobWorker(
+            queue, {"search": search}, concurrency=1, poll_interval=0.01, lease=0.15
+        )
+        worker.start()
+        while worker.processed < 1:
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    job, _ = queue.submit("search", {"keyword": "k"})
+    asyncio.run(run())
+    assert stolen == [None] * 4
+    done = queue.get(job["id"])
+    assert done["status"] == "done" and done["attempts"] == 1
+    assert done["result"] == {"slow": True}
+
+
+def test_worker_loops_claim_under_distinct_names(queue):
+    seen = []
+
+    async def search(payload):
+        seen.append(payload["keyword"])
+        await asyncio.sleep(0.05)
+        return {}
+
+    async def run():
+        worker = JobWorker(
+            queue, {"search": search}, concurrency=2, poll_interval=0.01, name="w"
+        )
+        worker.start()
+        while len(seen) < 2:
+            await asyncio.sleep(0.01)
+        workers = {job["worker"] for job in queue.list(status="running")}
+        await worker.stop()
+        return workers
+
+    for keyword in ("a", "b"):
+        queue.submit("search", {"keyword": keyword})
+    assert asyncio.run(run()) == {"w/0", "w/1"}
+
+
+class SlowService:
+    tracker = None
+
+
+def test_batch_and_job_fetches_share_the_fetcher_lock(monkeypatch):
+    fetcher = BulkFetcher(SlowService(), pipeline=object())
+    runs = []
+
+    async def fake_run(urls):
+        fetcher.stats = FetchStats(total=len(urls))
+        runs.append(("start", urls))
+        await asyncio.sleep(0.05)
+        fetcher.stats.ok = len(urls)
+        runs.append(("end", urls))
+
+    monkeypatch.setattr(fetcher, "run", fake_run)
+    monkeypatch.setattr(fetcher, "snapshot", lambda: fetcher.stats.snapshot())
+    handlers = crawl_handlers(None, None, None, fetcher, None, None)
+
+    async def batch():
+        async with fetcher.lock:
+            await fetcher.run(["batch-1", "batch-2"])
+
+    async def run():
+        task = asyncio.create_task(batch())
+        await asyncio.sleep(0)
+        result = await handlers["fetch_details"]({"urls": ["job"]})
+        await task
+        return result
+
+    assert asyncio.run(run())["total"] == 1
+    assert runs == [
+        ("start", ["batch-1", "batch-2"]),
+        ("end", ["batch-1", "batch-2"]),
+        ("start", ["job"]),
+        ("end", ["job"]),
+    ]
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from tests.conftest import ROOT
+
+PROBE = """
+import json, os
+from fastapi.testclient import TestClient
+import app.main as main
+
+def files():
+    if not os.path.isdir("cfg"):
+        return []
+    return sorted(name for name in os.listdir("cfg") if name.endswith(".db"))
+
+report = {"import": files()}
+report["built"] = sorted(
+    name for name, value in vars(main).items()
+    if isinstance(value, main.Lazy) and value.built
+)
+client = TestClient(main.app)
+report["health"] = client.get("/health").json()
+report["batch"] = client.get("/articles/details/batch").json()
+report["jobs"] = client.get("/jobs/stats").json()
+report["after_jobs"] = files()
+batch = client.post("/articles/details/batch", json={"urls": ["x"]})
+report["fetch"] = batch.status_code
+print(json.dumps(report))
+"""
+
+
+def test_api_role_builds_subsystems_on_first_use(tmp_path):
+    env = dict(os.environ)
+    env["CLAWLER_ROLES"] = "api"
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (ROOT, env.get("PYTHONPATH")) if p
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert report["import"] == []
+    assert report["built"] == []
+    assert report["health"] == {"status": "ok"}
+    assert report["batch"]["running"] is False and report["batch"]["stats"] is None
+    assert report["jobs"] == {"counts": {}, "worker": None}
+    assert report["after_jobs"] == ["jobs.db"]
+    assert report["fetch"] == 503
+
+
+class SlowIndex:
+    def links(self, fakeid):
+        time.sleep(0.1)
+        return [f"https://mp.weixin.qq.com/s?__biz={fakeid}&mid=1"]
+
+
+class RecordingFetcher:
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.runs = []
+
+    async def run(self, urls):
+        self.runs.append(urls)
+        await asyncio.sleep(0.05)
+
+    def snapshot(self):
+        return {"total": sum(len(urls) for urls in self.runs)}
+
+
+def test_concurrent_batch_requests_start_one_fetch(monkeypatch):
+    import app.main as main
+    from app.schemas import BatchFetchRequest
+
+    fake = RecordingFetcher()
+    monkeypatch.setattr(main.fetcher, "value", fake)
+    monkeypatch.setattr(main.index, "value", SlowIndex())
+    monkeypatch.setattr(main, "fetch_task", None)
+
+    async def run():
+        req = BatchFetchRequest(fakeid="A")
+        results = await asyncio.gather(
+            main.start_batch_fetch(req),
+            main.start_batch_fetch(req),
+            return_exceptions=True,
+        )
+        assert main.batch_fetch_status().running
+        await main.fetch_task
+        return results
+
+    first, second = asyncio.run(run())
+    assert first.running and first.message == "queued 1 urls"
+    assert isinstance(second, HTTPException) and second.status_code == 409
+    assert fake.runs == [["https://mp.weixin.qq.com/s?__biz=A&mid=1"]]
+    assert not main.batch_fetch_status().running
+
+
+def test_batch_request_without_urls_is_rejected(monkeypatch):
+    import app.main as main
+    from app.schemas import BatchFetchRequest
+
+    fake = RecordingFetcher()
+    monkeypatch.setattr(main.fetcher, "value", fake)
+    monkeypatch.setattr(main, "fetch_task", None)
+
+    async def run():
+        with pytest.raises(HTTPException) as exc:
+            await main.start_batch_fetch(BatchFetchRequest())
+        await main.fetch_task
+        return exc.value.status_code
+
+    assert asyncio.run(run()) == 400
+    assert fake.runs == []
@@ -0,0 +1,27 @@
+import time
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from app.services.metrics import ServiceCollector, token_label
+from app.services.pool import SessionPool
+from app.services.ratelimit import AdaptiveRateController
+
+TOKEN = "1234567890"
+
+
+def test_session_metrics_do_not_expose_tokens():
+    pool = SessionPool(directory="cfg/sessions")
+    pool.add({"token": TOKEN, "expiry": time.time() + 3600})
+    limiter = AdaptiveRateController()
+    limiter.limit(TOKEN, "searchbiz")
+    limiter.limit("mp.weixin.qq.com", "article")
+    registry = CollectorRegistry()
+    registry.register(ServiceCollector(pool=pool, limiter=limiter))
+    text = generate_latest(registry).decode("utf-8")
+
+    label = token_label(TOKEN)
+    assert TOKEN not in text
+    assert len(label) == 12 and label == token_label(TOKEN)
+    assert f'clawler_pool_inflight{{token="{label}"}} 0.0' in text
+    assert f'endpoint="searchbiz",session="{label}"' in text
+    assert 'endpoint="article",session="mp.weixin.qq.com"' in text
@@ -0,0 +1,57 @@
+import pytest
+
+from app.services.parsing import (
+    decode_html,
+    extract_article,
+    extract_article_bs4,
+    extract_link,
+)
+from benchmarks.fake_wechat import ARTICLE_TEMPLATE
+
+BODIES = [
+    "<p>第一段</p><p>第二段 <strong>加粗</strong> 结尾</p>",
+    "<!--lead-->开头<p>正文<!-- 注释 -->注释后</p><!--x--><span>尾</span>巴",
+    "<section>处理<?pi x?>指令后<br/>换行</section>",
+    "<p>脚本前</p><script>var a = 1;<!--s--></script>脚本后<style>p{}</style>样式后",
+    "<template><p>模板<!--t-->内容</p></template>模板后<p>  空白  </p>",
+    "<p>嵌套<span>一<em>二<!--c-->三</em>四</span>五</p>",
+]
+
+
+def render(body: str, title: str = "标题<!-- c -->续") -> str:
+    return ARTICLE_TEMPLATE.format(
+        biz="MzA5",
+        create_time="2024-01-01 08:00",
+        link="https://mp.weixin.qq.com/s?__biz=MzA5&amp;mid=1&amp;idx=1",
+        title=title,
+        author="作者",
+        body=body,
+    )
+
+
+@pytest.mark.parametrize("body", BODIES)
+def test_lxml_extractor_matches_bs4(body):
+    html = render(body)
+    assert extract_article(html) == extract_article_bs4(html)
+
+
+def test_comment_tails_are_kept():
+    data = extract_article(render(BODIES[1]))
+    assert data["content"] == "开头\n正文\n注释后\n尾\n巴"
+    assert data["title"] == "标题续"
+
+
+def test_missing_content_raises():
+    with pytest.raises(ValueError):
+        extract_article(render("").replace("rich_media_content", "other"))
+
+
+def test_decode_html_prefers_declared_charset():
+    body = render("<p>中文</p>").replace('charset="utf-8"', 'charset="gbk"')
+    assert decode_html(body.encode("gbk")) == body
+    assert decode_html(body.encode("gbk"), "text/html; charset=gbk") == body
+
+
+def test_extract_link_unescapes():
+    link = extract_link(render("<p>x</p>"))
+    assert link == "https://mp.weixin.qq.com/s?__biz=MzA5&mid=1&idx=1"
@@ -0,0 +1,129 @@
+import json
+import os
+import time
+
+from app.services.pool import SessionPool
+from app.services.ratelimit import AdaptiveRateController
+from app.services.state import SQLiteState
+
+
+def wx_cfg(token: str, ttl: float = 3600) -> dict:
+    return {
+        "token": token,
+        "cookies_str": f"slave_sid={token}",
+        "expiry": time.time() + ttl,
+    }
+
+
+def ret(code: int) -> dict:
+    return {"base_resp": {"ret": code, "err_msg": ""}}
+
+
+def make_pool(*tokens: str, **options) -> SessionPool:
+    pool = SessionPool(directory="cfg/sessions", **options)
+    for token in tokens:
+        pool.add(wx_cfg(token))
+    return pool
+
+
+def test_least_loaded_prefers_idle_then_healthier_sessions():
+    pool = make_pool("a", "b")
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.key, second.key} == {"a", "b"}
+    pool.release(first, ret(0))
+    assert pool.acquire() is first
+    pool.release(first, ret(0))
+    pool.release(second, ret(200040))
+    assert second.error_rate() == 1.0
+    assert [pool.acquire().key for _ in range(2)] == ["a", "b"]
+
+
+def test_round_robin_cycles_regardless_of_load():
+    pool = make_pool("c", "a", "b", strategy="round_robin")
+    picked = [pool.acquire().key for _ in range(6)]
+    assert picked == ["a", "b", "c", "a", "b", "c"]
+
+
+def test_expired_sessions_are_never_acquired():
+    pool = make_pool("a")
+    pool.add({**wx_cfg("old"), "expiry": time.time() - 1})
+    assert {pool.acquire().key for _ in range(3)} == {"a"}
+
+
+def test_freq_control_cools_the_session_down():
+    pool = make_pool("a", "b", cooldown=60)
+    session = pool.acquire()
+    pool.release(session, ret(200013))
+    assert not session.healthy()
+    assert session.last_ret == 200013
+    assert {pool.acquire().key for _ in range(3)} == {"b"}
+    pool.release(pool.acquire(), ret(200013))
+    assert pool.acquire() is None
+
+
+def test_error_rate_cools_the_session_down():
+    pool = make_pool("a", error_cooldown=60)
+    session = pool.acquire()
+    for _ in range(10):
+        pool.release(session, failed=True)
+    assert not session.healthy()
+    assert not session.outcomes
+
+
+def test_invalid_session_is_evicted_and_its_file_removed():
+    pool = make_pool("a", "b")
+    path = pool._sessions["a"].path
+    assert os.path.exists(path)
+    session = next(s for s in [pool.acquire(), pool.acquire()] if s.key == "a")
+    pool.release(session, ret(200003))
+    assert not os.path.exists(path)
+    assert [s.key for s in pool.sessions()] == ["b"]
+    assert not pool.evict("a")
+    pool.add(wx_cfg("a"))
+    assert sorted(s.key for s in pool.sessions()) == ["a", "b"]
+
+
+def test_directory_changes_are_picked_up():
+    pool = make_pool("a")
+    with open("cfg/sessions/b.json", "w", encoding="utf-8") as f:
+        json.dump(wx_cfg("b"), f)
+    os.utime("cfg/sessions", ns=(0, time.time_ns() + 10**9))
+    assert sorted(s.key for s in pool.sessions()) == ["a", "b"]
+    os.remove("cfg/sessions/a.json")
+    os.utime("cfg/sessions", ns=(0, time.time_ns() + 2 * 10**9))
+    assert [s.key for s in pool.sessions()] == ["b"]
+
+
+def test_shared_state_propagates_sessions_cooldowns_and_evictions():
+    first = make_pool("a", "b", state=SQLiteState("cfg/state.db"), cooldown=60)
+    second = SessionPool(directory="cfg/other", state=SQLiteState("cfg/state.db"))
+    assert sorted(s.key for s in second.sessions()) == ["a", "b"]
+    assert all(s.shared and s.path is None for s in second.sessions())
+
+    first.release(first._sessions["a"], ret(200013))
+    assert {second.acquire().key for _ in range(2)} == {"b"}
+
+    first.evict("b", "invalid session")
+    assert [s.key for s in second.sessions()] == ["a"]
+    second.add(wx_cfg("c"))
+    assert sorted(s.key for s in first.sessions()) == ["a", "c"]
+
+
+def test_local_directory_is_imported_into_shared_state():
+    make_pool("a")
+    pool = SessionPool(directory="cfg/sessions", state=SQLiteState("cfg/state.db"))
+    other = SessionPool(directory="cfg/empty", state=SQLiteState("cfg/state.db"))
+    assert [s.key for s in pool.sessions()] == ["a"]
+    assert [s.key for s in other.sessions()] == ["a"]
+
+
+def test_eviction_forgets_the_session_rate_limits():
+    limiter = AdaptiveRateController()
+    pool = make_pool("a", "b", limiter=limiter)
+    for token in ("a", "b"):
+        limiter.limit(token, "appmsgpublish")
+        limiter.limit(token, "searchbiz")
+    session = next(s for s in [pool.acquire(), pool.acquire()] if s.key == "a")
+    pool.release(session, ret(200003))
+    assert {item["session"] for item in limiter.snapshot()} == {"b"}
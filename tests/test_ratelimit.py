@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from app.services.ratelimit import (
+    AdaptiveRate,
+    AdaptiveRateController,
+    TokenBucket,
+    create_rate_controller,
+)
+from app.settings import Settings
+
+
+def test_hold_blocks_try_acquire_until_it_ends():
+    bucket = TokenBucket(rate=1000, burst=5)
+    bucket.hold(0.1)
+    assert not bucket.try_acquire()
+    time.sleep(0.15)
+    assert bucket.try_acquire()
+
+
+def test_pause_applies_to_waiters_already_queued_on_the_bucket():
+    limit = AdaptiveRate(rate=20, burst=1)
+
+    async def run():
+        await limit.acquire()
+        started = time.monotonic()
+        waiters = [asyncio.create_task(limit.acquire()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        limit.pause(0.3)
+        done = []
+        for waiter in asyncio.as_completed(waiters):
+            await waiter
+            done.append(time.monotonic() - started)
+        return done
+
+    done = asyncio.run(run())
+    assert min(done) >= 0.3
+    assert max(done) - min(done) >= 0.08
+
+
+def test_blocked_outcome_pauses_acquire():
+    limiter = AdaptiveRateController(
+        initial_rate=50, max_rate=100, burst=1, block_pause=0.2
+    )
+
+    async def run():
+        await limiter.acquire("s", "article")
+        limiter.record("s", "article", "blocked")
+        started = time.monotonic()
+        await limiter.acquire("s", "article")
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.2
+    [limit] = limiter.snapshot()
+    assert limit["blocked"] == 1 and limit["rate"] == 25
+
+
+def test_create_rate_controller_from_settings():
+    settings = Settings(rate_adaptive=True, rate_max=9, fetch_rate_per_host=3)
+    limiter = create_rate_controller(settings)
+    assert limiter.max_rate == 9
+    assert limiter.initial_rates == {"article": 3}
+    limiter = create_rate_controller(settings, article_rate=0.5)
+    assert limiter.initial_rates == {"article": 0.5}
+    assert create_rate_controller(Settings(rate_adaptive=False)) is None
@@ -0,0 +1,44 @@
+import asyncio
+
+from app.services.clawlers import AsyncWechatClient
+from app.services.sessions import SessionRegistry
+from app.services.storage import SessionStorage
+
+WX_CFG = {"token": "1001", "cookies_str": "slave_sid=abc", "user_agent": "pytest"}
+
+
+def test_identity_headers_are_isolated():
+    registry = SessionRegistry()
+    first = registry.get(WX_CFG)
+    second = registry.get({**WX_CFG, "token": "1002", "cookies_str": "slave_sid=x"})
+    assert first is not second
+    assert first.headers["Cookie"] == "slave_sid=abc"
+    assert second.headers["Cookie"] == "slave_sid=x"
+    assert registry.get(dict(WX_CFG)) is first
+
+
+def test_retired_identities_are_closed_after_requests_drain(fake_wechat):
+    registry = SessionRegistry()
+    client = AsyncWechatClient(
+        storage=SessionStorage("cfg/cookies.json"),
+        registry=registry,
+        base_url=fake_wechat,
+    )
+
+    async def run():
+        old = registry.get(WX_CFG)
+        await client.get_article_list(WX_CFG, "MzI0")
+        old_client = old.client
+        old.inflight += 1
+        refreshed = {**WX_CFG, "cookies_str": "slave_sid=new"}
+        await client.get_article_list(refreshed, "MzI0")
+        assert registry._retired == [old]
+        assert not old_client.is_closed
+        old.inflight -= 1
+        for n in range(3):
+            await client.get_article_list(refreshed, "MzI0", begin=n)
+        assert registry._retired == []
+        assert old_client.is_closed
+        await client.aclose()
+
+    asyncio.run(run())
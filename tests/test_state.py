@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.ratelimit import AdaptiveRateController
+from app.services.state import RedisState, SQLiteState, create_state_backend
+
+
+def sqlite_state():
+    return SQLiteState("cfg/state.db")
+
+
+def redis_state():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisState(client=fakeredis.FakeRedis(decode_responses=True))
+
+
+@pytest.fixture(params=[sqlite_state, redis_state], ids=["sqlite", "redis"])
+def state(request):
+    return request.param()
+
+
+def test_key_value_operations(state):
+    assert state.get("a") is None
+    assert state.set("a", "1")
+    assert not state.set("a", "2", nx=True)
+    assert state.get("a") == "1"
+    assert state.set("lease", "w1", ttl=0.05, nx=True)
+    assert not state.set("lease", "w2", ttl=0.05, nx=True)
+    time.sleep(0.1)
+    assert state.get("lease") is None
+    assert state.set("lease", "w2", ttl=5, nx=True)
+    assert not state.delete_if("lease", "w1")
+    assert state.delete_if("lease", "w2")
+    assert state.get("lease") is None
+    assert [state.incr("n") for _ in range(3)] == [1, 2, 3]
+    state.delete("a")
+    assert state.get("a") is None
+
+
+def test_hash_operations(state):
+    state.hset("h", "x", "1")
+    assert state.hsetnx("h", "y", "2")
+    assert not state.hsetnx("h", "y", "3")
+    assert state.hget("h", "y") == "2"
+    assert state.hgetall("h") == {"x": "1", "y": "2"}
+    assert state.hdel("h", "x")
+    assert not state.hdel("h", "x")
+    assert state.hgetall("h") == {"y": "2"}
+    assert state.hgetall("missing") == {}
+
+
+def test_reserve_allows_burst_then_spaces_requests(state):
+    waits = [state.reserve("bucket", rate=10, burst=3) for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0.05 < waits[3] <= 0.1
+    assert 0.15 < waits[4] <= 0.2
+
+
+def test_hold_pushes_next_reservation_past_the_pause(state):
+    state.hold("bucket", 0.5)
+    wait = state.reserve("bucket", rate=10, burst=1)
+    assert 0.4 < wait <= 0.5
+    state.hold("bucket", 0.1)
+    assert state.reserve("bucket", rate=10, burst=1) > 0.4
+
+
+def test_shared_rate_limit_pauses_every_process(state):
+    options = {"initial_rate": 5, "burst": 1, "throttle_pause": 0.3, "state": state}
+    first = AdaptiveRateController(**options)
+    second = AdaptiveRateController(**options)
+
+    async def run():
+        await first.acquire("s", "searchbiz")
+        first.record("s", "searchbiz", "throttled")
+        started = time.monotonic()
+        await second.acquire("s", "searchbiz")
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.3
+    assert second.limit("s", "searchbiz").sync() == 2.5
+
+
+def test_create_state_backend():
+    assert create_state_backend("local") is None
+    assert isinstance(create_state_backend("sqlite", "cfg/s.db"), SQLiteState)
+    with pytest.raises(ValueError):
+        create_state_backend("etcd")